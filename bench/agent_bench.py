@@ -0,0 +1,214 @@
+"""
+端到端 agent 循环基准：启动本地 mock LLM（mock_llm.py）与天气 stub（weather_stub.py），
+把 client/client.py（Ollama）或 client/remote.py（OpenAI 兼容）作为子进程运行，经标准输入送入若干轮用户消息，
+按客户端写出的每轮耗时日志（MCP_TURN_LOG，见 client/turn_timing.py）汇总：
+LLM 等待、工具调度、JSON 解析、历史处理与其它开销的均值 / p50 / p95 及占比。
+
+用法:
+  python bench/agent_bench.py --client both --turns 40 --latency-ms 100
+  python bench/agent_bench.py --client openai --stream --output agent.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from load_test import percentile
+from weather_stub import WeatherStub
+
+_root = Path(__file__).resolve().parent.parent
+_bench_dir = Path(__file__).resolve().parent
+
+CLIENTS = {
+    "ollama": "client/client.py",
+    "openai": "client/remote.py",
+}
+
+PHASES = ("llm", "dispatch", "parse", "history", "other")
+
+PROMPTS = [
+    "你好，跟 Alice 打个招呼",
+    "现在几点了？",
+    "北京朝阳区今天天气怎么样？",
+    "让机器人先站起来再向前走两步",
+    "查一下机器人现在的状态",
+    "上海和广州的天气分别如何？",
+    "讲个笑话吧",
+    "机器人左转九十度然后切换到跑步模式",
+]
+
+
+def _wait_port(port: int, proc: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"mock LLM 启动失败，退出码 {proc.returncode}")
+        with socket.socket() as s:
+            s.settimeout(0.2)
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.05)
+    raise RuntimeError("mock LLM 启动超时")
+
+
+def _phase_summary(records: list[dict]) -> dict:
+    total_time = sum(r["total"] for r in records) or 1.0
+    summary = {}
+    for phase in (*PHASES, "total"):
+        values = sorted(r.get(phase, 0.0) for r in records)
+        summary[phase] = {
+            "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else None,
+            "p50_ms": round(percentile(values, 50) * 1000, 3) if values else None,
+            "p95_ms": round(percentile(values, 95) * 1000, 3) if values else None,
+            "share": round(sum(values) / total_time, 4),
+        }
+    return summary
+
+
+def run_client(name: str, args, llm_port: int, stub: WeatherStub, workdir: Path) -> dict:
+    turn_log = workdir / f"turns-{name}.jsonl"
+    config_path = workdir / "config.json"
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump({"qwen": {"api_key": "mock", "base_url": f"http://127.0.0.1:{llm_port}/v1", "model": "mock"}}, f)
+
+    env = dict(
+        os.environ,
+        OLLAMA_HOST=f"http://127.0.0.1:{llm_port}",
+        QWEN_CONFIG=str(config_path),
+        MCP_TURN_LOG=str(turn_log),
+        MCP_STREAM="1" if args.stream else "0",
+        MCP_FAST_PATH="1" if args.fast_path else "0",
+        WEATHER_BASE_URL=stub.url_template,
+    )
+    # 机器人动作默认瞬时完成，使结果反映客户端开销而不是模拟的运动耗时
+    env.setdefault("MOVE_TIME_SCALE", "0")
+    if args.inprocess:
+        env["MCP_INPROCESS"] = "1"
+    prompts = [PROMPTS[i % len(PROMPTS)] for i in range(args.turns)]
+    stdin = "\n".join(prompts) + "\nexit\n"
+
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, str(_root / CLIENTS[name])],
+        cwd=str(_root),
+        env=env,
+        input=stdin,
+        capture_output=True,
+        text=True,
+        timeout=args.timeout,
+    )
+    wall = time.perf_counter() - started
+
+    records = []
+    if turn_log.exists():
+        with open(turn_log, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    result = {
+        "script": CLIENTS[name],
+        "exit_code": proc.returncode,
+        "turns": len(records),
+        "llm_rounds": sum(r.get("rounds", 0) for r in records),
+        "process_wall_s": round(wall, 3),
+        "turn_time_s": round(sum(r["total"] for r in records), 3),
+        "phases": _phase_summary(records) if records else {},
+    }
+    if proc.returncode != 0 or len(records) < args.turns:
+        result["stderr_tail"] = proc.stderr[-1000:]
+        result["stdout_tail"] = proc.stdout[-1000:]
+    return result
+
+
+def print_readable(report: dict) -> None:
+    meta = report["meta"]
+    print(
+        f"mock LLM 延迟 {meta['latency_ms']} ms，{meta['turns']} 轮，"
+        f"stream={meta['stream']}，inprocess={meta['inprocess']}"
+    )
+    for name, r in report["clients"].items():
+        print(
+            f"\n[{name}] {r['script']}：完成 {r['turns']} 轮（LLM 请求 {r['llm_rounds']} 次），"
+            f"进程总耗时 {r['process_wall_s']}s，对话耗时 {r['turn_time_s']}s"
+        )
+        if r["phases"]:
+            print(f"  {'phase':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'share':>9}")
+            for phase in (*PHASES, "total"):
+                p = r["phases"][phase]
+                print(f"  {phase:<10}{p['mean_ms']:>10.2f}{p['p50_ms']:>10.2f}{p['p95_ms']:>10.2f}{p['share']:>9.1%}")
+        if "stderr_tail" in r:
+            print(f"  退出码 {r['exit_code']}，stderr 末尾：\n{r['stderr_tail']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="端到端 agent 循环基准（本地 mock LLM）")
+    parser.add_argument("--client", choices=["ollama", "openai", "both"], default="both", help="被测客户端 (默认: both)")
+    parser.add_argument("--turns", type=int, default=24, help="用户消息轮数 (默认: 24)")
+    parser.add_argument("--latency-ms", type=float, default=100, help="mock LLM 响应延迟 (默认: 100)")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="mock LLM 延迟抖动 (默认: 0)")
+    parser.add_argument("--mix", default="text=1,tool=2,multi=1", help="mock LLM 随机回复权重")
+    parser.add_argument("--script", help="mock LLM 脚本化回复的 JSON 文件")
+    parser.add_argument("--stream", action="store_true", help="客户端使用流式模式（MCP_STREAM=1）")
+    parser.add_argument("--inprocess", action="store_true", help="MCP 服务在客户端进程内托管（MCP_INPROCESS=1）")
+    parser.add_argument("--fast-path", action="store_true", help="保留机器人直达指令（默认关闭，使每轮都经过 LLM）")
+    parser.add_argument("--llm-port", type=int, default=18300, help="mock LLM 端口 (默认: 18300)")
+    parser.add_argument("--timeout", type=float, default=300, help="单个客户端运行超时秒数 (默认: 300)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (默认: 0)")
+    parser.add_argument("--output", help="把 JSON 报告写入文件")
+    parser.add_argument("--json", action="store_true", help="以 JSON 格式输出到标准输出")
+    args = parser.parse_args()
+
+    llm_cmd = [
+        sys.executable,
+        str(_bench_dir / "mock_llm.py"),
+        "--port", str(args.llm_port),
+        "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms),
+        "--mix", args.mix,
+        "--seed", str(args.seed),
+    ]
+    if args.script:
+        llm_cmd += ["--script", args.script]
+    llm = subprocess.Popen(llm_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    stub = WeatherStub(0, 0.02)
+    stub.start_in_thread()
+    names = ["ollama", "openai"] if args.client == "both" else [args.client]
+    try:
+        _wait_port(args.llm_port, llm)
+        with tempfile.TemporaryDirectory(prefix="agent-bench-") as tmp:
+            clients = {name: run_client(name, args, args.llm_port, stub, Path(tmp)) for name in names}
+    finally:
+        llm.terminate()
+        llm.wait(timeout=5)
+        stub.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "turns": args.turns,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "mix": args.mix,
+            "script": args.script,
+            "stream": args.stream,
+            "inprocess": args.inprocess,
+            "fast_path": args.fast_path,
+        },
+        "clients": clients,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_readable(report)
+    if any(r["exit_code"] != 0 or r["turns"] < args.turns for r in clients.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+"""
+streamable-http 服务压测：在本地端口启动 server/ 下的 server.py、server2.py、weather.py（上游指向
+本地 stub，见 weather_stub.py）与 move.py，用 N 个并发 MCP 客户端按工具混合持续调用，
+报告各工具及总体的吞吐、p50/p95/p99 延迟、错误率，以及各服务进程的 RSS（JSON，便于跨版本对比）。
+
+用法:
+  python bench/load_test.py --clients 20 --duration 30 --output result.json
+  python bench/load_test.py --baseline result.json   # 与基线对比，退化超出阈值时退出码为 1
+
+每个客户端对所需的每个服务各持有一个 session，循环随机挑选工具调用；
+压测端为单进程 asyncio，客户端很多时请留意压测进程本身的 CPU 占用。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+
+from mcp.client.session import ClientSession
+from mcp.client.streamable_http import streamable_http_client
+
+from weather_stub import WeatherStub
+
+_root = Path(__file__).resolve().parent.parent
+_server_dir = _root / "server"
+
+# (标签, 脚本)；端口按顺序从 --base-port 起分配
+SERVERS = [
+    ("hello", "server.py"),
+    ("time", "server2.py"),
+    ("weather", "weather.py"),
+    ("move", "move.py"),
+]
+
+_NAMES = ["Alice", "Bob", "小明", "小红", "MCP"]
+_LOCATIONS = [
+    ("北京", "北京", "朝阳区"), ("北京", "北京", "海淀区"), ("上海", "上海", "浦东新区"), ("上海", "上海", "徐汇区"),
+    ("广东", "广州", "天河区"), ("广东", "深圳", "南山区"), ("浙江", "杭州", "西湖区"), ("四川", "成都", "武侯区"),
+    ("湖北", "武汉", "洪山区"), ("江苏", "南京", "玄武区"), ("陕西", "西安", "雁塔区"), ("重庆", "重庆", "渝中区"),
+]
+
+# 工具 -> (服务标签, 参数生成函数)
+WORKLOAD = {
+    "say_hello": ("hello", lambda rnd, _locs: {"name": rnd.choice(_NAMES)}),
+    "get_time": ("time", lambda rnd, _locs: {}),
+    "get_weather": (
+        "weather",
+        lambda rnd, locs: dict(zip(("province", "city", "county"), rnd.choice(locs))),
+    ),
+    "robot_get_status": ("move", lambda rnd, _locs: {}),
+    "robot_stand": ("move", lambda rnd, _locs: {}),
+    "robot_walk": (
+        "move",
+        lambda rnd, _locs: {"direction": rnd.choice(["forward", "backward"]), "steps": rnd.randint(1, 5)},
+    ),
+    "robot_turn": (
+        "move",
+        lambda rnd, _locs: {"direction": rnd.choice(["left", "right"]), "degrees": rnd.choice([15, 30, 90])},
+    ),
+    "robot_set_gait_mode": ("move", lambda rnd, _locs: {"mode": rnd.choice(["walk", "run"])}),
+}
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """最近秩百分位（q 取 0~100），values 需已排序。"""
+    if not values:
+        return None
+    rank = max(1, min(len(values), round(q / 100 * len(values) + 0.5)))
+    return values[rank - 1]
+
+
+def rss_kb(pid: int) -> int | None:
+    """读取 /proc/<pid>/status 的 VmRSS（仅 Linux）。"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _port_open(port: int) -> bool:
+    with socket.socket() as s:
+        s.settimeout(0.2)
+        return s.connect_ex(("127.0.0.1", port)) == 0
+
+
+class ServerProcess:
+    def __init__(self, label: str, script: str, port: int, extra_env: dict):
+        self.label = label
+        self.script = script
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}/mcp"
+        self.extra_env = extra_env
+        self.proc: subprocess.Popen | None = None
+        self.rss = {"start": None, "peak": None, "end": None}
+        self.startup = None
+
+    def start(self) -> None:
+        if _port_open(self.port):
+            raise RuntimeError(f"端口 {self.port} 已被占用（{self.label}），请换 --base-port")
+        env = dict(os.environ, MCP_TRANSPORT="streamable-http", MCP_HOST="127.0.0.1", MCP_PORT=str(self.port))
+        env.update(self.extra_env)
+        self._started = time.perf_counter()
+        self.proc = subprocess.Popen(
+            [sys.executable, str(_server_dir / self.script)],
+            cwd=str(_server_dir),
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    async def wait_ready(self, timeout: float) -> None:
+        deadline = time.perf_counter() + timeout
+        while not _port_open(self.port):
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"{self.label} 启动失败，退出码 {self.proc.returncode}")
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"{self.label} 启动超时（{timeout:g}s）")
+            await asyncio.sleep(0.05)
+        self.startup = time.perf_counter() - self._started
+        self.rss["start"] = self.rss["peak"] = rss_kb(self.proc.pid)
+
+    def sample_rss(self) -> None:
+        value = rss_kb(self.proc.pid)
+        if value is None:
+            return
+        self.rss["end"] = value
+        if self.rss["peak"] is None or value > self.rss["peak"]:
+            self.rss["peak"] = value
+
+    def stop(self) -> None:
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+class Recorder:
+    def __init__(self):
+        self.recording = False
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.error_samples: dict[str, str] = {}
+
+    def record(self, tool: str, seconds: float, error: str | None) -> None:
+        if not self.recording:
+            return
+        if error is None:
+            self.latencies.setdefault(tool, []).append(seconds)
+        else:
+            self.errors[tool] = self.errors.get(tool, 0) + 1
+            self.error_samples.setdefault(tool, error[:200])
+
+
+async def _client(
+    index: int,
+    urls: dict[str, str],
+    tools: list[str],
+    locations: list[tuple],
+    stop: asyncio.Event,
+    recorder: Recorder,
+    seed: int,
+) -> None:
+    rnd = random.Random(seed + index)
+    async with AsyncExitStack() as stack:
+        sessions = {}
+        for label in sorted({WORKLOAD[t][0] for t in tools}):
+            read, write, _ = await stack.enter_async_context(streamable_http_client(urls[label]))
+            session = await stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+            sessions[label] = session
+        while not stop.is_set():
+            tool = rnd.choice(tools)
+            label, make_args = WORKLOAD[tool]
+            started = time.perf_counter()
+            error = None
+            try:
+                result = await sessions[label].call_tool(tool, make_args(rnd, locations))
+                if result.isError:
+                    error = result.content[0].text if result.content else "isError"
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            recorder.record(tool, time.perf_counter() - started, error)
+
+
+async def _sample_rss(servers: list[ServerProcess], stop: asyncio.Event, interval: float = 0.5) -> None:
+    while not stop.is_set():
+        for s in servers:
+            s.sample_rss()
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+    for s in servers:
+        s.sample_rss()
+
+
+async def _weather_cache_stats(url: str) -> dict | None:
+    try:
+        async with streamable_http_client(url) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                result = await session.read_resource("weather://cache/stats")
+                return json.loads(result.contents[0].text)
+    except Exception:
+        return None
+
+
+def _summarize(tool_latencies: list[float], errors: int, duration: float) -> dict:
+    values = sorted(tool_latencies)
+    total = len(values) + errors
+
+    def ms(v):
+        return None if v is None else round(v * 1000, 3)
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(len(values) / duration, 2) if duration else 0.0,
+        "latency_ms": {
+            "p50": ms(percentile(values, 50)),
+            "p95": ms(percentile(values, 95)),
+            "p99": ms(percentile(values, 99)),
+            "mean": ms(sum(values) / len(values)) if values else None,
+            "max": ms(values[-1]) if values else None,
+        },
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=_root, capture_output=True, text=True, timeout=5
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def run(args) -> dict:
+    tools = [t.strip() for t in args.tools.split(",") if t.strip()]
+    unknown = [t for t in tools if t not in WORKLOAD]
+    if unknown:
+        raise SystemExit(f"未知工具: {', '.join(unknown)}（可选: {', '.join(WORKLOAD)}）")
+    needed = {WORKLOAD[t][0] for t in tools}
+    locations = _LOCATIONS[: max(1, args.weather_locations)]
+
+    extra_env = dict(kv.split("=", 1) for kv in args.server_env)
+    stub = None
+    servers = []
+    port = args.base_port
+    for label, script in SERVERS:
+        if label not in needed:
+            continue
+        env = dict(extra_env)
+        if label == "weather":
+            stub = WeatherStub(0, args.stub_latency_ms / 1000)
+            stub.start_in_thread()
+            env["WEATHER_BASE_URL"] = stub.url_template
+        elif label == "move":
+            # 压测衡量服务开销，动作默认瞬时完成（可用 --server-env MOVE_TIME_SCALE=1 模拟真实耗时）
+            env.setdefault("MOVE_TIME_SCALE", "0")
+        servers.append(ServerProcess(label, script, port, env))
+        port += 1
+
+    stop = asyncio.Event()
+    recorder = Recorder()
+    try:
+        for s in servers:
+            s.start()
+        await asyncio.gather(*(s.wait_ready(args.startup_timeout) for s in servers))
+        urls = {s.label: s.url for s in servers}
+        print(
+            f"已启动 {len(servers)} 个服务，{args.clients} 个客户端，预热 {args.warmup:g}s，压测 {args.duration:g}s",
+            file=sys.stderr,
+        )
+
+        sampler = asyncio.create_task(_sample_rss(servers, stop))
+        clients = [
+            asyncio.create_task(_client(i, urls, tools, locations, stop, recorder, args.seed))
+            for i in range(args.clients)
+        ]
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        recorder.recording = False
+        duration = time.perf_counter() - started
+        stop.set()
+        client_results = await asyncio.gather(*clients, return_exceptions=True)
+        await sampler
+
+        weather_cache = await _weather_cache_stats(urls["weather"]) if "weather" in urls else None
+    finally:
+        stop.set()
+        for s in servers:
+            s.stop()
+        if stub is not None:
+            stub.shutdown()
+
+    client_errors = [r for r in client_results if isinstance(r, BaseException)]
+    all_latencies = [v for values in recorder.latencies.values() for v in values]
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "clients": args.clients,
+            "duration_s": round(duration, 3),
+            "warmup_s": args.warmup,
+            "tools": tools,
+            "weather_locations": len(locations),
+            "stub_latency_ms": args.stub_latency_ms,
+            "server_env": extra_env,
+            "client_failures": len(client_errors),
+        },
+        "total": _summarize(all_latencies, sum(recorder.errors.values()), duration),
+        "tools": {
+            t: _summarize(recorder.latencies.get(t, []), recorder.errors.get(t, 0), duration) for t in tools
+        },
+        "servers": {
+            s.label: {
+                "url": s.url,
+                "startup_s": round(s.startup, 3) if s.startup is not None else None,
+                "rss_kb": dict(s.rss),
+            }
+            for s in servers
+        },
+    }
+    if recorder.error_samples:
+        report["error_samples"] = recorder.error_samples
+    if client_errors:
+        report["client_failure_sample"] = f"{type(client_errors[0]).__name__}: {client_errors[0]}"[:200]
+    if stub is not None:
+        report["weather_upstream"] = {"requests": stub.requests, "cache": weather_cache}
+    return report
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """与基线对比：吞吐下降、p95 上升超过 threshold（比例），或错误率上升超过 1 个百分点即视为退化。"""
+    regressions = []
+    for name in ["total", *report["tools"]]:
+        cur = report["total"] if name == "total" else report["tools"][name]
+        base = baseline.get("total") if name == "total" else baseline.get("tools", {}).get(name)
+        if not base:
+            continue
+        if base["throughput_rps"] and cur["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{name}: 吞吐 {base['throughput_rps']} -> {cur['throughput_rps']} rps")
+        base_p95, cur_p95 = base["latency_ms"]["p95"], cur["latency_ms"]["p95"]
+        if base_p95 and cur_p95 and cur_p95 > base_p95 * (1 + threshold):
+            regressions.append(f"{name}: p95 {base_p95} -> {cur_p95} ms")
+        if cur["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{name}: 错误率 {base['error_rate']:.2%} -> {cur['error_rate']:.2%}")
+    return regressions
+
+
+def print_readable(report: dict) -> None:
+    meta = report["meta"]
+    print(f"客户端 {meta['clients']}，压测 {meta['duration_s']}s，commit {meta['git_commit'] or '-'}")
+    print(f"{'tool':<22}{'requests':>9}{'errors':>9}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, s in [("total", report["total"]), *report["tools"].items()]:
+        lat = s["latency_ms"]
+        cells = [f"{lat[k]:.1f}" if lat[k] is not None else "-" for k in ("p50", "p95", "p99")]
+        print(f"{name:<22}{s['requests']:>9}{s['error_rate']:>9.2%}{s['throughput_rps']:>10.1f}" + "".join(
+            f"{c:>10}" for c in cells
+        ))
+    for label, s in report["servers"].items():
+        rss = s["rss_kb"]
+        print(
+            f"[{label}] 启动 {s['startup_s']}s，RSS 起始/峰值/结束 "
+            f"{rss['start']}/{rss['peak']}/{rss['end']} KB"
+        )
+    if "weather_upstream" in report:
+        w = report["weather_upstream"]
+        print(f"[weather] 上游请求 {w['requests']} 次，缓存 {w['cache']}")
+    for tool, sample in report.get("error_samples", {}).items():
+        print(f"错误示例 {tool}: {sample}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地 streamable-http MCP 服务压测")
+    parser.add_argument("--clients", type=int, default=10, help="并发客户端数 (默认: 10)")
+    parser.add_argument("--duration", type=float, default=20, help="计入统计的压测秒数 (默认: 20)")
+    parser.add_argument("--warmup", type=float, default=3, help="预热秒数，不计入统计 (默认: 3)")
+    parser.add_argument("--tools", default=",".join(WORKLOAD), help="参与压测的工具，逗号分隔 (默认: 全部)")
+    parser.add_argument("--base-port", type=int, default=18201, help="服务端口起始值 (默认: 18201)")
+    parser.add_argument("--weather-locations", type=int, default=len(_LOCATIONS), help="get_weather 随机使用的地点数")
+    parser.add_argument("--stub-latency-ms", type=float, default=50, help="天气 stub 的响应延迟 (默认: 50)")
+    parser.add_argument(
+        "--server-env", action="append", default=[], metavar="KEY=VALUE", help="传给各服务进程的环境变量，可重复"
+    )
+    parser.add_argument("--startup-timeout", type=float, default=30, help="单个服务启动超时秒数 (默认: 30)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (默认: 0)")
+    parser.add_argument("--output", help="把 JSON 报告写入文件")
+    parser.add_argument("--json", action="store_true", help="以 JSON 格式输出到标准输出")
+    parser.add_argument("--baseline", help="基线 JSON 报告，退化超出阈值时退出码为 1")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="允许的退化比例 (默认: 0.2)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_readable(report)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_regression)
+        for line in regressions:
+            print(f"退化: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("与基线相比无明显退化。", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
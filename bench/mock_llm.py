@@ -0,0 +1,253 @@
+"""
+本地 mock LLM：同时提供 Ollama chat API（POST /api/chat）与 OpenAI chat-completions
+（POST /v1/chat/completions），均支持流式，用于在不依赖真实模型的情况下压测客户端的 agent 循环。
+
+响应来源：
+- 脚本（--script 文件）：JSON 数组，按请求顺序循环取用，每项形如
+  {"content": "文本"} 或 {"tool_calls": [{"name": "get_time", "arguments": {}}]}；
+- 随机（默认）：上一条是工具结果时回复文本；否则按 --mix 权重在 文本 / 单个 tool_call / 多个 tool_calls
+  中随机选择，工具从请求携带的 tools 中挑选，参数按 schema 生成。
+
+延迟：每个请求先等待 --latency-ms（± --jitter-ms），流式时每个分片之间再等待 --chunk-delay-ms。
+用法: python bench/mock_llm.py [--port 18300] [--latency-ms 200] [--mix text=1,tool=2,multi=1]
+GET /stats 返回各接口的请求数。
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+# 生成工具参数时按参数名取的示例值；未列出的按类型取默认值
+_SAMPLE_ARGS = {
+    "name": ["Alice", "小明"],
+    "province": ["北京", "上海", "广东"],
+    "city": ["北京", "上海", "广州"],
+    "county": ["朝阳区", "浦东新区", "天河区"],
+    "direction": ["forward", "backward", "left", "right"],
+    "steps": [1, 2, 3],
+    "degrees": [30, 90],
+    "mode": ["walk", "run"],
+    "enable": [False],
+}
+_TYPE_DEFAULTS = {"string": "test", "integer": 1, "number": 1.0, "boolean": False, "array": [], "object": {}}
+
+
+def _sample_arguments(schema: dict, rnd: random.Random) -> dict:
+    args = {}
+    props = (schema or {}).get("properties") or {}
+    for name in (schema or {}).get("required") or list(props):
+        if name in _SAMPLE_ARGS:
+            args[name] = rnd.choice(_SAMPLE_ARGS[name])
+        else:
+            args[name] = _TYPE_DEFAULTS.get((props.get(name) or {}).get("type"), "test")
+    return args
+
+
+class Responder:
+    """决定每个请求的回复：{"content": str | None, "tool_calls": [{"name", "arguments"}]}。"""
+
+    def __init__(self, script: list[dict] | None, mix: dict[str, float], seed: int):
+        self._script = itertools.cycle(script) if script else None
+        self.mix = mix
+        self.rnd = random.Random(seed)
+
+    def next(self, messages: list[dict], tools: list[dict]) -> dict:
+        if self._script is not None:
+            item = next(self._script)
+            return {"content": item.get("content"), "tool_calls": item.get("tool_calls") or []}
+        last = messages[-1] if messages else {}
+        functions = [t.get("function") or {} for t in tools or []]
+        if last.get("role") == "tool" or not functions:
+            return {"content": "好的，已根据工具结果完成。", "tool_calls": []}
+        kinds = [k for k in ("text", "tool", "multi") if self.mix.get(k, 0) > 0]
+        kind = self.rnd.choices(kinds, weights=[self.mix[k] for k in kinds])[0]
+        if kind == "text":
+            return {"content": "这是一个模拟回复。", "tool_calls": []}
+        count = 1 if kind == "tool" else min(len(functions), self.rnd.randint(2, 3))
+        picked = self.rnd.sample(functions, count)
+        return {
+            "content": None,
+            "tool_calls": [
+                {"name": fn.get("name"), "arguments": _sample_arguments(fn.get("parameters"), self.rnd)}
+                for fn in picked
+            ],
+        }
+
+
+class MockLLM:
+    def __init__(self, responder: Responder, latency: float, jitter: float, chunk_delay: float):
+        self.responder = responder
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_delay = chunk_delay
+        self.requests = {"ollama": 0, "openai": 0}
+
+    async def _wait(self) -> None:
+        delay = self.latency + self.responder.rnd.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _text_pieces(text: str | None) -> list[str]:
+        text = text or ""
+        return [text[i : i + 4] for i in range(0, len(text), 4)]
+
+    async def ollama_chat(self, request: Request):
+        body = await request.json()
+        self.requests["ollama"] += 1
+        reply = self.responder.next(body.get("messages") or [], body.get("tools") or [])
+        model = body.get("model", "mock")
+        tool_calls = [{"function": {"name": c["name"], "arguments": c["arguments"]}} for c in reply["tool_calls"]]
+
+        def chunk(content: str, calls: list | None, done: bool) -> dict:
+            message = {"role": "assistant", "content": content}
+            if calls:
+                message["tool_calls"] = calls
+            data = {"model": model, "created_at": _now(), "message": message, "done": done}
+            if done:
+                data["done_reason"] = "stop"
+            return data
+
+        await self._wait()
+        if not body.get("stream", True):
+            return JSONResponse(chunk(reply["content"] or "", tool_calls, True))
+
+        async def lines():
+            for piece in self._text_pieces(reply["content"]):
+                yield json.dumps(chunk(piece, None, False), ensure_ascii=False) + "\n"
+                await asyncio.sleep(self.chunk_delay)
+            if tool_calls:
+                yield json.dumps(chunk("", tool_calls, False), ensure_ascii=False) + "\n"
+            yield json.dumps(chunk("", None, True), ensure_ascii=False) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    async def openai_chat(self, request: Request):
+        body = await request.json()
+        self.requests["openai"] += 1
+        reply = self.responder.next(body.get("messages") or [], body.get("tools") or [])
+        model = body.get("model", "mock")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        tool_calls = [
+            {
+                "id": f"call_{uuid.uuid4().hex[:8]}",
+                "type": "function",
+                "function": {"name": c["name"], "arguments": json.dumps(c["arguments"], ensure_ascii=False)},
+            }
+            for c in reply["tool_calls"]
+        ]
+        finish_reason = "tool_calls" if tool_calls else "stop"
+
+        await self._wait()
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": reply["content"]}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return JSONResponse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                }
+            )
+
+        def chunk(delta: dict, finish: str | None = None) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for piece in self._text_pieces(reply["content"]):
+                yield chunk({"content": piece})
+                await asyncio.sleep(self.chunk_delay)
+            for index, tc in enumerate(tool_calls):
+                # 参数分两片发送，模拟增量到达
+                args = tc["function"]["arguments"]
+                half = len(args) // 2
+                yield chunk(
+                    {
+                        "tool_calls": [
+                            {
+                                "index": index,
+                                "id": tc["id"],
+                                "type": "function",
+                                "function": {"name": tc["function"]["name"], "arguments": args[:half]},
+                            }
+                        ]
+                    }
+                )
+                await asyncio.sleep(self.chunk_delay)
+                yield chunk({"tool_calls": [{"index": index, "function": {"arguments": args[half:]}}]})
+            yield chunk({}, finish_reason)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def stats(self, request: Request):
+        return JSONResponse(self.requests)
+
+    def app(self) -> Starlette:
+        return Starlette(
+            routes=[
+                Route("/api/chat", self.ollama_chat, methods=["POST"]),
+                Route("/v1/chat/completions", self.openai_chat, methods=["POST"]),
+                Route("/chat/completions", self.openai_chat, methods=["POST"]),
+                Route("/stats", self.stats, methods=["GET"]),
+            ]
+        )
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """解析 "text=1,tool=2,multi=1"。"""
+    mix = {}
+    for part in text.split(","):
+        if "=" in part:
+            key, value = part.split("=", 1)
+            mix[key.strip()] = float(value)
+    return mix
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地 mock LLM（Ollama 与 OpenAI 兼容接口）")
+    parser.add_argument("--port", type=int, default=18300, help="监听端口 (默认: 18300)")
+    parser.add_argument("--latency-ms", type=float, default=200, help="每个请求的响应延迟 (默认: 200)")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="延迟随机抖动幅度 (默认: 0)")
+    parser.add_argument("--chunk-delay-ms", type=float, default=5, help="流式分片间隔 (默认: 5)")
+    parser.add_argument("--mix", default="text=1,tool=2,multi=1", help="随机回复权重 (默认: text=1,tool=2,multi=1)")
+    parser.add_argument("--script", help="脚本化回复的 JSON 文件")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (默认: 0)")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = json.load(f)
+    responder = Responder(script, parse_mix(args.mix), args.seed)
+    mock = MockLLM(responder, args.latency_ms / 1000, args.jitter_ms / 1000, args.chunk_delay_ms / 1000)
+    uvicorn.run(mock.app(), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
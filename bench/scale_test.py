@@ -0,0 +1,186 @@
+"""
+多工作进程扩展性基准：依次以 MCP_WORKERS=1、2、4…… 启动同一个服务（streamable-http，见 server/serving.py），
+用多个压测进程（每个进程若干并发 MCP 客户端，复用 load_test.py 的客户端循环）打满该端口，
+报告每档的吞吐、相对单进程的加速比、p50/p95 延迟、错误率与全部进程的 RSS 合计；
+压测 weather 时另报告上游请求数（多进程共享 SQLite 缓存，上游请求数不应随进程数增加）。
+
+用法:
+  python bench/scale_test.py --server hello --workers 1,2,4 --duration 10
+  python bench/scale_test.py --server weather --gen-procs 4 --clients 8 --output scale.json
+
+压测进程与服务共用本机 CPU：加速比受核数限制，--gen-procs 过少时压测端本身会先成为瓶颈。
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from load_test import Recorder, ServerProcess, _LOCATIONS, _client, _summarize, rss_kb
+from weather_stub import WeatherStub
+
+# 服务标签 -> (脚本, 压测的工具)；move 有进程内状态，固定单进程，不参与
+TARGETS = {
+    "hello": ("server.py", ["say_hello"]),
+    "time": ("server2.py", ["get_time"]),
+    "weather": ("weather.py", ["get_weather"]),
+}
+
+
+def _generate(url: str, label: str, tools: list[str], clients: int, warmup: float, duration: float, seed: int):
+    """在独立进程中运行 clients 个并发客户端，返回 (各次成功耗时, 错误数, 实际统计秒数)。"""
+
+    async def main():
+        stop = asyncio.Event()
+        recorder = Recorder()
+        tasks = [
+            asyncio.create_task(_client(i, {label: url}, tools, _LOCATIONS, stop, recorder, seed))
+            for i in range(clients)
+        ]
+        await asyncio.sleep(warmup)
+        recorder.recording = True
+        started = time.perf_counter()
+        await asyncio.sleep(duration)
+        recorder.recording = False
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        latencies = [v for values in recorder.latencies.values() for v in values]
+        return latencies, sum(recorder.errors.values()), elapsed
+
+    return asyncio.run(main())
+
+
+def _tree_rss_kb(pid: int) -> int | None:
+    """进程及其子进程（工作进程）的 RSS 合计（仅 Linux）。"""
+    total = rss_kb(pid)
+    if total is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="ascii") as f:
+            children = [int(c) for c in f.read().split()]
+    except OSError:
+        children = []
+    return total + sum(rss_kb(c) or 0 for c in children)
+
+
+async def _run_level(args, workers: int, port: int, stub: WeatherStub | None, tmpdir: str) -> dict:
+    script, tools = TARGETS[args.server]
+    env = {"MCP_WORKERS": str(workers)}
+    if stub is not None:
+        env["WEATHER_BASE_URL"] = stub.url_template
+        env["WEATHER_SHARED_CACHE"] = os.path.join(tmpdir, f"weather-{workers}.sqlite")
+    server = ServerProcess(args.server, script, port, env)
+    upstream_before = stub.requests if stub is not None else 0
+    server.start()
+    try:
+        await server.wait_ready(args.startup_timeout)
+        # 工作进程各自启动，端口可连接后再稍等片刻
+        await asyncio.sleep(0.5 + 0.1 * workers)
+        loop = asyncio.get_running_loop()
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(args.gen_procs) as pool:
+            pending = [
+                pool.apply_async(
+                    _generate,
+                    (server.url, args.server, tools, args.clients, args.warmup, args.duration, args.seed + 1000 * g),
+                )
+                for g in range(args.gen_procs)
+            ]
+            results = await loop.run_in_executor(None, lambda: [p.get(timeout=args.duration + 120) for p in pending])
+        rss = _tree_rss_kb(server.proc.pid)
+    finally:
+        server.stop()
+
+    latencies = [v for r in results for v in r[0]]
+    errors = sum(r[1] for r in results)
+    elapsed = max(r[2] for r in results)
+    level = {"workers": workers, **_summarize(latencies, errors, elapsed), "rss_total_kb": rss}
+    if stub is not None:
+        level["weather_upstream_requests"] = stub.requests - upstream_before
+    return level
+
+
+async def run(args) -> dict:
+    levels = [int(w) for w in args.workers.split(",") if w.strip()]
+    stub = None
+    if args.server == "weather":
+        stub = WeatherStub(0, args.stub_latency_ms / 1000)
+        stub.start_in_thread()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="scale-test-") as tmpdir:
+            for i, workers in enumerate(levels):
+                print(f"MCP_WORKERS={workers} ...", file=sys.stderr)
+                results.append(await _run_level(args, workers, args.base_port + i, stub, tmpdir))
+    finally:
+        if stub is not None:
+            stub.shutdown()
+    base = results[0]["throughput_rps"] if results else 0
+    for r in results:
+        r["speedup"] = round(r["throughput_rps"] / base, 2) if base else None
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "server": args.server,
+            "tools": TARGETS[args.server][1],
+            "cpu_count": os.cpu_count(),
+            "gen_procs": args.gen_procs,
+            "clients_per_proc": args.clients,
+            "duration_s": args.duration,
+        },
+        "levels": results,
+    }
+
+
+def print_readable(report: dict) -> None:
+    meta = report["meta"]
+    print(
+        f"{meta['server']}（{','.join(meta['tools'])}），CPU {meta['cpu_count']}，"
+        f"压测进程 {meta['gen_procs']} × 客户端 {meta['clients_per_proc']}，每档 {meta['duration_s']:g}s"
+    )
+    print(f"{'workers':>8}{'rps':>10}{'speedup':>9}{'p50 ms':>10}{'p95 ms':>10}{'errors':>9}{'RSS MB':>9}{'upstream':>10}")
+    for r in report["levels"]:
+        lat = r["latency_ms"]
+        cells = [f"{lat[k]:.1f}" if lat[k] is not None else "-" for k in ("p50", "p95")]
+        rss = f"{r['rss_total_kb'] / 1024:.0f}" if r["rss_total_kb"] else "-"
+        upstream = r.get("weather_upstream_requests", "-")
+        print(
+            f"{r['workers']:>8}{r['throughput_rps']:>10.1f}{r['speedup'] or 0:>9.2f}{cells[0]:>10}{cells[1]:>10}"
+            f"{r['error_rate']:>9.2%}{rss:>9}{upstream:>10}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="多工作进程吞吐扩展性基准")
+    parser.add_argument("--server", choices=list(TARGETS), default="hello", help="被测服务 (默认: hello)")
+    parser.add_argument("--workers", default="1,2,4", help="依次测试的工作进程数 (默认: 1,2,4)")
+    parser.add_argument("--gen-procs", type=int, default=min(4, os.cpu_count() or 1), help="压测进程数 (默认: min(4, CPU 数))")
+    parser.add_argument("--clients", type=int, default=8, help="每个压测进程的并发客户端数 (默认: 8)")
+    parser.add_argument("--duration", type=float, default=10, help="每档计入统计的秒数 (默认: 10)")
+    parser.add_argument("--warmup", type=float, default=2, help="每档预热秒数 (默认: 2)")
+    parser.add_argument("--base-port", type=int, default=18251, help="服务端口起始值，每档使用下一个端口 (默认: 18251)")
+    parser.add_argument("--stub-latency-ms", type=float, default=50, help="天气 stub 的响应延迟 (默认: 50)")
+    parser.add_argument("--startup-timeout", type=float, default=30, help="服务启动超时秒数 (默认: 30)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (默认: 0)")
+    parser.add_argument("--output", help="把 JSON 报告写入文件")
+    parser.add_argument("--json", action="store_true", help="以 JSON 格式输出到标准输出")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_readable(report)
+    if any(r["error_rate"] > 0 for r in report["levels"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
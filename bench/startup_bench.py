@@ -0,0 +1,246 @@
+"""
+冷启动基准：反复以子进程启动 client/client.py（Ollama）或 client/remote.py（OpenAI 兼容），
+测量从进程创建到标准输出出现首个 "You: " 提示符的墙钟时间，随后输入 exit 退出；
+同时汇总客户端写出的启动阶段日志（MCP_STARTUP_LOG，见 client/startup.py）：
+解释器启动、模块导入、后台导入 LLM SDK、连接 MCP 服务与准备阶段的中位数。
+
+服务连接方式可选 stdio（每次启动子进程）、inprocess（MCP_INPROCESS=1）、daemon（MCP_DAEMON=1，
+首次预热运行启动常驻服务，之后复用；常驻服务放在临时目录，基准结束时停止）。
+工具目录缓存使用临时文件，预热运行后即为命中状态；--no-tool-cache 时每次都 list_tools。
+
+用法:
+  python bench/startup_bench.py --client both --mode stdio,inprocess,daemon --runs 5
+  python bench/startup_bench.py --output startup.json
+  python bench/startup_bench.py --baseline startup.json --max-regression 0.2   # 中位数变慢超过 20% 时退出码为 1
+"""
+import argparse
+import json
+import os
+import select
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from load_test import percentile
+
+_root = Path(__file__).resolve().parent.parent
+
+CLIENTS = {
+    "ollama": "client/client.py",
+    "openai": "client/remote.py",
+}
+
+MODES = {
+    "stdio": {},
+    "inprocess": {"MCP_INPROCESS": "1"},
+    "daemon": {"MCP_DAEMON": "1"},
+}
+
+PHASES = ("interpreter", "imports", "backend_import", "servers", "setup", "first_prompt")
+
+_PROMPT = b"You: "
+
+
+def time_to_prompt(cmd: list[str], env: dict, timeout: float) -> tuple[float | None, str]:
+    """启动客户端并等待提示符，返回 (耗时秒数或 None, 输出末尾)。"""
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd,
+        cwd=str(_root),
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    output = b""
+    elapsed = None
+    fd = proc.stdout.fileno()
+    deadline = started + timeout
+    try:
+        while elapsed is None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if not readable:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            output += chunk
+            if _PROMPT in output:
+                elapsed = time.perf_counter() - started
+        if elapsed is not None:
+            proc.stdin.write(b"exit\n")
+            proc.stdin.flush()
+            proc.wait(timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+    return elapsed, output[-1000:].decode("utf-8", errors="replace")
+
+
+def run_case(name: str, mode: str, args, workdir: Path) -> dict:
+    log_path = workdir / f"startup-{name}-{mode}.jsonl"
+    config_path = workdir / "config.json"
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump({"qwen": {"api_key": "bench", "base_url": "http://127.0.0.1:9/v1", "model": "bench"}}, f)
+    env = dict(
+        os.environ,
+        QWEN_CONFIG=str(config_path),
+        MCP_STARTUP_LOG=str(log_path),
+        MCP_TOOL_CACHE="off" if args.no_tool_cache else str(workdir / f"tool-cache-{mode}.json"),
+        MCP_DAEMON_DIR=str(workdir / "daemon"),
+        **MODES[mode],
+    )
+    env.pop("MCP_SERVER_URLS", None)
+    cmd = [sys.executable, str(_root / CLIENTS[name])]
+
+    walls = []
+    failure = None
+    for i in range(args.warmup + args.runs):
+        elapsed, tail = time_to_prompt(cmd, env, args.timeout)
+        if elapsed is None:
+            failure = tail
+            break
+        if i >= args.warmup:
+            walls.append(elapsed)
+
+    records = []
+    if log_path.exists():
+        with open(log_path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()][args.warmup :]
+    phases = {}
+    for phase in PHASES:
+        values = sorted(r["phases_ms"][phase] for r in records if phase in r["phases_ms"])
+        if values:
+            phases[phase] = round(percentile(values, 50), 1)
+    walls.sort()
+    result = {
+        "script": CLIENTS[name],
+        "mode": mode,
+        "runs": len(walls),
+        "wall_ms": {
+            "p50": round(percentile(walls, 50) * 1000, 1) if walls else None,
+            "p95": round(percentile(walls, 95) * 1000, 1) if walls else None,
+            "min": round(walls[0] * 1000, 1) if walls else None,
+        },
+        "phases_p50_ms": phases,
+        "servers_ms": records[-1]["servers_ms"] if records else {},
+    }
+    if failure is not None:
+        result["error"] = "未出现提示符（超时或进程退出）"
+        result["output_tail"] = failure
+    return result
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list[str]:
+    """与基线报告比较各组合的提示符耗时中位数，返回超出允许幅度的说明。"""
+    regressions = []
+    for key, r in report["cases"].items():
+        base = baseline.get("cases", {}).get(key)
+        if not base or not base["wall_ms"]["p50"] or not r["wall_ms"]["p50"]:
+            continue
+        ratio = r["wall_ms"]["p50"] / base["wall_ms"]["p50"] - 1
+        r["vs_baseline"] = round(ratio, 4)
+        if ratio > max_regression:
+            regressions.append(
+                f"{key}: {base['wall_ms']['p50']:.0f} ms -> {r['wall_ms']['p50']:.0f} ms（{ratio:+.0%}，"
+                f"允许 {max_regression:+.0%}）"
+            )
+    return regressions
+
+
+def print_readable(report: dict) -> None:
+    meta = report["meta"]
+    print(f"每组合运行 {meta['runs']} 次（预热 {meta['warmup']} 次），工具目录缓存 {'关闭' if meta['no_tool_cache'] else '开启'}")
+    print(f"{'case':<18}{'p50 ms':>9}{'p95 ms':>9}{'min ms':>9}{'vs base':>9}")
+    for key, r in report["cases"].items():
+        wall = r["wall_ms"]
+        cells = [f"{wall[k]:.0f}" if wall[k] is not None else "-" for k in ("p50", "p95", "min")]
+        vs = f"{r['vs_baseline']:+.0%}" if "vs_baseline" in r else "-"
+        print(f"{key:<18}{cells[0]:>9}{cells[1]:>9}{cells[2]:>9}{vs:>9}")
+        if r["phases_p50_ms"]:
+            print("  阶段中位数 ms：" + " / ".join(f"{k} {v:.0f}" for k, v in r["phases_p50_ms"].items()))
+        for label, server in r["servers_ms"].items():
+            parts = " / ".join(f"{k} {v:.0f}" for k, v in server.items())
+            print(f"  [{label}] {parts}")
+        if "error" in r:
+            print(f"  {r['error']}，输出末尾：\n{r['output_tail']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="客户端冷启动基准（到首个提示符的耗时）")
+    parser.add_argument("--client", choices=["ollama", "openai", "both"], default="both", help="被测客户端 (默认: both)")
+    parser.add_argument("--mode", default="stdio,inprocess", help="逗号分隔：stdio、inprocess、daemon (默认: stdio,inprocess)")
+    parser.add_argument("--runs", type=int, default=5, help="每个组合计入统计的次数 (默认: 5)")
+    parser.add_argument("--warmup", type=int, default=1, help="每个组合的预热次数 (默认: 1)")
+    parser.add_argument("--no-tool-cache", action="store_true", help="关闭工具目录缓存（MCP_TOOL_CACHE=off）")
+    parser.add_argument("--timeout", type=float, default=60, help="单次启动超时秒数 (默认: 60)")
+    parser.add_argument("--baseline", help="基线 JSON 报告（之前的 --output），用于回归检查")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="允许的中位数变慢比例 (默认: 0.2)")
+    parser.add_argument("--output", help="把 JSON 报告写入文件")
+    parser.add_argument("--json", action="store_true", help="以 JSON 格式输出到标准输出")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.mode.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"未知的 --mode：{', '.join(unknown)}")
+    names = ["ollama", "openai"] if args.client == "both" else [args.client]
+
+    cases = {}
+    with tempfile.TemporaryDirectory(prefix="startup-bench-") as tmp:
+        workdir = Path(tmp)
+        try:
+            for mode in modes:
+                for name in names:
+                    print(f"{name}/{mode} ...", file=sys.stderr)
+                    cases[f"{name}/{mode}"] = run_case(name, mode, args, workdir)
+        finally:
+            if "daemon" in modes:
+                subprocess.run(
+                    [sys.executable, str(_root / "client" / "daemon.py"), "stop"],
+                    env=dict(os.environ, MCP_DAEMON_DIR=str(workdir / "daemon")),
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    timeout=30,
+                )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "runs": args.runs,
+            "warmup": args.warmup,
+            "no_tool_cache": args.no_tool_cache,
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+        },
+        "cases": cases,
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        report["meta"]["baseline"] = args.baseline
+        report["regressions"] = regressions
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_readable(report)
+        for line in regressions:
+            print(f"启动变慢：{line}")
+    if regressions or any("error" in r for r in cases.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+腾讯天气接口的本地 stub：返回固定的 observe 数据，可设置响应延迟，用于压测与离线调试 weather.py。
+用法: python bench/weather_stub.py [--port 18080] [--latency-ms 50]
+然后启动 weather.py 时设置 WEATHER_BASE_URL 为打印出的地址模板。
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_OBSERVE = {
+    "degree": "21",
+    "weather": "晴",
+    "humidity": "40",
+    "wind_direction_name": "北风",
+    "wind_power": "2",
+    "update_time": "202601010800",
+}
+
+
+class WeatherStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.05):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url_template(self) -> str:
+        """WEATHER_BASE_URL 的取值（保留 {province} 等占位符）。"""
+        return (
+            f"http://127.0.0.1:{self.server_address[1]}/weather/common"
+            "?province={province}&city={city}&county={county}"
+        )
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        stub: WeatherStub = self.server
+        with stub._lock:
+            stub.requests += 1
+        if stub.latency > 0:
+            time.sleep(stub.latency)
+        body = json.dumps({"status": 200, "data": {"observe": _OBSERVE}}, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地天气接口 stub")
+    parser.add_argument("--port", type=int, default=18080, help="监听端口 (默认: 18080)")
+    parser.add_argument("--latency-ms", type=float, default=50, help="每个请求的模拟延迟毫秒数 (默认: 50)")
+    args = parser.parse_args()
+
+    stub = WeatherStub(args.port, args.latency_ms / 1000)
+    print(f"WEATHER_BASE_URL={stub.url_template}")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+agent 循环：client.py（默认 Ollama）与 remote.py（默认在线 Qwen）共用。
+
+LLM 请求先查回复缓存（llm_cache.py），未命中时经 router.py 发往 MCP_LLM_BACKENDS 中的一个或多个后端
+（见 backends.py）；各后端的回复统一归一化为同一 msg 结构，工具调用、历史压缩、直达指令等与后端无关。
+"""
+import time
+
+from backends import BACKENDS, backend_names
+from connect import default_specs, llm_tool_schemas
+from console import ainput
+from dispatch import ToolDispatcher
+from fast_path import RobotFastPath
+from history import ConversationHistory
+from llm_cache import CompletionCache
+from router import LLMRouter
+from sessions import open_servers
+from startup import StartupProfile
+from streaming import MCP_STREAM, StreamStats
+from tool_select import ToolSelector
+from turn_timing import TurnTimer
+
+
+async def run_agent(script: str, default_backends: str) -> None:
+    profile = StartupProfile(script)
+    names = backend_names(default_backends)
+    # 先读取配置：配置有误时在连接 MCP 服务之前退出
+    configs = {name: BACKENDS[name].load_config() for name in names}
+    profile.mark("imports")
+    # LLM SDK 导入较慢，放到后台线程与连接 MCP 服务并行
+    sdks = {name: profile.import_backend(BACKENDS[name].module) for name in names}
+
+    # 并发连接全部 MCP 服务（stdio 子进程，失败/超时的服务被跳过；MCP_SERVER_URLS 时按需连接并自动重连）
+    async with open_servers(default_specs()) as pool:
+        profile.mark("servers")
+        profile.record_servers(pool)
+        pool.report()
+        all_tools, tool_to_session = pool.tool_map()
+        dispatcher = ToolDispatcher(tool_to_session)
+
+        if not all_tools:
+            print("未加载到任何 MCP 工具，退出。")
+            return
+
+        tools = llm_tool_schemas(all_tools)
+        selector = ToolSelector(tools)
+        stream_stats = StreamStats()
+        timer = TurnTimer(dispatcher)
+        fast_path = RobotFastPath(tools)
+        tools_version = pool.tools_version
+        print("MCP Tools:", [t.name for t in all_tools])
+
+        router = LLMRouter([BACKENDS[name](await sdks[name], configs[name]) for name in names])
+        cache = CompletionCache(router.models)
+        history = ConversationHistory()
+        messages = history.messages
+
+        print("Chat (exit/quit/q to leave, /stats for stats):")
+        profile.first_prompt()
+
+        try:
+            while True:
+                try:
+                    user_text = (await ainput("You: ")).strip()
+                except (EOFError, KeyboardInterrupt):
+                    print("\nBye.")
+                    break
+                if not user_text:
+                    continue
+                if user_text.lower() in ("exit", "quit", "q"):
+                    print("Bye.")
+                    break
+                if user_text == "/stats":
+                    pool.report()
+                    router.report()
+                    cache.report()
+                    history.report()
+                    selector.report()
+                    fast_path.report()
+                    if MCP_STREAM:
+                        stream_stats.report()
+                    timer.report()
+                    continue
+
+                timer.start_turn()
+                messages.append({"role": "user", "content": user_text})
+
+                # 工具列表可能已被后台校验或 tools/list_changed 刷新
+                if tools_version != pool.tools_version:
+                    tools_version = pool.tools_version
+                    tools = llm_tool_schemas(all_tools)
+                    selector = ToolSelector(tools)
+                    fast_path.refresh(tools)
+
+                # 明确的机器人指令（尤其是急停）直达工具，不经过 LLM
+                direct = fast_path.match(user_text)
+                if direct:
+                    started = time.perf_counter()
+                    with timer.phase("dispatch"):
+                        result_text = await dispatcher.call(*direct)
+                    fast_path.record_fast(time.perf_counter() - started)
+                    print(result_text)
+                    messages.append({"role": "assistant", "content": result_text})
+                    timer.end_turn(fast_path=True)
+                    continue
+
+                # 只发送与本条消息最相关的工具
+                turn_tools = selector.select(user_text)
+
+                while True:
+                    with timer.phase("history"):
+                        request_messages = history.compact()
+                    started = time.perf_counter()
+                    tasks = None
+                    # 相同的对话前缀与工具列表直接复用缓存的回复（其中的工具调用照常执行）
+                    msg = cache.lookup(request_messages, turn_tools)
+                    cached = msg is not None
+                    if not cached:
+                        try:
+                            with timer.phase("llm"):
+                                if MCP_STREAM:
+                                    _backend, msg, tasks = await router.stream(
+                                        request_messages, turn_tools, dispatcher, stream_stats
+                                    )
+                                else:
+                                    backend, raw = await router.complete(request_messages, turn_tools)
+                        except Exception as e:
+                            print(f"LLM 调用失败: {e}")
+                            raise
+                        llm_time = time.perf_counter() - started
+                        fast_path.record_llm_round(llm_time)
+
+                        if not MCP_STREAM:
+                            with timer.phase("parse"):
+                                msg = backend.normalize(raw)
+                        cache.store(request_messages, turn_tools, msg, llm_time)
+                    messages.append(msg)
+
+                    if not msg.get("tool_calls"):
+                        # 流式模式下文本已边生成边打印，缓存命中时没有流
+                        if msg.get("content") and (cached or not MCP_STREAM):
+                            print("Assistant:", msg["content"])
+                        break
+
+                    calls = msg["tool_calls"]
+                    # 流式模式下各调用已在参数解析完整时提交；否则此处统一提交（并发执行）
+                    if tasks is None:
+                        tasks = [dispatcher.start(call) for call in calls]
+                    # Exactly one tool_call: print result only, no second LLM round
+                    if len(calls) == 1:
+                        with timer.phase("dispatch"):
+                            result_text = await tasks[0]
+                        print(result_text)
+                        break
+
+                    # Multiple tool_calls: append results in call order, continue to next round
+                    with timer.phase("dispatch"):
+                        await dispatcher.collect_into(calls, tasks, messages)
+
+                timer.end_turn()
+        finally:
+            cache.save()
@@ -0,0 +1,219 @@
+"""
+LLM 后端：本地 Ollama 与 OpenAI 兼容接口（在线 Qwen），供 agent.py 经 router.py 路由调用。
+
+对话历史统一使用与 client.py 一致的 msg 结构：
+{"role": "assistant", "content": str | None, "tool_calls": [{"id", "type", "function": {"name", "arguments"}}] | None}，
+tool_calls 总带 id（Ollama 不返回 id 时本地生成），role=tool 消息据此带上 tool_call_id。
+arguments 保留各后端的原始形式（Ollama 为 dict，OpenAI 为 JSON 字符串），发送前由各后端转换为自己要求的形式，
+因此同一段对话可以在两个后端之间切换。
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+from dispatch import new_call_id
+from streaming import stream_ollama, stream_openai
+
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "qwen2.5:3b")
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+
+_root = Path(__file__).resolve().parent.parent
+# QWEN_CONFIG 可指向其它配置文件（例如 bench/agent_bench.py 指向本地 mock LLM）
+_config_path = Path(os.environ.get("QWEN_CONFIG") or _root / "config.json")
+
+DEFAULT_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+DEFAULT_MODEL = "qwen-plus"
+
+
+def load_qwen_config() -> dict:
+    """从 config.json 读取 qwen 配置；缺失或 api_key 为空时退出。"""
+    if not _config_path.exists():
+        print(f"错误：未找到配置文件 {_config_path}，请复制 config.json.example 为 config.json 并填写 qwen.api_key。")
+        sys.exit(1)
+    try:
+        with open(_config_path, encoding="utf-8") as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        print(f"错误：config.json 格式无效: {e}")
+        sys.exit(1)
+    qwen = data.get("qwen")
+    if not isinstance(qwen, dict):
+        print("错误：config.json 中缺少 'qwen' 对象。")
+        sys.exit(1)
+    api_key = (qwen.get("api_key") or "").strip()
+    if not api_key or api_key == "your-api-key":
+        print("错误：请在 config.json 的 qwen 中设置有效的 api_key。")
+        sys.exit(1)
+    return {
+        "api_key": api_key,
+        "base_url": (qwen.get("base_url") or DEFAULT_BASE_URL).strip() or DEFAULT_BASE_URL,
+        "model": (qwen.get("model") or DEFAULT_MODEL).strip() or DEFAULT_MODEL,
+    }
+
+
+def normalize_message(message) -> dict:
+    """把 OpenAI 的 ChatCompletionMessage 归一化为统一的 msg 结构。"""
+    tool_calls_list = []
+    if getattr(message, "tool_calls", None):
+        for tc in message.tool_calls:
+            if getattr(tc, "function", None):
+                tool_calls_list.append({
+                    "id": getattr(tc, "id", None) or new_call_id(),
+                    "type": "function",
+                    "function": {
+                        "name": tc.function.name,
+                        "arguments": tc.function.arguments or "",
+                    },
+                })
+    return {
+        "role": "assistant",
+        "content": message.content if getattr(message, "content", None) else None,
+        "tool_calls": tool_calls_list if tool_calls_list else None,
+    }
+
+
+def normalize_ollama_message(message) -> dict:
+    """把 Ollama 的 Message 归一化为统一的 msg 结构（补上 tool_call id）。"""
+    tool_calls_list = [
+        {
+            "id": new_call_id(),
+            "type": "function",
+            "function": {
+                "name": tc["function"]["name"],
+                "arguments": tc["function"].get("arguments") or {},
+            },
+        }
+        for tc in message.get("tool_calls") or []
+    ]
+    return {
+        "role": "assistant",
+        "content": message.get("content") or None,
+        "tool_calls": tool_calls_list or None,
+    }
+
+
+def _arguments_dict(arguments) -> dict:
+    if isinstance(arguments, str):
+        try:
+            return json.loads(arguments) if arguments else {}
+        except ValueError:
+            return {}
+    return arguments or {}
+
+
+def _arguments_json(arguments) -> str:
+    return arguments if isinstance(arguments, str) else json.dumps(arguments or {}, ensure_ascii=False)
+
+
+class OllamaBackend:
+    name = "ollama"
+    module = "ollama"
+
+    def __init__(self, sdk, cfg: dict):
+        self.client = sdk.AsyncClient(host=cfg["host"])
+        self.model = cfg["model"]
+        self.hint = f"请确认 Ollama 已启动且已拉取模型，例如 ollama pull {self.model}"
+
+    @staticmethod
+    def load_config() -> dict:
+        return {"model": OLLAMA_MODEL, "host": OLLAMA_HOST}
+
+    @staticmethod
+    def convert(messages: list) -> list:
+        """Ollama 要求 tool_call 参数为 dict；role=tool 消息按 tool_call_id 补上 tool_name。"""
+        converted = []
+        names = {}
+        for m in messages:
+            if m.get("role") == "assistant" and m.get("tool_calls"):
+                m = dict(m)
+                for c in m["tool_calls"]:
+                    names[c.get("id")] = c["function"]["name"]
+                m["tool_calls"] = [
+                    {"function": {"name": c["function"]["name"], "arguments": _arguments_dict(c["function"].get("arguments"))}}
+                    for c in m["tool_calls"]
+                ]
+            elif m.get("role") == "tool" and m.get("tool_call_id") in names:
+                m = {**m, "tool_name": names[m["tool_call_id"]]}
+            converted.append(m)
+        return converted
+
+    async def complete(self, messages: list, tools: list):
+        response = await self.client.chat(model=self.model, messages=self.convert(messages), tools=tools)
+        return response["message"]
+
+    def normalize(self, raw) -> dict:
+        return normalize_ollama_message(raw)
+
+    async def stream(self, messages: list, tools: list, dispatcher, stats):
+        return await stream_ollama(self.client, self.model, self.convert(messages), tools, dispatcher, stats)
+
+
+class OpenAIBackend:
+    name = "qwen"
+    module = "openai"
+
+    def __init__(self, sdk, cfg: dict):
+        self.client = sdk.AsyncOpenAI(api_key=cfg["api_key"], base_url=cfg["base_url"])
+        self.model = cfg["model"]
+        self.hint = f"请检查 {_config_path.name} 中的 api_key、base_url 与 model（{self.model}）"
+
+    @staticmethod
+    def load_config() -> dict:
+        return load_qwen_config()
+
+    @staticmethod
+    def convert(messages: list) -> list:
+        """OpenAI 要求 tool_call 带 id / type，参数为 JSON 字符串。"""
+        converted = []
+        for m in messages:
+            if m.get("role") == "assistant" and m.get("tool_calls"):
+                m = dict(m)
+                m["tool_calls"] = [
+                    {
+                        "id": c.get("id") or new_call_id(),
+                        "type": "function",
+                        "function": {"name": c["function"]["name"], "arguments": _arguments_json(c["function"].get("arguments"))},
+                    }
+                    for c in m["tool_calls"]
+                ]
+            converted.append(m)
+        return converted
+
+    async def complete(self, messages: list, tools: list):
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=self.convert(messages),
+            tools=tools,
+        )
+        if not response.choices:
+            raise RuntimeError("返回无 choices")
+        return response.choices[0].message
+
+    def normalize(self, raw) -> dict:
+        return normalize_message(raw)
+
+    async def stream(self, messages: list, tools: list, dispatcher, stats):
+        return await stream_openai(self.client, self.model, self.convert(messages), tools, dispatcher, stats)
+
+
+# MCP_LLM_BACKENDS 中可用的后端名
+BACKENDS = {
+    OllamaBackend.name: OllamaBackend,
+    OpenAIBackend.name: OpenAIBackend,
+}
+
+
+def backend_names(default: str) -> list[str]:
+    """MCP_LLM_BACKENDS（逗号分隔，按优先级）指定的后端；未设置时为各入口脚本的默认后端。"""
+    raw = os.environ.get("MCP_LLM_BACKENDS", "").strip() or default
+    names = []
+    for name in raw.split(","):
+        name = name.strip().lower()
+        if not name or name in names:
+            continue
+        if name not in BACKENDS:
+            print(f"错误：未知的 LLM 后端 {name}（MCP_LLM_BACKENDS 可选 {', '.join(BACKENDS)}）。")
+            sys.exit(1)
+        names.append(name)
+    return names
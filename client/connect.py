@@ -0,0 +1,361 @@
+"""
+MCP 服务连接：client.py 与 remote.py 共用的并发启动逻辑。
+
+每个服务由独立任务负责 spawn/连接、initialize 与 list_tools，互不阻塞；
+单个服务超时或失败只会被跳过，并报告各服务的启动耗时。
+各 transport 的实现按 spec.kind 在首次使用时才导入，缩短客户端启动时间（见 startup.py）。
+"""
+import asyncio
+import importlib.util
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from mcp import types
+from mcp.client.session import ClientSession
+
+from tool_cache import ToolCatalog
+
+_server_dir = Path(__file__).resolve().parent.parent / "server"
+
+# 本地代码集成（stdio）：按脚本启动子进程
+MCP_SERVERS = [
+    ("server.py", "hello"),
+    ("server2.py", "time"),
+    ("weather.py", "weather"),
+    ("move.py", "move"),
+]
+
+MCP_INPROCESS = os.environ.get("MCP_INPROCESS", "0") not in ("0", "false", "no", "")
+# 常驻服务模式（见 daemon.py）
+MCP_DAEMON = os.environ.get("MCP_DAEMON", "0") not in ("0", "false", "no", "")
+
+# 单个服务从启动到 list_tools 完成的超时（秒）
+MCP_CONNECT_TIMEOUT = float(os.environ.get("MCP_CONNECT_TIMEOUT", "15"))
+
+# stdio 子进程只继承 MCP SDK 认为安全的少数环境变量；这些前缀的服务配置额外透传
+SERVER_ENV_PREFIXES = ("WEATHER_", "MOVE_", "MCP_METRICS", "MCP_PROFILE_")
+
+
+def server_urls_from_env() -> list[str]:
+    """
+    本地接口集成（REST）：MCP_SERVER_URLS 逗号分隔的 Streamable HTTP 地址，例如：
+    http://127.0.0.1:8001/mcp,http://127.0.0.1:8002/mcp,http://127.0.0.1:8003/mcp
+    """
+    raw = os.environ.get("MCP_SERVER_URLS", "").strip()
+    return [u.strip() for u in raw.split(",") if u.strip()]
+
+
+@dataclass
+class ServerSpec:
+    """
+    待连接的 MCP 服务：kind 为 "stdio" / "inprocess" / "daemon"（address 为脚本路径）或 "http"（address 为 URL）。
+    """
+
+    label: str
+    kind: str
+    address: str
+
+
+def http_specs(urls: list[str]) -> list[ServerSpec]:
+    return [ServerSpec(url, "http", url) for url in urls]
+
+
+def stdio_specs(kind: str = "stdio") -> list[ServerSpec]:
+    """
+    MCP_SERVERS 中存在的脚本：kind="stdio" 时各自以子进程启动，
+    kind="inprocess" 时直接导入脚本中的 FastMCP 对象，经内存流在本进程内连接，
+    kind="daemon" 时连接（必要时启动）后台常驻的服务进程。
+    """
+    specs = []
+    for script_name, label in MCP_SERVERS:
+        script_path = _server_dir / script_name
+        if script_path.exists():
+            specs.append(ServerSpec(label, kind, str(script_path)))
+    return specs
+
+
+def default_specs() -> list[ServerSpec]:
+    """
+    设置了 MCP_SERVER_URLS 时走 HTTP；否则按 MCP_SERVERS 启动 stdio 子进程，
+    MCP_INPROCESS=1 时改为在本进程内托管（无子进程，冷启动更快；需要隔离时保持默认），
+    MCP_DAEMON=1 时连接跨运行复用的常驻服务进程。
+    """
+    urls = server_urls_from_env()
+    if urls:
+        return http_specs(urls)
+    if MCP_DAEMON:
+        return stdio_specs("daemon")
+    return stdio_specs("inprocess" if MCP_INPROCESS else "stdio")
+
+
+@dataclass
+class ServerHandle:
+    """单个服务的连接结果。session 为 None 表示启动失败（见 error）。"""
+
+    spec: ServerSpec
+    session: ClientSession | None = None
+    init_result: object = None
+    tools: list = field(default_factory=list)
+    elapsed: float = 0.0
+    # 启动各阶段耗时（秒）：connect / initialize / list_tools
+    phases: dict = field(default_factory=dict)
+    error: str | None = None
+    from_cache: bool = False
+    wake: asyncio.Event = field(default_factory=asyncio.Event)
+    tools_stale: bool = False
+
+    @property
+    def server_name(self) -> str:
+        info = getattr(self.init_result, "serverInfo", None)
+        return getattr(info, "name", "")
+
+
+class ServerPool:
+    """
+    并发连接一组 MCP 服务的异步上下文管理器。
+
+    anyio 的 cancel scope 要求在同一任务中进入和退出 transport 上下文，
+    因此每个服务由一个常驻任务持有其 transport 与 session，直到 pool 关闭。
+
+    工具目录命中磁盘缓存（见 tool_cache.py）时跳过启动阶段的 list_tools，
+    由常驻任务在后台重新拉取校验；收到 tools/list_changed 通知时同样重新拉取。
+    all_tools / tool_to_session 原地更新，tools_version 随之递增。
+    """
+
+    def __init__(
+        self,
+        specs: list[ServerSpec],
+        timeout: float = MCP_CONNECT_TIMEOUT,
+        catalog: ToolCatalog | None = None,
+    ):
+        self.specs = specs
+        self.timeout = timeout
+        self.catalog = ToolCatalog() if catalog is None else catalog
+        self.handles: list[ServerHandle] = []
+        self.all_tools: list = []
+        self.tool_to_session: dict[str, ClientSession] = {}
+        self.tools_version = 0
+        self._closing = False
+        self._tasks: list[asyncio.Task] = []
+
+    async def __aenter__(self) -> "ServerPool":
+        ready = []
+        for spec in self.specs:
+            handle = ServerHandle(spec)
+            event = asyncio.Event()
+            self.handles.append(handle)
+            ready.append(event)
+            self._tasks.append(asyncio.create_task(self._run(handle, event)))
+        await asyncio.gather(
+            *(self._wait_ready(h, e, t) for h, e, t in zip(self.handles, ready, self._tasks))
+        )
+        self._rebuild()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._closing = True
+        for h in self.handles:
+            h.wake.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _wait_ready(self, handle: ServerHandle, event: asyncio.Event, task: asyncio.Task) -> None:
+        try:
+            await asyncio.wait_for(event.wait(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            task.cancel()
+            handle.session = None
+            handle.error = f"超时（{self.timeout:g}s）"
+            handle.elapsed = self.timeout
+
+    def _notification_handler(self, handle: ServerHandle):
+        async def on_message(message) -> None:
+            # 在 session 的接收循环内不能发请求，只标记并唤醒常驻任务去重新拉取
+            if isinstance(message, types.ServerNotification) and isinstance(
+                message.root, types.ToolListChangedNotification
+            ):
+                handle.tools_stale = True
+                handle.wake.set()
+
+        return on_message
+
+    async def _run(self, handle: ServerHandle, ready: asyncio.Event) -> None:
+        start = time.perf_counter()
+        try:
+            async with _open_transport(handle.spec) as (read, write):
+                handle.phases["connect"] = time.perf_counter() - start
+                async with ClientSession(
+                    read, write, message_handler=self._notification_handler(handle)
+                ) as session:
+                    handle.init_result = await session.initialize()
+                    handle.phases["initialize"] = time.perf_counter() - start - handle.phases["connect"]
+                    mark = time.perf_counter()
+                    cache_key = self.catalog.key_for(handle.spec, handle.init_result)
+                    cached = self.catalog.lookup(cache_key[0])
+                    if cached is not None:
+                        handle.tools = cached
+                        handle.from_cache = True
+                    else:
+                        handle.tools = await self._fetch_tools(session, cache_key)
+                    handle.phases["list_tools"] = time.perf_counter() - mark
+                    handle.session = session
+                    handle.elapsed = time.perf_counter() - start
+                    ready.set()
+
+                    # 缓存命中：后台校验一次
+                    handle.tools_stale = handle.from_cache
+                    while not self._closing:
+                        if handle.tools_stale:
+                            handle.tools_stale = False
+                            await self._revalidate(handle, session, cache_key)
+                            continue
+                        await handle.wake.wait()
+                        handle.wake.clear()
+        except Exception as e:
+            if not ready.is_set():
+                handle.error = _describe_error(e)
+                handle.elapsed = time.perf_counter() - start
+        finally:
+            ready.set()
+
+    async def _fetch_tools(self, session: ClientSession, cache_key: tuple[str, str]) -> list:
+        list_result = await session.list_tools()
+        tools = list(list_result.tools)
+        self.catalog.store(*cache_key, tools)
+        return tools
+
+    async def _revalidate(self, handle: ServerHandle, session: ClientSession, cache_key) -> None:
+        try:
+            tools = await self._fetch_tools(session, cache_key)
+        except Exception as e:
+            self.catalog.invalidate(cache_key[0])
+            print(f"[{handle.spec.label}] 刷新工具列表失败: {_describe_error(e)}", file=sys.stderr)
+            return
+        if not ToolCatalog.same_tools(tools, handle.tools):
+            handle.tools = tools
+            if handle.session is not None:
+                self._rebuild()
+
+    def _rebuild(self) -> None:
+        self.all_tools[:] = []
+        self.tool_to_session.clear()
+        for h in self.connected:
+            for t in h.tools:
+                self.all_tools.append(t)
+                self.tool_to_session[t.name] = h.session
+        self.tools_version += 1
+
+    @property
+    def connected(self) -> list[ServerHandle]:
+        return [h for h in self.handles if h.session is not None]
+
+    def tool_map(self) -> tuple[list, dict[str, ClientSession]]:
+        """
+        返回 (all_tools, tool_to_session)。两者由 pool 原地维护，
+        工具列表变化后内容会更新；需要重建 LLM 工具 schema 时比较 tools_version。
+        """
+        return self.all_tools, self.tool_to_session
+
+    def report_lines(self) -> list[str]:
+        """各服务启动耗时与结果，每个服务一行。"""
+        lines = []
+        for h in self.handles:
+            ms = h.elapsed * 1000
+            if h.session is not None:
+                source = "（工具列表来自缓存）" if h.from_cache else ""
+                lines.append(f"[{h.spec.label}] 已连接，{len(h.tools)} 个工具{source}，耗时 {ms:.0f} ms")
+            else:
+                lines.append(f"连接 {h.spec.address} 失败（{ms:.0f} ms）: {h.error}")
+        return lines
+
+    def report(self) -> None:
+        """打印各服务启动耗时与结果。"""
+        for line in self.report_lines():
+            print(line)
+
+
+def llm_tool_schemas(all_tools: list) -> list[dict]:
+    """把 MCP 工具转为 Ollama / OpenAI 通用的 function 工具 schema 列表。"""
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": t.name,
+                "description": t.description or "",
+                "parameters": t.inputSchema or {},
+            },
+        }
+        for t in all_tools
+    ]
+
+
+def _describe_error(e: BaseException) -> str:
+    """展开 anyio TaskGroup 抛出的 ExceptionGroup，取第一个真实异常作为说明。"""
+    while isinstance(e, BaseExceptionGroup) and e.exceptions:
+        e = e.exceptions[0]
+    return str(e) or type(e).__name__
+
+
+_inprocess_servers: dict[str, object] = {}
+
+
+def load_inprocess_server(script_path: str):
+    """按路径导入服务脚本（不执行其 __main__），返回其中的 FastMCP 对象 mcp；同一脚本只导入一次。"""
+    if script_path not in _inprocess_servers:
+        # 服务脚本会导入同目录下的共用模块（如 mcp_metrics）
+        server_dir = str(Path(script_path).resolve().parent)
+        if server_dir not in sys.path:
+            sys.path.insert(0, server_dir)
+        name = f"_mcp_inprocess_{Path(script_path).stem}"
+        module_spec = importlib.util.spec_from_file_location(name, script_path)
+        module = importlib.util.module_from_spec(module_spec)
+        sys.modules[name] = module
+        module_spec.loader.exec_module(module)
+        _inprocess_servers[script_path] = module.mcp
+    return _inprocess_servers[script_path]
+
+
+@asynccontextmanager
+async def _open_transport(spec: ServerSpec):
+    """按 spec.kind 打开 transport，统一产出 (read, write)。"""
+    if spec.kind == "http":
+        from mcp.client.streamable_http import streamable_http_client
+
+        async with streamable_http_client(spec.address) as (read, write, _):
+            yield read, write
+        return
+    if spec.kind == "daemon":
+        from daemon import open_daemon_transport
+
+        async with open_daemon_transport(spec) as (read, write):
+            yield read, write
+        return
+    if spec.kind == "inprocess":
+        import anyio
+        from mcp.shared.memory import create_client_server_memory_streams
+
+        server = load_inprocess_server(spec.address)._mcp_server
+        async with create_client_server_memory_streams() as (client_streams, server_streams):
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(
+                    server.run,
+                    server_streams[0],
+                    server_streams[1],
+                    server.create_initialization_options(),
+                )
+                yield client_streams
+                tg.cancel_scope.cancel()
+        return
+    from mcp.client.stdio import StdioServerParameters, stdio_client
+
+    params = StdioServerParameters(
+        command="python",
+        args=[spec.address],
+        cwd=_server_dir,
+        env={k: v for k, v in os.environ.items() if k.startswith(SERVER_ENV_PREFIXES)},
+    )
+    async with stdio_client(params) as (read, write):
+        yield read, write
@@ -0,0 +1,34 @@
+"""
+终端交互：在后台线程读取输入，避免 input() 阻塞事件循环
+（否则等待用户输入时，工具列表刷新、通知处理等后台任务都无法运行）。
+"""
+import asyncio
+import threading
+
+
+async def ainput(prompt: str = "") -> str:
+    """异步版 input()；EOF 时抛出 EOFError。"""
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+
+    def worker() -> None:
+        try:
+            line = input(prompt)
+        except BaseException as e:
+            loop.call_soon_threadsafe(_set_exception, fut, e)
+        else:
+            loop.call_soon_threadsafe(_set_result, fut, line)
+
+    # daemon 线程：Ctrl-C 退出时不必等待阻塞中的 input()
+    threading.Thread(target=worker, daemon=True).start()
+    return await fut
+
+
+def _set_result(fut: asyncio.Future, value) -> None:
+    if not fut.done():
+        fut.set_result(value)
+
+
+def _set_exception(fut: asyncio.Future, exc: BaseException) -> None:
+    if not fut.done():
+        fut.set_exception(exc)
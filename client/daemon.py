@@ -0,0 +1,189 @@
+"""
+常驻服务模式（MCP_DAEMON=1，默认关闭）：server/ 下的各服务作为后台常驻进程，以 streamable-http 监听
+MCP_DAEMON_DIR 下的 Unix 套接字（<标签>.sock），多次运行 client.py / remote.py 直接连接已预热的服务，
+省去解释器启动、导入与子进程握手。
+
+- 连接时先读取服务的 /health：不存在（或已退出）则在后台启动，服务脚本有改动（内容哈希不同）则重启；
+  同一服务的检查与启动由文件锁串行化，多个客户端同时运行不会重复启动；
+- 服务在没有客户端连接且空闲 MCP_DAEMON_IDLE 秒后自行退出（0 表示不退出），日志写入 <标签>.log；
+- move 服务常驻时机器人状态（姿态、位姿等）跨客户端运行保留。
+
+查看与停止：python client/daemon.py status | stop
+"""
+import asyncio
+import fcntl
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from mcp.client.streamable_http import streamable_http_client
+from mcp.shared._httpx_utils import MCP_DEFAULT_SSE_READ_TIMEOUT, MCP_DEFAULT_TIMEOUT
+
+from connect import MCP_CONNECT_TIMEOUT, SERVER_ENV_PREFIXES, ServerSpec, _server_dir, stdio_specs
+from tool_cache import _file_hash
+
+MCP_DAEMON_DIR = os.environ.get("MCP_DAEMON_DIR", "").strip() or os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"mcp-demo-{os.getuid()}"
+)
+MCP_DAEMON_IDLE = float(os.environ.get("MCP_DAEMON_IDLE", "600"))
+
+# 每个服务最近一次 attach 的结果，供 /stats 报告
+ATTACH_INFO: dict[str, dict] = {}
+
+
+def daemon_specs() -> list[ServerSpec]:
+    return stdio_specs("daemon")
+
+
+def _paths(spec: ServerSpec) -> tuple[str, str, str]:
+    base = os.path.join(MCP_DAEMON_DIR, spec.label)
+    return f"{base}.sock", f"{base}.lock", f"{base}.log"
+
+
+def _uds_client(sock_path: str, timeout: httpx.Timeout) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(uds=sock_path, verify=False), timeout=timeout)
+
+
+async def health(spec: ServerSpec, timeout: float = 2.0) -> dict | None:
+    """读取常驻服务的 /health；套接字不存在或无响应时返回 None。"""
+    sock_path = _paths(spec)[0]
+    if not os.path.exists(sock_path):
+        return None
+    try:
+        async with _uds_client(sock_path, httpx.Timeout(timeout)) as client:
+            resp = await client.get("http://localhost/health")
+            resp.raise_for_status()
+            return resp.json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+def _spawn(spec: ServerSpec) -> int:
+    sock_path, _lock_path, log_path = _paths(spec)
+    env = {k: v for k, v in os.environ.items() if k.startswith(SERVER_ENV_PREFIXES)}
+    env.update(
+        PATH=os.environ.get("PATH", ""),
+        MCP_TRANSPORT="streamable-http",
+        MCP_UDS=sock_path,
+        MCP_IDLE_EXIT=str(MCP_DAEMON_IDLE),
+    )
+    with open(log_path, "ab") as log:
+        proc = subprocess.Popen(
+            [sys.executable, spec.address],
+            cwd=str(_server_dir),
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,  # 脱离客户端的进程组，客户端退出（含 Ctrl+C）后继续运行
+        )
+    return proc.pid
+
+
+async def _stop(info: dict, spec: ServerSpec) -> None:
+    try:
+        os.kill(info["pid"], signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and await health(spec, timeout=0.5) is not None:
+        await asyncio.sleep(0.05)
+
+
+async def _locked(lock_path: str):
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+    await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+    return fd
+
+
+async def attach(spec: ServerSpec) -> dict:
+    """确保该服务的常驻进程在运行且为当前代码，返回 attach 信息（是否新启动、pid、耗时）。"""
+    started = time.perf_counter()
+    os.makedirs(MCP_DAEMON_DIR, mode=0o700, exist_ok=True)
+    _sock_path, lock_path, log_path = _paths(spec)
+    code = _file_hash(spec.address)
+    fd = await _locked(lock_path)
+    try:
+        info = await health(spec)
+        action = "复用"
+        if info is not None and info.get("code") != code:
+            await _stop(info, spec)
+            info, action = None, "重启（代码已更新）"
+        if info is None:
+            if action == "复用":
+                action = "启动"
+            _spawn(spec)
+            deadline = time.monotonic() + MCP_CONNECT_TIMEOUT
+            while info is None:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"常驻服务启动超时（{MCP_CONNECT_TIMEOUT:g}s），日志见 {log_path}")
+                await asyncio.sleep(0.05)
+                info = await health(spec, timeout=0.5)
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+    result = {
+        "action": action,
+        "pid": info["pid"],
+        "uptime_s": info["uptime_s"],
+        "attach_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    ATTACH_INFO[spec.label] = result
+    print(f"[daemon] {spec.label}：{describe(spec)}")
+    return result
+
+
+@asynccontextmanager
+async def open_daemon_transport(spec: ServerSpec):
+    """attach 后经 Unix 套接字连接常驻服务，产出 (read, write)。"""
+    await attach(spec)
+    timeout = httpx.Timeout(MCP_DEFAULT_TIMEOUT, read=MCP_DEFAULT_SSE_READ_TIMEOUT)
+    async with _uds_client(_paths(spec)[0], timeout) as client:
+        async with streamable_http_client("http://localhost/mcp", http_client=client) as (read, write, _):
+            yield read, write
+
+
+def describe(spec: ServerSpec) -> str:
+    info = ATTACH_INFO.get(spec.label)
+    if info is None:
+        return "常驻服务尚未连接"
+    return f"常驻服务 pid {info['pid']}（{info['action']}，attach {info['attach_ms']:.0f} ms）"
+
+
+async def _status() -> None:
+    print(f"常驻服务目录 {MCP_DAEMON_DIR}，空闲退出 {MCP_DAEMON_IDLE:g}s")
+    for spec in daemon_specs():
+        info = await health(spec)
+        if info is None:
+            print(f"[{spec.label}] 未运行")
+            continue
+        current = "当前代码" if info.get("code") == _file_hash(spec.address) else "旧代码（下次连接时重启）"
+        rss = f"{info['rss_bytes'] / 1024 / 1024:.0f} MB" if info.get("rss_bytes") else "-"
+        print(
+            f"[{spec.label}] pid {info['pid']}，已运行 {info['uptime_s']:g}s，客户端 {info['clients']}，"
+            f"空闲 {info['idle_s']:g}s，请求 {info['requests']} 次，RSS {rss}，{current}"
+        )
+
+
+async def _stop_all() -> None:
+    for spec in daemon_specs():
+        info = await health(spec)
+        if info is not None:
+            await _stop(info, spec)
+            print(f"[{spec.label}] 已停止（pid {info['pid']}）")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command == "status":
+        asyncio.run(_status())
+    elif command == "stop":
+        asyncio.run(_stop_all())
+    else:
+        print("用法: python client/daemon.py status | stop")
+        sys.exit(2)
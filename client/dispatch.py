@@ -0,0 +1,116 @@
+"""
+工具调度：把一轮 LLM 回复中的多个 tool_calls 并发分发到各自的 MCP session。
+
+- 每个 session 有独立的并发上限（MCP_TOOL_CONCURRENCY）；
+- 名称匹配 MCP_ORDERED_TOOLS（fnmatch 模式，逗号分隔，默认 robot_* 及网关加前缀后的 *__robot_*）的调用
+  在同一 session 内严格按原顺序串行执行，例如机器人运动；
+- 结果按原 tool_calls 顺序写回 role=tool 消息，保证对话确定性。
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from fnmatch import fnmatchcase
+
+MCP_TOOL_CONCURRENCY = int(os.environ.get("MCP_TOOL_CONCURRENCY", "4"))
+MCP_ORDERED_TOOLS = [
+    p.strip() for p in os.environ.get("MCP_ORDERED_TOOLS", "robot_*,*__robot_*").split(",") if p.strip()
+]
+
+
+def parse_tool_args(call: dict) -> dict:
+    """取出 tool_call 的参数：兼容 JSON 字符串（OpenAI）与 dict（Ollama）。"""
+    raw_args = call["function"].get("arguments")
+    if isinstance(raw_args, str):
+        return json.loads(raw_args) if raw_args else {}
+    return raw_args or {}
+
+
+def new_call_id() -> str:
+    """为不返回 id 的 tool_call（Ollama）生成 id，使对话可在 OpenAI 兼容后端上继续。"""
+    return f"call_{uuid.uuid4().hex[:24]}"
+
+
+def tool_message(call: dict, result_text: str) -> dict:
+    """构造与 call 对应的 role=tool 消息。"""
+    tool_id = call.get("id")
+    if tool_id:
+        return {"role": "tool", "content": result_text, "tool_call_id": tool_id}
+    return {"role": "tool", "content": result_text}
+
+
+class ToolDispatcher:
+    def __init__(
+        self,
+        tool_to_session: dict,
+        per_session_limit: int = MCP_TOOL_CONCURRENCY,
+        ordered_patterns: list[str] | None = None,
+    ):
+        self.tool_to_session = tool_to_session
+        self.per_session_limit = max(1, per_session_limit)
+        self.ordered_patterns = MCP_ORDERED_TOOLS if ordered_patterns is None else ordered_patterns
+        self._limits: dict[int, asyncio.Semaphore] = {}
+        self._tails: dict[int, asyncio.Task] = {}  # session -> 最近提交的有序调用
+        self.parse_time = 0.0  # 工具参数 JSON 解析累计耗时（见 turn_timing.py）
+
+    def is_ordered(self, tname: str) -> bool:
+        return any(fnmatchcase(tname, p) for p in self.ordered_patterns)
+
+    def _limit(self, session) -> asyncio.Semaphore:
+        key = id(session)
+        if key not in self._limits:
+            self._limits[key] = asyncio.Semaphore(self.per_session_limit)
+        return self._limits[key]
+
+    async def call(self, tname: str, tool_args: dict) -> str:
+        """执行单个工具调用，返回结果文本；未知工具或调用异常也以文本返回。"""
+        session = self.tool_to_session.get(tname)
+        if not session:
+            return f"未知工具: {tname}"
+        async with self._limit(session):
+            try:
+                result = await session.call_tool(tname, tool_args)
+            except Exception as e:
+                return f"工具 {tname} 调用失败: {e}"
+        return result.content[0].text if result.content else ""
+
+    async def _call_raw(self, call: dict) -> str:
+        started = time.perf_counter()
+        try:
+            tool_args = parse_tool_args(call)
+        except json.JSONDecodeError as e:
+            return f"工具参数不是合法 JSON: {e}"
+        finally:
+            self.parse_time += time.perf_counter() - started
+        return await self.call(call["function"]["name"], tool_args)
+
+    def start(self, call: dict) -> asyncio.Task:
+        """
+        立即开始执行一个 tool_call，返回产出结果文本的 Task。
+        有序工具会排在同一 session 上一个有序调用之后，因此可以边解析边提交（见流式模式）。
+        """
+        tname = call["function"]["name"]
+        session = self.tool_to_session.get(tname)
+        if session is None or not self.is_ordered(tname):
+            return asyncio.create_task(self._call_raw(call))
+        key = id(session)
+        task = asyncio.create_task(self._after(self._tails.get(key), call))
+        self._tails[key] = task
+        return task
+
+    async def _after(self, prev: asyncio.Task | None, call: dict) -> str:
+        if prev is not None:
+            await asyncio.gather(prev, return_exceptions=True)
+        return await self._call_raw(call)
+
+    async def run(self, calls: list[dict]) -> list[str]:
+        """并发执行 calls，返回与 calls 等长、同序的结果文本列表。"""
+        return list(await asyncio.gather(*(self.start(call) for call in calls)))
+
+    @staticmethod
+    async def collect_into(calls: list[dict], tasks: list, messages: list) -> None:
+        """等待已提交的 tasks（与 calls 同序），按原顺序把 role=tool 结果追加到 messages。"""
+        results = await asyncio.gather(*tasks)
+        for call, result_text in zip(calls, results):
+            messages.append(tool_message(call, result_text))
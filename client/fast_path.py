@@ -0,0 +1,139 @@
+"""
+机器人直达指令：在 LLM 之前用确定性的模式表解析简短、明确的运动指令，
+命中时直接调用 move 服务的工具，不经过模型；含糊或复合的指令交给 LLM。
+
+模式表中每条规则声明目标工具与参数，构造时对照当前工具 schema 过滤：
+工具不存在或参数不在 schema 中的规则不会启用。急停类指令排在最前，优先匹配。
+"""
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable
+
+MCP_FAST_PATH = os.environ.get("MCP_FAST_PATH", "1") not in ("0", "false", "no", "")
+
+_CN_DIGITS = {"零": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_NUM = r"(?P<n>\d+(?:\.\d+)?|[零一二两三四五六七八九十百]+)"
+# 可省略的前后缀：称呼、礼貌用语与句末语气词/标点
+_PREFIX = r"(?:机器人|机器狗)?[，,]?(?:请|麻烦)?(?:你)?"
+_SUFFIX = r"(?:吧|一下)?[。！!.]*"
+
+
+def parse_number(text: str) -> float | None:
+    """解析阿拉伯数字或一百以内的中文数字（如 三、十五、二十、一百）。"""
+    if re.fullmatch(r"\d+(?:\.\d+)?", text):
+        return float(text)
+    if text == "百" or text == "一百":
+        return 100.0
+    if "十" in text:
+        tens, _, ones = text.partition("十")
+        t = _CN_DIGITS.get(tens, None) if tens else 1
+        o = _CN_DIGITS.get(ones, None) if ones else 0
+        if t is None or o is None:
+            return None
+        return float(t * 10 + o)
+    if len(text) == 1 and text in _CN_DIGITS:
+        return float(_CN_DIGITS[text])
+    return None
+
+
+@dataclass
+class Rule:
+    tool: str
+    pattern: re.Pattern
+    build: Callable[[re.Match], dict | None]
+
+
+def _walk_args(m: re.Match) -> dict | None:
+    steps = parse_number(m.group("n"))
+    if steps is None or steps <= 0 or steps != int(steps):
+        return None
+    direction = "backward" if m.group("dir") in ("后", "退") else "forward"
+    return {"direction": direction, "steps": int(steps)}
+
+
+def _turn_args(m: re.Match) -> dict | None:
+    degrees = parse_number(m.group("n"))
+    if degrees is None or not 0 < degrees <= 360:
+        return None
+    return {"direction": "left" if m.group("dir") == "左" else "right", "degrees": degrees}
+
+
+def _rule(tool: str, body: str, build: Callable[[re.Match], dict | None]) -> Rule:
+    return Rule(tool, re.compile(f"{_PREFIX}{body}{_SUFFIX}", re.IGNORECASE), build)
+
+
+RULES = [
+    _rule("robot_emergency_stop", r"(?:急停|紧急停止|立即停止|停下|停止|别动|stop)", lambda m: {"enable": True}),
+    _rule("robot_emergency_stop", r"(?:解除|关闭|取消)(?:软件)?急停", lambda m: {"enable": False}),
+    _rule("robot_stand", r"(?:站起来|站起|站立|起立)", lambda m: {}),
+    _rule("robot_lie_down", r"(?:趴下|卧倒|趴着)", lambda m: {}),
+    _rule(
+        "robot_walk",
+        rf"(?:向|往)?(?P<dir>前|后)(?:走|进|退)?{_NUM}步",
+        _walk_args,
+    ),
+    _rule("robot_walk", rf"(?P<dir>退){_NUM}步", _walk_args),
+    _rule(
+        "robot_turn",
+        rf"(?:向|往)?(?P<dir>左|右)转(?:弯)?{_NUM}度",
+        _turn_args,
+    ),
+    _rule("robot_set_gait_mode", r"(?:切换|改)?(?:为|到|成)?跑步模式", lambda m: {"mode": "run"}),
+    _rule("robot_set_gait_mode", r"(?:切换|改)?(?:为|到|成)?行走模式", lambda m: {"mode": "walk"}),
+    _rule("robot_get_status", r"(?:查询|查看)?(?:当前)?状态", lambda m: {}),
+]
+
+
+class RobotFastPath:
+    def __init__(self, schemas: list[dict], enabled: bool = MCP_FAST_PATH):
+        self.enabled = enabled
+        self.refresh(schemas)
+        self.hits = 0
+        self.misses = 0
+        self.fast_time = 0.0
+        self._llm_rounds = 0
+        self._llm_time = 0.0
+
+    def refresh(self, schemas: list[dict]) -> None:
+        """按当前工具 schema 重新过滤规则（工具列表变化时调用），统计保留。"""
+        props_by_tool = {}
+        for s in schemas:
+            fn = s.get("function") or {}
+            props_by_tool[fn.get("name")] = set((fn.get("parameters") or {}).get("properties") or {})
+        self.rules = [r for r in RULES if r.tool in props_by_tool]
+        self._props = props_by_tool
+
+    def match(self, text: str) -> tuple[str, dict] | None:
+        """命中返回 (工具名, 参数)，否则返回 None（交给 LLM）。"""
+        if not self.enabled:
+            return None
+        text = text.strip()
+        for rule in self.rules:
+            m = rule.pattern.fullmatch(text)
+            if not m:
+                continue
+            args = rule.build(m)
+            if args is None or not set(args) <= self._props[rule.tool]:
+                break
+            self.hits += 1
+            return rule.tool, args
+        self.misses += 1
+        return None
+
+    def record_fast(self, seconds: float) -> None:
+        self.fast_time += seconds
+
+    def record_llm_round(self, seconds: float) -> None:
+        """记录一次 LLM 请求耗时，用于估算直达指令节省的时间。"""
+        self._llm_rounds += 1
+        self._llm_time += seconds
+
+    def report(self) -> None:
+        total = self.hits + self.misses
+        avg_llm = self._llm_time / self._llm_rounds if self._llm_rounds else None
+        line = f"[fast-path] 直达 {self.hits}/{total} 条指令"
+        if avg_llm is not None and self.hits:
+            saved = self.hits * avg_llm - self.fast_time
+            line += f"，LLM 平均每轮 {avg_llm * 1000:.0f} ms，估计节省 {saved:.2f} s"
+        print(line)
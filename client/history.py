@@ -0,0 +1,165 @@
+"""
+对话历史管理：按 token 预算压缩发送给 LLM 的 messages。
+
+每轮请求前调用 compact()：
+1. 最近 MCP_HISTORY_KEEP_TURNS 轮（以 user 消息分轮）原样保留；
+2. 更早轮次中的工具结果截断到 MCP_HISTORY_TOOL_CHARS 个字符；
+3. 仍超出 MCP_HISTORY_TOKENS 时按轮丢弃最早的对话，
+   可选（MCP_HISTORY_SUMMARY=1）把被丢弃轮次摘要为一条 system 消息。
+整轮丢弃保证 assistant 的 tool_calls 与对应的 tool 结果不会被拆开。
+"""
+import json
+import os
+
+MCP_HISTORY_TOKENS = int(os.environ.get("MCP_HISTORY_TOKENS", "6000"))
+MCP_HISTORY_KEEP_TURNS = int(os.environ.get("MCP_HISTORY_KEEP_TURNS", "4"))
+MCP_HISTORY_TOOL_CHARS = int(os.environ.get("MCP_HISTORY_TOOL_CHARS", "300"))
+MCP_HISTORY_SUMMARY = os.environ.get("MCP_HISTORY_SUMMARY", "1") not in ("0", "false", "no", "")
+
+SUMMARY_PREFIX = "早前对话摘要："
+_SUMMARY_MAX_LINES = 12
+_SUMMARY_SNIPPET = 60
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：CJK 字符约 1 字 1 token，其余约 4 字符 1 token。"""
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if "\u2e80" <= ch <= "\u9fff" or "\uf900" <= ch <= "\ufaff")
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _tool_calls_text(msg) -> str:
+    calls = msg.get("tool_calls") or []
+    parts = []
+    for call in calls:
+        fn = call.get("function") if hasattr(call, "get") else getattr(call, "function", None)
+        if fn is None:
+            continue
+        name = fn.get("name") if hasattr(fn, "get") else getattr(fn, "name", "")
+        args = fn.get("arguments") if hasattr(fn, "get") else getattr(fn, "arguments", "")
+        if not isinstance(args, str):
+            args = json.dumps(args, ensure_ascii=False, default=str)
+        parts.append(f"{name}{args}")
+    return " ".join(parts)
+
+
+def message_tokens(msg) -> int:
+    """单条消息的估算 token 数（含约 4 token 的角色/格式开销）。"""
+    return 4 + estimate_tokens(msg.get("content") or "") + estimate_tokens(_tool_calls_text(msg))
+
+
+def _snippet(text: str) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= _SUMMARY_SNIPPET else text[:_SUMMARY_SNIPPET] + "…"
+
+
+class ConversationHistory:
+    def __init__(
+        self,
+        budget: int = MCP_HISTORY_TOKENS,
+        keep_turns: int = MCP_HISTORY_KEEP_TURNS,
+        tool_result_chars: int = MCP_HISTORY_TOOL_CHARS,
+        summarize: bool = MCP_HISTORY_SUMMARY,
+    ):
+        self.budget = budget
+        self.keep_turns = max(1, keep_turns)
+        self.tool_result_chars = tool_result_chars
+        self.summarize = summarize
+        self.messages: list = []
+        self.rounds = 0
+        self.tokens_sent = 0
+        self.tokens_saved = 0
+        self.last_sent = 0
+
+    def total_tokens(self) -> int:
+        return sum(message_tokens(m) for m in self.messages)
+
+    def compact(self) -> list:
+        """按预算原地压缩 self.messages，记录统计并返回它（即本轮要发送的内容）。"""
+        before = self.total_tokens()
+        if before > self.budget:
+            self._compact()
+        after = self.total_tokens()
+        self.rounds += 1
+        self.last_sent = after
+        self.tokens_sent += after
+        self.tokens_saved += before - after
+        return self.messages
+
+    def _turn_starts(self) -> list[int]:
+        return [i for i, m in enumerate(self.messages) if m.get("role") == "user"]
+
+    def _compact(self) -> None:
+        starts = self._turn_starts()
+        if len(starts) <= self.keep_turns:
+            return
+        cut = starts[-self.keep_turns]
+
+        # 1) 截断早期轮次中的工具结果
+        limit = self.tool_result_chars
+        for i in range(cut):
+            m = self.messages[i]
+            content = m.get("content") or ""
+            if m.get("role") == "tool" and len(content) > limit:
+                shortened = dict(m)
+                shortened["content"] = f"{content[:limit]}…（已截断，原 {len(content)} 字）"
+                self.messages[i] = shortened
+        if self.total_tokens() <= self.budget:
+            return
+
+        # 2) 按轮丢弃最早的对话，直到满足预算或只剩受保护的最近轮次
+        dropped: list = []
+        total = self.total_tokens()
+        while total > self.budget:
+            starts = self._turn_starts()
+            if len(starts) <= self.keep_turns:
+                break
+            chunk = self.messages[starts[0]:starts[1]]
+            del self.messages[starts[0]:starts[1]]
+            dropped.extend(chunk)
+            total -= sum(message_tokens(m) for m in chunk)
+
+        if self.summarize and dropped:
+            self._merge_summary(dropped)
+
+    def _has_summary(self) -> bool:
+        return bool(self.messages) and (
+            self.messages[0].get("role") == "system"
+            and (self.messages[0].get("content") or "").startswith(SUMMARY_PREFIX)
+        )
+
+    def _merge_summary(self, dropped: list) -> None:
+        lines = []
+        if self._has_summary():
+            lines = self.messages.pop(0)["content"].splitlines()[1:]
+        for m in dropped:
+            role = m.get("role")
+            if role == "user":
+                lines.append(f"- 用户：{_snippet(m.get('content'))}")
+            elif role == "assistant" and m.get("content"):
+                lines.append(f"- 助手：{_snippet(m.get('content'))}")
+            elif role == "assistant" and m.get("tool_calls"):
+                lines.append(f"- 调用工具：{_snippet(_tool_calls_text(m))}")
+        lines = lines[-_SUMMARY_MAX_LINES:]
+        if lines:
+            content = SUMMARY_PREFIX + "\n" + "\n".join(lines)
+            self.messages.insert(0, {"role": "system", "content": content})
+
+    def stats(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "messages": len(self.messages),
+            "last_sent_tokens": self.last_sent,
+            "tokens_sent": self.tokens_sent,
+            "tokens_saved": self.tokens_saved,
+            "budget": self.budget,
+        }
+
+    def report(self) -> None:
+        s = self.stats()
+        print(
+            f"[history] 轮次 {s['rounds']}，当前 {s['messages']} 条消息，"
+            f"上轮发送约 {s['last_sent_tokens']} tokens，累计发送 {s['tokens_sent']}，"
+            f"累计节省 {s['tokens_saved']}（预算 {s['budget']}）"
+        )
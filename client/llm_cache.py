@@ -0,0 +1,244 @@
+"""
+LLM 回复缓存（MCP_LLM_CACHE=1 时开启，默认关闭）：同样的对话前缀 + 同样的工具列表再次请求时
+直接复用上次的回复，省去一轮 LLM 调用。
+
+- key：sha256（后端与模型、归一化后的 messages、工具 schema）。归一化去掉 tool_call id 等每次都不同的字段，
+  并把工具参数统一为有序 JSON，因此后续轮次（带工具结果）在工具结果相同时同样可以命中；
+- 近似模式（MCP_LLM_CACHE_NEAR=1）：每轮的第一次请求另按「归一化后的用户原话 + 工具 schema」建索引，
+  忽略之前的对话历史。归一化只做全半角/大小写/空白与标点统一，并去掉称呼、礼貌用语与句末语气词
+  （"请向前走三步吧。" 与 "向前走三步" 视为同一句），不做相似度匹配，避免 "左转 30 度" 命中 "左转 300 度"；
+- LRU 淘汰，条目数上限 MCP_LLM_CACHE_SIZE、总大小上限 MCP_LLM_CACHE_BYTES；
+- MCP_LLM_CACHE_FILE 设置时启动载入、退出时写回磁盘，跨运行复用；
+- 命中的回复若含 tool_calls，仍由调用方交给 ToolDispatcher 对在线服务执行（只缓存模型的决定，不缓存工具结果），
+  tool_call id 每次重新生成。
+
+/stats 打印查询与命中次数（精确 / 近似）、命中率与估计节省的 LLM 时间（按写入时该次请求的耗时计）。
+"""
+import copy
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+from dispatch import new_call_id
+
+MCP_LLM_CACHE = os.environ.get("MCP_LLM_CACHE", "0") not in ("0", "false", "no", "")
+MCP_LLM_CACHE_SIZE = int(os.environ.get("MCP_LLM_CACHE_SIZE", "256"))
+MCP_LLM_CACHE_BYTES = int(os.environ.get("MCP_LLM_CACHE_BYTES", str(4 * 1024 * 1024)))
+MCP_LLM_CACHE_FILE = os.environ.get("MCP_LLM_CACHE_FILE", "").strip()
+MCP_LLM_CACHE_NEAR = os.environ.get("MCP_LLM_CACHE_NEAR", "0") not in ("0", "false", "no", "")
+
+_FILE_VERSION = 1
+
+# 近似模式下可忽略的称呼、礼貌用语与句末语气词
+_FILLER_PREFIX = re.compile(r"^(?:机器人|机器狗)?(?:请|麻烦)?(?:你)?(?:帮我)?")
+_FILLER_SUFFIX = re.compile(r"(?:一下)?(?:吧|呀|啊|呢|哦|啦)?$")
+
+
+def _digest(value) -> str:
+    data = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _arguments(arguments):
+    if isinstance(arguments, str):
+        try:
+            return json.loads(arguments) if arguments else {}
+        except ValueError:
+            return arguments
+    return arguments or {}
+
+
+def normalize_messages(messages: list) -> list:
+    """只保留影响模型回复的内容：角色、文本与工具调用（名称 + 参数），去掉 id。"""
+    normalized = []
+    for m in messages:
+        item = {"role": m.get("role"), "content": (m.get("content") or "").strip()}
+        calls = m.get("tool_calls")
+        if calls:
+            item["tool_calls"] = [[c["function"]["name"], _arguments(c["function"].get("arguments"))] for c in calls]
+        normalized.append(item)
+    return normalized
+
+
+def normalize_utterance(text: str) -> str:
+    """近似模式的用户原话归一化。"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = "".join(ch for ch in text if not (ch.isspace() or unicodedata.category(ch).startswith("P")))
+    text = _FILLER_PREFIX.sub("", text)
+    return _FILLER_SUFFIX.sub("", text) or text
+
+
+def _valid_entry(key, entry) -> bool:
+    """磁盘文件中的条目格式是否正确：{"msg": dict（tool_calls 带函数名）, "latency": 数值, "size": 非负整数}。"""
+    if not isinstance(key, str) or not isinstance(entry, dict):
+        return False
+    msg, latency, size = entry.get("msg"), entry.get("latency"), entry.get("size")
+    if not isinstance(msg, dict):
+        return False
+    calls = msg.get("tool_calls") or []
+    return (
+        isinstance(calls, list)
+        and all(isinstance(c, dict) and isinstance(c.get("function"), dict) and isinstance(c["function"].get("name"), str) for c in calls)
+        and isinstance(latency, (int, float))
+        and not isinstance(size, bool)
+        and isinstance(size, int)
+        and size >= 0
+    )
+
+
+class CompletionCache:
+    def __init__(
+        self,
+        model: str,
+        enabled: bool = MCP_LLM_CACHE,
+        maxsize: int = MCP_LLM_CACHE_SIZE,
+        maxbytes: int = MCP_LLM_CACHE_BYTES,
+        path: str = MCP_LLM_CACHE_FILE,
+        near: bool = MCP_LLM_CACHE_NEAR,
+    ):
+        self.model = model
+        self.enabled = enabled and maxsize > 0
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.path = Path(path) if path and path.lower() != "off" else None
+        self.near = near
+        # key -> {"msg", "latency", "size"}，按最近使用排序
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._near: dict[str, str] = {}  # 近似 key -> 精确 key
+        self.bytes = 0
+        self.lookups = 0
+        self.hits = 0
+        self.near_hits = 0
+        self.saved = 0.0
+        self.evictions = 0
+        self._dirty = False
+        if self.enabled and self.path is not None:
+            self._load()
+
+    def _keys(self, messages: list, tools: list) -> tuple[str, str | None]:
+        tools_hash = _digest(tools)
+        key = _digest([self.model, normalize_messages(messages), tools_hash])
+        near_key = None
+        if self.near and messages and messages[-1].get("role") == "user":
+            utterance = normalize_utterance(messages[-1].get("content") or "")
+            if utterance:
+                near_key = _digest(["near", self.model, utterance, tools_hash])
+        return key, near_key
+
+    def lookup(self, messages: list, tools: list) -> dict | None:
+        """命中时返回回复 msg 的副本（tool_call id 重新生成）。"""
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        self.lookups += 1
+        key, near_key = self._keys(messages, tools)
+        entry = self._entries.get(key)
+        if entry is None and near_key is not None:
+            key = self._near.get(near_key)
+            entry = self._entries.get(key) if key is not None else None
+            if entry is not None:
+                self.near_hits += 1
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        msg = copy.deepcopy(entry["msg"])
+        for call in msg.get("tool_calls") or []:
+            call["id"] = new_call_id()
+        self.saved += max(0.0, entry["latency"] - (time.perf_counter() - started))
+        return msg
+
+    def store(self, messages: list, tools: list, msg: dict, latency: float) -> None:
+        if not self.enabled or not (msg.get("content") or msg.get("tool_calls")):
+            return
+        key, near_key = self._keys(messages, tools)
+        stored = {
+            "role": "assistant",
+            "content": msg.get("content"),
+            "tool_calls": [
+                {"type": "function", "function": {"name": c["function"]["name"], "arguments": c["function"].get("arguments")}}
+                for c in msg["tool_calls"]
+            ]
+            if msg.get("tool_calls")
+            else None,
+        }
+        size = len(json.dumps(stored, ensure_ascii=False).encode("utf-8"))
+        if size > self.maxbytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old["size"]
+        self._entries[key] = {"msg": stored, "latency": latency, "size": size}
+        self.bytes += size
+        if near_key is not None:
+            self._near[near_key] = key
+        self._dirty = True
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.maxsize or self.bytes > self.maxbytes):
+            _key, entry = self._entries.popitem(last=False)
+            self.bytes -= entry["size"]
+            self.evictions += 1
+        if len(self._near) > 2 * self.maxsize:
+            self._near = {k: v for k, v in self._near.items() if v in self._entries}
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != _FILE_VERSION:
+            return
+        entries = data.get("entries")
+        # 文件损坏或被手工改动时跳过格式不对的条目，不影响启动
+        for item in entries if isinstance(entries, list) else []:
+            if isinstance(item, list) and len(item) == 2 and _valid_entry(*item):
+                key, entry = item
+                self._entries[key] = entry
+                self.bytes += entry["size"]
+        near = data.get("near")
+        if isinstance(near, dict):
+            self._near = {k: v for k, v in near.items() if isinstance(k, str) and isinstance(v, str) and v in self._entries}
+        self._evict()
+
+    def save(self) -> None:
+        """写回磁盘（设置了 MCP_LLM_CACHE_FILE 且有改动时）。"""
+        if not self.enabled or self.path is None or not self._dirty:
+            return
+        data = {
+            "version": _FILE_VERSION,
+            "entries": list(self._entries.items()),
+            "near": {k: v for k, v in self._near.items() if v in self._entries},
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError as e:
+            print(f"写入 LLM 回复缓存失败: {e}", file=sys.stderr)
+
+    def report(self) -> None:
+        if not self.enabled:
+            print("[cache] LLM 回复缓存已关闭")
+            return
+        rate = self.hits / self.lookups if self.lookups else 0.0
+        avg = self.saved / self.hits * 1000 if self.hits else 0.0
+        near = f"（其中近似 {self.near_hits} 次）" if self.near else ""
+        print(
+            f"[cache] LLM 回复缓存：查询 {self.lookups} 次，命中 {self.hits} 次{near}，命中率 {rate:.0%}，"
+            f"节省约 {self.saved:.2f}s（平均每次 {avg:.0f} ms）；"
+            f"条目 {len(self._entries)}/{self.maxsize}，{self.bytes / 1024:.0f} KB，淘汰 {self.evictions} 次"
+        )
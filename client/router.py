@@ -0,0 +1,189 @@
+"""
+LLM 后端路由（见 backends.py）：MCP_LLM_BACKENDS 配置多个后端时，每次请求发给预计最快的一个。
+
+- 每个后端维护成功请求耗时的指数移动平均（EWMA，系数 MCP_LLM_EWMA_ALPHA）与错误率 EWMA；
+  预计耗时 = 耗时 EWMA + 错误率 × 一次失败的代价（_ERROR_COST 秒）。错误率随时间衰减（半衰期 _ERROR_HALF_LIFE 秒），
+  出过错的后端过一段时间会重新被尝试；尚无耗时样本的后端按 0 计，因此每个后端都会先被试用一次。
+- 调用失败时按预计耗时顺序换下一个后端重试，全部失败才报错；
+  流式响应已有输出后中断（StreamInterrupted）时不再重试，避免重复打印或重复执行工具。
+- 对冲（MCP_LLM_HEDGE_MS > 0，仅非流式）：首选后端超过该时间仍未返回时，把同一请求再发给次选后端，
+  采用先返回的结果并取消另一个；被取消的一方若已等待超过其耗时 EWMA，以已等待时间更新其 EWMA。
+  流式模式下两路输出无法合并（文本已打印、工具已提交），不做对冲。
+
+/stats 打印各后端的请求数、胜出次数、错误数、耗时与错误率 EWMA 以及对冲次数。
+"""
+import asyncio
+import os
+import sys
+import time
+
+from streaming import StreamInterrupted
+
+MCP_LLM_EWMA_ALPHA = float(os.environ.get("MCP_LLM_EWMA_ALPHA", "0.3"))
+MCP_LLM_HEDGE_MS = float(os.environ.get("MCP_LLM_HEDGE_MS", "0"))
+
+# 一次失败按这么多秒计入预计耗时（超时或换后端重试的代价）
+_ERROR_COST = 5.0
+_ERROR_HALF_LIFE = 60.0
+
+
+class BackendStats:
+    def __init__(self, backend, alpha: float = MCP_LLM_EWMA_ALPHA):
+        self.backend = backend
+        self.alpha = alpha
+        self.latency: float | None = None
+        self._error_rate = 0.0
+        self._error_updated = time.monotonic()
+        self.requests = 0
+        self.wins = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.last_error = ""
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    def error_rate(self) -> float:
+        return self._error_rate * 0.5 ** ((time.monotonic() - self._error_updated) / _ERROR_HALF_LIFE)
+
+    def expected(self) -> float:
+        return (self.latency or 0.0) + self.error_rate() * _ERROR_COST
+
+    def _update_error(self, failed: bool) -> None:
+        self._error_rate = (1 - self.alpha) * self.error_rate() + self.alpha * (1.0 if failed else 0.0)
+        self._error_updated = time.monotonic()
+
+    def record_success(self, elapsed: float) -> None:
+        self.latency = elapsed if self.latency is None else (1 - self.alpha) * self.latency + self.alpha * elapsed
+        self._update_error(False)
+
+    def record_error(self, e: BaseException) -> None:
+        self.errors += 1
+        self.last_error = str(e)
+        self._update_error(True)
+
+    def record_cancelled(self, elapsed: float) -> None:
+        """对冲落败被取消：只知道耗时不少于 elapsed。"""
+        self.cancelled += 1
+        if self.latency is None or elapsed > self.latency:
+            self.record_success(elapsed)
+
+
+class LLMRouter:
+    def __init__(self, backends: list, hedge_delay: float = MCP_LLM_HEDGE_MS / 1000):
+        self.stats = [BackendStats(b) for b in backends]
+        self.hedge_delay = hedge_delay
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    @property
+    def models(self) -> str:
+        """参与路由的后端与模型（用作 LLM 回复缓存 key 的一部分）。"""
+        return ",".join(f"{s.name}:{s.backend.model}" for s in self.stats)
+
+    def ranked(self) -> list[BackendStats]:
+        # 预计耗时相同时按配置顺序
+        return sorted(self.stats, key=lambda s: s.expected())
+
+    async def _timed(self, stats: BackendStats, request):
+        stats.requests += 1
+        started = time.perf_counter()
+        try:
+            result = await request(stats.backend)
+        except asyncio.CancelledError:
+            stats.record_cancelled(time.perf_counter() - started)
+            raise
+        except Exception as e:
+            stats.record_error(e)
+            raise
+        stats.record_success(time.perf_counter() - started)
+        return result
+
+    async def _hedged(self, primary: BackendStats, secondary: BackendStats, request):
+        """返回 (胜出的 BackendStats, 结果)；两路都失败时抛出最后一个异常。"""
+        first = asyncio.create_task(self._timed(primary, request))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+        if done and first.exception() is None:
+            return primary, first.result()
+        if not done:
+            self.hedges += 1
+            print(
+                f"[llm] {primary.name} 超过 {self.hedge_delay * 1000:.0f} ms 未返回，同时请求 {secondary.name}",
+                file=sys.stderr,
+            )
+        else:
+            # 首选已失败：次选即为普通的换后端重试
+            self.failovers += 1
+            print(f"[llm] {primary.name} 调用失败，改用 {secondary.name}: {first.exception()}", file=sys.stderr)
+        second = asyncio.create_task(self._timed(secondary, request))
+        owners = {first: primary, second: secondary}
+        pending = {t for t in owners if not t.done()}
+        error = first.exception() if first.done() else None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second and not first.done():
+                            self.hedge_wins += 1
+                        return owners[task], task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        raise error
+
+    async def _route(self, request, hedge: bool):
+        candidates = self.ranked()
+        failed = []
+        while candidates:
+            tried = [candidates.pop(0)]
+            try:
+                if hedge and self.hedge_delay > 0 and candidates:
+                    tried.append(candidates.pop(0))
+                    winner, result = await self._hedged(*tried, request)
+                else:
+                    winner, result = tried[0], await self._timed(tried[0], request)
+            except StreamInterrupted:
+                raise
+            except Exception as e:
+                failed.extend(tried)
+                if candidates:
+                    self.failovers += 1
+                    names = "、".join(s.name for s in tried)
+                    print(f"[llm] {names} 调用失败，改用 {candidates[0].name}: {e}", file=sys.stderr)
+                continue
+            winner.wins += 1
+            return winner.backend, result
+        raise RuntimeError(
+            "全部 LLM 后端调用失败："
+            + "；".join(f"{s.name}（{s.backend.hint}）: {s.last_error}" for s in failed)
+        )
+
+    async def complete(self, messages: list, tools: list):
+        """非流式请求，返回 (后端, 原始响应)；由调用方 backend.normalize() 归一化。"""
+        return await self._route(lambda b: b.complete(messages, tools), hedge=True)
+
+    async def stream(self, messages: list, tools: list, dispatcher, stream_stats):
+        """流式请求，返回 (后端, msg, tasks)。"""
+        backend, (msg, tasks) = await self._route(
+            lambda b: b.stream(messages, tools, dispatcher, stream_stats), hedge=False
+        )
+        return backend, msg, tasks
+
+    def report(self) -> None:
+        if len(self.stats) > 1 or self.hedges:
+            print(
+                f"[llm] 路由 {len(self.stats)} 个后端，换后端重试 {self.failovers} 次，"
+                f"对冲 {self.hedges} 次（次选胜出 {self.hedge_wins} 次，延迟 {self.hedge_delay * 1000:.0f} ms）"
+            )
+        for s in self.stats:
+            latency = f"{s.latency * 1000:.0f} ms" if s.latency is not None else "-"
+            print(
+                f"[llm] {s.name}（{s.backend.model}）：请求 {s.requests} 次，采用 {s.wins} 次，错误 {s.errors} 次，"
+                f"被取消 {s.cancelled} 次，耗时 EWMA {latency}，错误率 EWMA {s.error_rate():.0%}"
+            )
@@ -0,0 +1,429 @@
+"""
+HTTP MCP 会话管理（MCP_SERVER_URLS 与 MCP_DAEMON 常驻服务模式）：按需连接、空闲保活与断线重连。
+
+- 按需连接：工具目录缓存（tool_cache.py）中已有该 URL 的工具列表时，启动阶段不连接，
+  首次调用该服务的工具时才建立 session；没有缓存时启动阶段连接一次以取得工具列表。
+  MCP_LAZY_CONNECT=0 时启动阶段全部连接；
+- 保活：session 空闲超过 MCP_KEEPALIVE 秒时发送 ping，失败即视为断线并在后台重连；
+- 重连：断线后按指数退避重新连接并 initialize（最多 MCP_RECONNECT_ATTEMPTS 次，
+  间隔上限 MCP_RECONNECT_MAX_BACKOFF 秒），对调用方透明；
+- 重试：调用中途断线时，可安全重试的工具（服务端 annotations 声明 readOnlyHint / idempotentHint，
+  或名称匹配 MCP_RETRY_TOOLS）在重连后重试一次；其余工具直接报错，避免动作被重复执行。
+  请求确定未送达（连接被拒绝，或服务重启后旧 session 失效）时任何工具都会重试。
+
+ManagedSession 对 ToolDispatcher 与网关而言与 ClientSession 一样调用 call_tool；
+SessionManager 与 ServerPool 提供相同的 tool_map() / tools_version / connected / report()。
+"""
+import asyncio
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+
+import anyio
+from mcp import types
+from mcp.client.session import ClientSession
+from mcp.shared.exceptions import McpError
+
+from connect import MCP_CONNECT_TIMEOUT, ServerPool, ServerSpec, _describe_error, _open_transport
+from tool_cache import ToolCatalog
+
+MCP_LAZY_CONNECT = os.environ.get("MCP_LAZY_CONNECT", "1") not in ("0", "false", "no", "")
+# 空闲多少秒后发送保活 ping；0 关闭
+MCP_KEEPALIVE = float(os.environ.get("MCP_KEEPALIVE", "30"))
+MCP_PING_TIMEOUT = float(os.environ.get("MCP_PING_TIMEOUT", "5"))
+MCP_RECONNECT_ATTEMPTS = max(1, int(os.environ.get("MCP_RECONNECT_ATTEMPTS", "4")))
+MCP_RECONNECT_MAX_BACKOFF = float(os.environ.get("MCP_RECONNECT_MAX_BACKOFF", "5"))
+MCP_RETRY_TOOLS = [p.strip() for p in os.environ.get("MCP_RETRY_TOOLS", "").split(",") if p.strip()]
+
+_BACKOFF_BASE = 0.2
+# Streamable HTTP 客户端在服务端返回 404（session 已失效，例如服务重启）时给出的错误
+_SESSION_TERMINATED = "Session terminated"
+
+
+@dataclass
+class _Connection:
+    """一次连接：常驻任务持有 transport 与 session，直到 stopping 被置位或连接出错。"""
+
+    task: asyncio.Task | None = None
+    session: ClientSession | None = None
+    wake: asyncio.Event = field(default_factory=asyncio.Event)
+    closed: asyncio.Event = field(default_factory=asyncio.Event)
+    stopping: bool = False
+
+    def stop(self) -> None:
+        self.stopping = True
+        self.wake.set()
+
+    async def call_tool(self, name: str, arguments: dict | None, **kwargs) -> types.CallToolResult:
+        """在本连接上调用；连接中途关闭时立即抛出 ConnectionError，而不是一直等待响应。"""
+        call = asyncio.ensure_future(self.session.call_tool(name, arguments, **kwargs))
+        closed = asyncio.ensure_future(self.closed.wait())
+        try:
+            await asyncio.wait({call, closed}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            closed.cancel()
+            if not call.done():
+                call.cancel()
+        if call.done() and not call.cancelled():
+            return call.result()
+        raise ConnectionError("连接已关闭")
+
+
+def _not_delivered(e: BaseException) -> bool:
+    """请求确定没有被服务端执行：连接未建立，或服务端已不认识该 session。"""
+    if isinstance(e, McpError):
+        return e.error.message == _SESSION_TERMINATED
+    # httpx 由 HTTP transport 导入；未导入说明没有走 HTTP，不会是它的异常
+    httpx = sys.modules.get("httpx")
+    return httpx is not None and isinstance(e, httpx.ConnectError)
+
+
+def _transport_failure(e: BaseException) -> bool:
+    """连接层面的失败（连接断开或 session 失效）；工具报错、协议错误、超时等不影响连接。"""
+    if isinstance(e, McpError):
+        return e.error.code == types.CONNECTION_CLOSED or e.error.message == _SESSION_TERMINATED
+    if isinstance(e, TimeoutError):
+        return False
+    errors = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, OSError)
+    httpx = sys.modules.get("httpx")
+    if httpx is not None:
+        errors += (httpx.TransportError,)
+    return isinstance(e, errors)
+
+
+class ManagedSession:
+    """
+    单个 HTTP 服务的托管 session，同时充当 ServerPool 中 ServerHandle 的角色
+    （spec / tools / init_result / error / from_cache / session）。
+    """
+
+    def __init__(self, spec: ServerSpec, catalog: ToolCatalog, on_tools_changed):
+        self.spec = spec
+        self.catalog = catalog
+        self._on_tools_changed = on_tools_changed
+        self.state = "idle"  # idle | connecting | ready | reconnecting | down | closed
+        self.init_result = None
+        self.tools: list = []
+        self.from_cache = False
+        self.error: str | None = None
+        self.elapsed = 0.0  # 首次连接耗时
+        self.phases: dict[str, float] = {}  # 首次连接各阶段耗时：connect / initialize / list_tools
+        self.connects = 0
+        self.reconnects = 0
+        self.reconnect_latency: list[float] = []
+        self.pings = 0
+        self.retries = 0
+        self._cached_server = ""
+        self._conn: _Connection | None = None
+        self._lock = asyncio.Lock()
+        self._last_used = time.monotonic()
+        self._closing = False
+        self._background: set[asyncio.Task] = set()
+
+    @property
+    def session(self) -> "ManagedSession":
+        # 断线期间也返回自身：调用时会先重连
+        return self
+
+    @property
+    def server_name(self) -> str:
+        info = getattr(self.init_result, "serverInfo", None)
+        return getattr(info, "name", "") or self._cached_server
+
+    async def prepare(self, lazy: bool) -> None:
+        """启动阶段：缓存命中且 lazy 时只载入工具列表，否则连接一次（不重试）以取得工具列表。"""
+        cached = self.catalog.lookup_prefix(f"{self.spec.kind}:{self.spec.address}")
+        if cached is not None:
+            self.tools, self._cached_server = cached
+            self.from_cache = True
+            if lazy:
+                return
+        try:
+            await self._ensure(attempts=1)
+        except Exception:
+            pass
+
+    def is_retry_safe(self, name: str) -> bool:
+        for t in self.tools:
+            if t.name == name and t.annotations is not None:
+                if t.annotations.readOnlyHint or t.annotations.idempotentHint:
+                    return True
+        return any(fnmatchcase(name, p) for p in MCP_RETRY_TOOLS)
+
+    async def call_tool(self, name: str, arguments: dict | None = None, **kwargs) -> types.CallToolResult:
+        conn = await self._ensure()
+        self._last_used = time.monotonic()
+        try:
+            return await conn.call_tool(name, arguments, **kwargs)
+        except Exception as e:
+            # 其它异常原样抛出，连接保持可用
+            if not _transport_failure(e):
+                raise
+            reason = _describe_error(e)
+            self._drop(conn, reason)
+            if not (_not_delivered(e) or self.is_retry_safe(name)):
+                raise ConnectionError(f"与 {self.spec.label} 的连接中断（{reason}），{name} 不可安全重试，未重新执行") from e
+        conn = await self._ensure()
+        self.retries += 1
+        self._last_used = time.monotonic()
+        return await conn.call_tool(name, arguments, **kwargs)
+
+    async def list_tools(self) -> types.ListToolsResult:
+        conn = await self._ensure()
+        return await conn.session.list_tools()
+
+    async def close(self) -> None:
+        self._closing = True
+        self.state = "closed"
+        for task in list(self._background):
+            task.cancel()
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.stop()
+            await asyncio.gather(conn.task, return_exceptions=True)
+
+    def _usable(self, conn: _Connection | None) -> bool:
+        return conn is not None and conn.session is not None and not conn.stopping
+
+    async def _ensure(self, attempts: int = MCP_RECONNECT_ATTEMPTS) -> _Connection:
+        if self._usable(self._conn):
+            return self._conn
+        async with self._lock:
+            if self._usable(self._conn):
+                return self._conn
+            if self._closing:
+                raise ConnectionError(f"{self.spec.label} 已关闭")
+            return await self._connect(attempts)
+
+    async def _connect(self, attempts: int) -> _Connection:
+        reconnect = self.connects > 0
+        self.state = "reconnecting" if reconnect else "connecting"
+        start = time.perf_counter()
+        delay = _BACKOFF_BASE
+        for attempt in range(attempts):
+            if attempt:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MCP_RECONNECT_MAX_BACKOFF)
+            try:
+                conn = await self._open()
+            except Exception as e:
+                self.error = _describe_error(e)
+                continue
+            elapsed = time.perf_counter() - start
+            self.connects += 1
+            if reconnect:
+                self.reconnects += 1
+                self.reconnect_latency.append(elapsed)
+            else:
+                self.elapsed = elapsed
+            self.state = "ready"
+            self.error = None
+            await self._after_connect(conn)
+            return conn
+        self.state = "down"
+        if not reconnect:
+            self.elapsed = time.perf_counter() - start
+        raise ConnectionError(f"连接 {self.spec.address} 失败（尝试 {attempts} 次）: {self.error}")
+
+    async def _open(self) -> _Connection:
+        conn = _Connection()
+        ready = asyncio.get_running_loop().create_future()
+        conn.task = asyncio.create_task(self._run(conn, ready))
+        try:
+            self.init_result = await asyncio.wait_for(ready, timeout=MCP_CONNECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            conn.task.cancel()
+            raise TimeoutError(f"超时（{MCP_CONNECT_TIMEOUT:g}s）") from None
+        except BaseException:
+            conn.task.cancel()
+            raise
+        self._conn = conn
+        return conn
+
+    async def _after_connect(self, conn: _Connection) -> None:
+        """首次取得工具列表时同步拉取；已有（缓存或上次连接的）列表时在后台校验。"""
+        if not self.tools:
+            start = time.perf_counter()
+            try:
+                await self._refresh_tools(conn)
+            except Exception as e:
+                self.error = f"list_tools 失败: {_describe_error(e)}"
+            self.phases.setdefault("list_tools", time.perf_counter() - start)
+            return
+        self.phases.setdefault("list_tools", 0.0)
+        self._spawn(self._refresh_tools(conn, quiet=True))
+
+    async def _refresh_tools(self, conn: _Connection, quiet: bool = False) -> None:
+        cache_key = self.catalog.key_for(self.spec, self.init_result)
+        try:
+            tools = list((await conn.session.list_tools()).tools)
+        except Exception as e:
+            if not quiet:
+                raise
+            print(f"[{self.spec.label}] 刷新工具列表失败: {_describe_error(e)}", file=sys.stderr)
+            return
+        self.catalog.store(*cache_key, tools, server=self.server_name)
+        if not ToolCatalog.same_tools(tools, self.tools):
+            self.tools = tools
+            self._on_tools_changed()
+        self.from_cache = False
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _drop(self, conn: _Connection, reason: str) -> None:
+        """标记断线并关闭该连接；下一次调用（或保活触发的后台重连）会重新连接。"""
+        if self._conn is conn:
+            self._conn = None
+            if not self._closing:
+                self.state = "reconnecting"
+                self.error = reason
+        conn.stop()
+
+    async def _reconnect_in_background(self) -> None:
+        try:
+            await self._ensure()
+        except Exception as e:
+            print(f"[{self.spec.label}] 重连失败: {_describe_error(e)}", file=sys.stderr)
+
+    def _message_handler(self, conn: _Connection):
+        async def on_message(message) -> None:
+            # 接收循环内不能发请求，交给后台任务重新拉取
+            if isinstance(message, types.ServerNotification) and isinstance(
+                message.root, types.ToolListChangedNotification
+            ):
+                self._spawn(self._refresh_tools(conn, quiet=True))
+
+        return on_message
+
+    async def _run(self, conn: _Connection, ready: asyncio.Future) -> None:
+        start = time.perf_counter()
+        first = not self.phases
+        try:
+            async with _open_transport(self.spec) as (read, write):
+                if first:
+                    self.phases["connect"] = time.perf_counter() - start
+                async with ClientSession(read, write, message_handler=self._message_handler(conn)) as session:
+                    init_result = await session.initialize()
+                    if first:
+                        self.phases["initialize"] = time.perf_counter() - start - self.phases["connect"]
+                    conn.session = session
+                    if not ready.done():
+                        ready.set_result(init_result)
+                    await self._keepalive(conn)
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            elif not conn.stopping:
+                self._drop(conn, _describe_error(e))
+                self._spawn(self._reconnect_in_background())
+        finally:
+            conn.session = None
+            conn.closed.set()
+            if not ready.done():
+                ready.cancel()
+
+    async def _keepalive(self, conn: _Connection) -> None:
+        while not conn.stopping:
+            idle = time.monotonic() - self._last_used
+            if MCP_KEEPALIVE <= 0 or idle < MCP_KEEPALIVE:
+                timeout = None if MCP_KEEPALIVE <= 0 else MCP_KEEPALIVE - idle
+                try:
+                    await asyncio.wait_for(conn.wake.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await asyncio.wait_for(conn.session.send_ping(), timeout=MCP_PING_TIMEOUT)
+            except Exception as e:
+                if conn.stopping:
+                    return
+                self._drop(conn, f"保活 ping 失败: {_describe_error(e) or '超时'}")
+                self._spawn(self._reconnect_in_background())
+                return
+            self.pings += 1
+            self._last_used = time.monotonic()
+
+    def report_line(self) -> str:
+        parts = [f"[{self.spec.label}] {self.state}", f"{len(self.tools)} 个工具"]
+        if self.from_cache:
+            parts.append("工具列表来自缓存")
+        if self.connects:
+            parts.append(f"连接 {self.connects} 次，首次 {self.elapsed * 1000:.0f} ms")
+        if self.spec.kind == "daemon":
+            from daemon import describe
+
+            parts.append(describe(self.spec))
+        if self.reconnects:
+            avg = sum(self.reconnect_latency) / len(self.reconnect_latency)
+            parts.append(
+                f"重连 {self.reconnects} 次（上次 {self.reconnect_latency[-1] * 1000:.0f} ms / 平均 {avg * 1000:.0f} ms）"
+            )
+        if self.pings:
+            parts.append(f"保活 ping {self.pings} 次")
+        if self.retries:
+            parts.append(f"重试调用 {self.retries} 次")
+        if self.error:
+            parts.append(f"最近错误: {self.error}")
+        return "，".join(parts)
+
+
+class SessionManager:
+    """
+    一组 HTTP 服务的托管 session；与 ServerPool 一样作为异步上下文管理器使用，
+    all_tools / tool_to_session 原地更新，tools_version 随之递增。
+    """
+
+    def __init__(self, specs: list[ServerSpec], catalog: ToolCatalog | None = None, lazy: bool = MCP_LAZY_CONNECT):
+        self.specs = specs
+        self.catalog = ToolCatalog() if catalog is None else catalog
+        self.lazy = lazy
+        self.handles: list[ManagedSession] = []
+        self.all_tools: list = []
+        self.tool_to_session: dict[str, ManagedSession] = {}
+        self.tools_version = 0
+
+    async def __aenter__(self) -> "SessionManager":
+        self.handles = [ManagedSession(spec, self.catalog, self._rebuild) for spec in self.specs]
+        await asyncio.gather(*(h.prepare(self.lazy) for h in self.handles))
+        self._rebuild()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await asyncio.gather(*(h.close() for h in self.handles), return_exceptions=True)
+
+    def _rebuild(self) -> None:
+        self.all_tools[:] = []
+        self.tool_to_session.clear()
+        for h in self.connected:
+            for t in h.tools:
+                self.all_tools.append(t)
+                self.tool_to_session[t.name] = h
+        self.tools_version += 1
+
+    @property
+    def connected(self) -> list[ManagedSession]:
+        """已知工具列表的服务（包括尚未连接或正在重连的）。"""
+        return [h for h in self.handles if h.tools]
+
+    def tool_map(self) -> tuple[list, dict[str, ManagedSession]]:
+        return self.all_tools, self.tool_to_session
+
+    def report_lines(self) -> list[str]:
+        """各服务的连接状态、连接/重连次数与重连耗时，每个服务一行。"""
+        return [h.report_line() for h in self.handles]
+
+    def report(self) -> None:
+        for line in self.report_lines():
+            print(line)
+
+
+def open_servers(specs: list[ServerSpec]):
+    """全部为 HTTP / 常驻服务时返回 SessionManager（按需连接、保活与重连），否则返回 ServerPool。"""
+    if specs and all(s.kind in ("http", "daemon") for s in specs):
+        return SessionManager(specs)
+    return ServerPool(specs)
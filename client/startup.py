@@ -0,0 +1,106 @@
+"""
+启动耗时拆分（--profile-startup 或 MCP_PROFILE_STARTUP=1 时打印）：
+
+- interpreter：进程创建到客户端脚本开始执行（解释器启动，仅 Linux 可测）；
+- imports：客户端自身及 mcp 客户端模块的导入；
+- backend_import：LLM SDK（ollama / openai）的导入，在后台线程进行，与连接服务重叠；
+- servers：并发连接全部 MCP 服务的墙钟时间，另按服务给出 connect（启动子进程/打开连接）、
+  initialize（含服务进程冷启动）与 list_tools（命中工具目录缓存时为 0）；
+- setup：工具 schema、选择器、LLM 客户端等的准备；
+- first_prompt：进程创建到首次显示 "You:" 提示符的总耗时。
+
+设置 MCP_STARTUP_LOG=文件路径 时追加一行 JSON（不论是否打印），供 bench/startup_bench.py 汇总。
+客户端脚本应最先导入本模块（导入时刻即 imports 阶段的起点）。
+"""
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+
+PROFILE_STARTUP = "--profile-startup" in sys.argv[1:] or os.environ.get("MCP_PROFILE_STARTUP", "0") not in (
+    "0",
+    "false",
+    "no",
+    "",
+)
+MCP_STARTUP_LOG = os.environ.get("MCP_STARTUP_LOG", "").strip()
+
+
+def _process_age() -> float:
+    """进程已运行的秒数（读取 /proc，非 Linux 返回 0）。"""
+    try:
+        with open("/proc/self/stat", encoding="ascii") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", encoding="ascii") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return 0.0
+    return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+
+
+# 本模块被导入的时刻，即客户端脚本开始执行的时刻
+_INTERPRETER = _process_age()
+_SCRIPT_START = time.perf_counter()
+
+
+class StartupProfile:
+    def __init__(self, client: str):
+        self.client = client
+        self.phases: dict[str, float] = {"interpreter": _INTERPRETER}
+        self.servers: dict[str, dict] = {}
+        self._last = _SCRIPT_START
+        self._done = False
+
+    def mark(self, phase: str) -> None:
+        """记录上一个标记点到现在的耗时。"""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def import_backend(self, module: str) -> asyncio.Future:
+        """在后台线程导入 LLM SDK，与连接 MCP 服务并行；返回可 await 的模块。"""
+
+        def load():
+            started = time.perf_counter()
+            mod = importlib.import_module(module)
+            # 多个后端并行导入时取最长的一个
+            self.phases["backend_import"] = max(self.phases.get("backend_import", 0.0), time.perf_counter() - started)
+            return mod
+
+        return asyncio.ensure_future(asyncio.to_thread(load))
+
+    def record_servers(self, pool) -> None:
+        for h in pool.handles:
+            # 按需连接（MCP_LAZY_CONNECT 且工具目录命中缓存）的服务启动时尚未连接，没有阶段耗时
+            if h.phases:
+                self.servers[h.spec.label] = {k: round(v * 1000, 1) for k, v in h.phases.items()}
+
+    def first_prompt(self) -> None:
+        """首次显示提示符前调用：结束计时，按需打印并写日志（只生效一次）。"""
+        if self._done:
+            return
+        self._done = True
+        self.mark("setup")
+        self.phases["first_prompt"] = _INTERPRETER + time.perf_counter() - _SCRIPT_START
+        if PROFILE_STARTUP:
+            self.report()
+        if MCP_STARTUP_LOG:
+            record = {
+                "client": self.client,
+                "phases_ms": {k: round(v * 1000, 1) for k, v in self.phases.items()},
+                "servers_ms": self.servers,
+            }
+            with open(MCP_STARTUP_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def report(self) -> None:
+        p = {k: v * 1000 for k, v in self.phases.items()}
+        print(f"[startup] 解释器启动 {p['interpreter']:.0f} ms，导入模块 {p.get('imports', 0):.0f} ms")
+        backend = f"（后台导入 LLM SDK {p['backend_import']:.0f} ms 与之重叠）" if "backend_import" in p else ""
+        print(f"[startup] 连接 MCP 服务 {p.get('servers', 0):.0f} ms{backend}")
+        for label, phases in self.servers.items():
+            parts = " / ".join(f"{k} {v:.0f}" for k, v in phases.items())
+            print(f"[startup]   [{label}] {parts} ms")
+        print(f"[startup] 准备工具与 LLM 客户端 {p.get('setup', 0):.0f} ms，到首个提示符共 {p['first_prompt']:.0f} ms")
@@ -0,0 +1,171 @@
+"""
+流式 LLM 响应（MCP_STREAM=1）：文本边生成边打印；每个 tool_call 的参数一解析完整
+就交给 ToolDispatcher.start() 提前执行，而不必等整条消息结束。
+
+- Ollama：流中的 tool_calls 总是以完整形式出现在某个 chunk 里，出现即提交；
+- OpenAI 兼容接口：tool_calls 以 index 分片增量到达，参数 JSON 一闭合即提交；
+  兜底在出现下一个 index 或流结束时提交。
+
+返回值与非流式路径归一化后的 msg 结构一致，外加每个调用对应的 Task（与 tool_calls 同序）。
+每轮记录首 token 时间（TTFT）与首个工具调用提交时间。
+已输出文本或已提交工具调用之后流中断时抛出 StreamInterrupted（不能再换后端重试，见 router.py）。
+"""
+import json
+import os
+import time
+
+from dispatch import new_call_id
+
+MCP_STREAM = os.environ.get("MCP_STREAM", "0") not in ("0", "false", "no", "")
+
+
+class StreamStats:
+    def __init__(self):
+        self.rounds = 0
+        self.ttft: list[float] = []
+        self.ttfc: list[float] = []
+
+    def record(self, ttft: float | None, ttfc: float | None) -> None:
+        self.rounds += 1
+        if ttft is not None:
+            self.ttft.append(ttft)
+        if ttfc is not None:
+            self.ttfc.append(ttfc)
+
+    def report(self) -> None:
+        def fmt(values: list[float]) -> str:
+            if not values:
+                return "-"
+            return f"上轮 {values[-1] * 1000:.0f} ms / 平均 {sum(values) / len(values) * 1000:.0f} ms"
+
+        print(f"[stream] {self.rounds} 轮，首 token：{fmt(self.ttft)}，首个工具调用：{fmt(self.ttfc)}")
+
+
+class StreamInterrupted(Exception):
+    """流式响应在已有输出之后中断。"""
+
+
+class _Turn:
+    """单轮流式响应的累积状态。"""
+
+    def __init__(self, dispatcher, stats: StreamStats):
+        self.dispatcher = dispatcher
+        self.stats = stats
+        self.started = time.perf_counter()
+        self.ttft: float | None = None
+        self.ttfc: float | None = None
+        self.text: list[str] = []
+        self.calls: list[dict] = []
+        self.tasks: list = []
+
+    def on_text(self, piece: str) -> None:
+        if not piece:
+            return
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+            print("Assistant: ", end="", flush=True)
+        self.text.append(piece)
+        print(piece, end="", flush=True)
+
+    def on_call(self, call: dict) -> None:
+        if self.ttfc is None:
+            self.ttfc = time.perf_counter() - self.started
+        if not call.get("id"):
+            call["id"] = new_call_id()
+        self.calls.append(call)
+        self.tasks.append(self.dispatcher.start(call))
+
+    def interrupted(self, e: Exception) -> Exception:
+        """流中途出错：尚无输出时原样抛出，否则包装为 StreamInterrupted。"""
+        if not self.text and not self.calls:
+            return e
+        if self.text:
+            print()
+        return StreamInterrupted(f"流式响应中断: {e}")
+
+    def finish(self) -> tuple[dict, list]:
+        if self.text:
+            print()
+        self.stats.record(self.ttft, self.ttfc)
+        msg = {
+            "role": "assistant",
+            "content": "".join(self.text) or None,
+            "tool_calls": self.calls or None,
+        }
+        return msg, self.tasks
+
+
+async def stream_ollama(ollama, model: str, messages: list, tools: list, dispatcher, stats: StreamStats):
+    turn = _Turn(dispatcher, stats)
+    try:
+        stream = await ollama.chat(model=model, messages=messages, tools=tools, stream=True)
+        async for chunk in stream:
+            message = chunk["message"]
+            turn.on_text(message.get("content") or "")
+            for tc in message.get("tool_calls") or []:
+                turn.on_call(
+                    {
+                        "type": "function",
+                        "function": {
+                            "name": tc["function"]["name"],
+                            "arguments": tc["function"].get("arguments") or {},
+                        },
+                    }
+                )
+    except Exception as e:
+        raise turn.interrupted(e) from e
+    return turn.finish()
+
+
+def _args_complete(arguments: str) -> bool:
+    """参数 JSON 已闭合（可完整解析）即视为该调用解析完成。"""
+    try:
+        json.loads(arguments)
+    except ValueError:
+        return False
+    return True
+
+
+async def stream_openai(client, model: str, messages: list, tools: list, dispatcher, stats: StreamStats):
+    turn = _Turn(dispatcher, stats)
+    pending: dict | None = None
+    pending_index = None
+    submitted = False
+
+    try:
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            tools=tools,
+            stream=True,
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            turn.on_text(getattr(delta, "content", None) or "")
+            for tc in getattr(delta, "tool_calls", None) or []:
+                if pending is not None and tc.index != pending_index:
+                    if not submitted:
+                        turn.on_call(pending)
+                    pending = None
+                if pending is None:
+                    pending_index = tc.index
+                    pending = {"id": None, "type": "function", "function": {"name": "", "arguments": ""}}
+                    submitted = False
+                if submitted:
+                    continue
+                if tc.id:
+                    pending["id"] = tc.id
+                fn = tc.function
+                if fn is not None:
+                    pending["function"]["name"] += fn.name or ""
+                    pending["function"]["arguments"] += fn.arguments or ""
+                if pending["function"]["name"] and _args_complete(pending["function"]["arguments"]):
+                    turn.on_call(pending)
+                    submitted = True
+        if pending is not None and not submitted:
+            turn.on_call(pending)
+    except Exception as e:
+        raise turn.interrupted(e) from e
+    return turn.finish()
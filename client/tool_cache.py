@@ -0,0 +1,124 @@
+"""
+磁盘上的 MCP 工具目录缓存：命中时客户端跳过启动阶段的 list_tools，
+直接用缓存构建 LLM 工具列表，再在后台重新拉取校验。
+
+缓存 key：
+- stdio / 进程内托管：服务脚本路径 + 文件内容哈希（脚本改动即失效）；
+- http：URL + initialize 返回的服务名/版本。
+
+HTTP 按需连接（见 sessions.py）在连接之前只知道 URL，用 lookup_prefix() 取该 URL 下的条目。
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from mcp.types import Tool
+
+# MCP_TOOL_CACHE：缓存文件路径；设为 off 关闭
+MCP_TOOL_CACHE = os.environ.get(
+    "MCP_TOOL_CACHE",
+    str(Path.home() / ".cache" / "mcp-demo" / "tool_catalog.json"),
+).strip()
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def _tool_to_dict(t: Tool) -> dict:
+    return t.model_dump(mode="json", exclude_none=True)
+
+
+class ToolCatalog:
+    def __init__(self, path: str = MCP_TOOL_CACHE):
+        self.enabled = bool(path) and path.lower() != "off"
+        self.path = Path(path) if self.enabled else None
+        self._entries: dict | None = None
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            self._entries = {}
+            if self.enabled and self.path.exists():
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        self._entries = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    self._entries = {}
+        return self._entries
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def key_for(spec, init_result) -> tuple[str, str]:
+        """返回 (key, 前缀)；同一前缀下的旧 key 在写入新条目时被清理。"""
+        if spec.kind in ("stdio", "inprocess", "daemon"):
+            prefix = f"{spec.kind}:{spec.address}"
+            return f"{prefix}#{_file_hash(spec.address)}", prefix
+        prefix = f"{spec.kind}:{spec.address}"
+        info = getattr(init_result, "serverInfo", None)
+        name = getattr(info, "name", "")
+        version = getattr(info, "version", "")
+        return f"{prefix}#{name}@{version}", prefix
+
+    def lookup(self, key: str) -> list[Tool] | None:
+        if not self.enabled:
+            return None
+        entry = self._load().get(key)
+        if not entry:
+            return None
+        try:
+            return [Tool.model_validate(t) for t in entry["tools"]]
+        except Exception:
+            return None
+
+    def lookup_prefix(self, prefix: str) -> tuple[list[Tool], str] | None:
+        """按前缀（如 http:URL）取唯一的条目，返回 (工具列表, 服务名)。"""
+        if not self.enabled:
+            return None
+        for key, entry in self._load().items():
+            if key.split("#", 1)[0] != prefix:
+                continue
+            tools = self.lookup(key)
+            if tools is None:
+                return None
+            return tools, entry.get("server", "")
+        return None
+
+    def store(self, key: str, prefix: str, tools: list[Tool], server: str = "") -> None:
+        if not self.enabled:
+            return
+        entries = self._load()
+        for k in [k for k in entries if k.split("#", 1)[0] == prefix]:
+            del entries[k]
+        entries[key] = {"tools": [_tool_to_dict(t) for t in tools], "updated": time.time()}
+        if server:
+            entries[key]["server"] = server
+        try:
+            self._save()
+        except OSError as e:
+            print(f"写入工具缓存失败: {e}", file=sys.stderr)
+
+    def invalidate(self, key: str) -> None:
+        if not self.enabled:
+            return
+        if self._load().pop(key, None) is not None:
+            try:
+                self._save()
+            except OSError:
+                pass
+
+    @staticmethod
+    def same_tools(a: list[Tool], b: list[Tool]) -> bool:
+        return [_tool_to_dict(t) for t in a] == [_tool_to_dict(t) for t in b]
@@ -0,0 +1,130 @@
+"""
+工具筛选：每条用户消息只把最相关的 top-k 个工具 schema 发给 LLM，减少 prompt token 与 prefill 延迟。
+
+对工具名、描述与参数说明建 BM25 索引；英文按单词切分（工具名的下划线也拆开），
+中文按字的 unigram + bigram 切分。得分低于最高分 MCP_TOOLS_MIN_RATIO 倍的工具不发送
+（常用单字在许多描述里都会出现，只凭单字重合的得分不代表相关）；始终包含 MCP_TOOLS_ALWAYS 匹配的工具。
+若没有任何工具与消息有共同的英文单词或中文双字词（即只有单字重合或完全不重合），视为都不相关，
+退回发送全部工具，避免模型无工具可用。
+"""
+import math
+import os
+import re
+from collections import Counter
+from fnmatch import fnmatchcase
+
+MCP_TOOLS_TOP_K = int(os.environ.get("MCP_TOOLS_TOP_K", "6"))
+MCP_TOOLS_MIN_RATIO = float(os.environ.get("MCP_TOOLS_MIN_RATIO", "0.2"))
+MCP_TOOLS_ALWAYS = [
+    p.strip()
+    for p in os.environ.get("MCP_TOOLS_ALWAYS", "robot_emergency_stop,*__robot_emergency_stop").split(",")
+    if p.strip()
+]
+
+_WORD = re.compile(r"[a-z0-9]+")
+_CJK_RUN = re.compile(r"[\u4e00-\u9fff]+")
+
+_K1 = 1.2
+_B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    """英文单词 + 中文 unigram/bigram。"""
+    text = (text or "").lower()
+    tokens = _WORD.findall(text)
+    for run in _CJK_RUN.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _is_unigram(term: str) -> bool:
+    return len(term) == 1 and _CJK_RUN.match(term) is not None
+
+
+def _schema_text(schema: dict) -> str:
+    fn = schema.get("function") or {}
+    parts = [fn.get("name", ""), fn.get("description", "")]
+    props = (fn.get("parameters") or {}).get("properties") or {}
+    for name, prop in props.items():
+        parts.append(name)
+        if isinstance(prop, dict):
+            parts.append(str(prop.get("title", "")))
+            parts.append(str(prop.get("description", "")))
+    return " ".join(parts)
+
+
+class ToolSelector:
+    def __init__(
+        self,
+        schemas: list[dict],
+        top_k: int = MCP_TOOLS_TOP_K,
+        always: list[str] | None = None,
+        min_ratio: float = MCP_TOOLS_MIN_RATIO,
+    ):
+        self.schemas = schemas
+        self.top_k = top_k
+        self.min_ratio = min_ratio
+        self.always = MCP_TOOLS_ALWAYS if always is None else always
+        self._docs = [Counter(tokenize(_schema_text(s))) for s in schemas]
+        self._lengths = [sum(d.values()) for d in self._docs]
+        self._avg_len = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        df: Counter = Counter()
+        for d in self._docs:
+            df.update(d.keys())
+        n = len(self._docs)
+        self._idf = {t: math.log(1 + (n - c + 0.5) / (c + 0.5)) for t, c in df.items()}
+        self.requests = 0
+        self.tools_sent = 0
+
+    @staticmethod
+    def _name(schema: dict) -> str:
+        return (schema.get("function") or {}).get("name", "")
+
+    def scores(self, query: str) -> list[float]:
+        terms = set(tokenize(query))
+        out = []
+        for doc, length in zip(self._docs, self._lengths):
+            score = 0.0
+            for t in terms:
+                tf = doc.get(t)
+                if not tf:
+                    continue
+                norm = _K1 * (1 - _B + _B * length / (self._avg_len or 1))
+                score += self._idf[t] * tf * (_K1 + 1) / (tf + norm)
+            out.append(score)
+        return out
+
+    def relevant(self, query: str) -> bool:
+        """是否有工具与消息共享英文单词或中文双字词。"""
+        terms = [t for t in set(tokenize(query)) if not _is_unigram(t)]
+        return any(t in doc for doc in self._docs for t in terms)
+
+    def select(self, query: str, extra_names: set[str] | None = None) -> list[dict]:
+        """返回本轮要发送的工具 schema（保持原顺序）；extra_names 为需要额外保留的工具名。"""
+        self.requests += 1
+        if self.top_k <= 0 or len(self.schemas) <= self.top_k:
+            chosen = self.schemas
+        else:
+            scores = self.scores(query)
+            if not self.relevant(query):
+                chosen = self.schemas
+            else:
+                ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+                floor = max(scores) * self.min_ratio
+                keep = {i for i in ranked[: self.top_k] if scores[i] > 0 and scores[i] >= floor}
+                extra = extra_names or set()
+                for i, s in enumerate(self.schemas):
+                    name = self._name(s)
+                    if name in extra or any(fnmatchcase(name, p) for p in self.always):
+                        keep.add(i)
+                chosen = [s for i, s in enumerate(self.schemas) if i in keep]
+        self.tools_sent += len(chosen)
+        return chosen
+
+    def report(self) -> None:
+        avg = self.tools_sent / self.requests if self.requests else 0.0
+        print(
+            f"[tools] 共 {len(self.schemas)} 个工具，top_k={self.top_k}，"
+            f"{self.requests} 次筛选，平均每次发送 {avg:.1f} 个"
+        )
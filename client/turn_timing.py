@@ -0,0 +1,73 @@
+"""
+每轮对话的耗时拆分：LLM 等待、工具调度、JSON 解析、历史处理，其余计为 other（打印、选工具等）。
+
+- llm：等待模型响应（流式模式下包含边流边执行的工具调用）；
+- dispatch：模型返回后等待工具结果的墙钟时间（直达指令的工具调用也计入此项）；
+- parse：响应归一化（backends.py 各后端的 normalize）与工具参数 JSON 解析（在调度任务内进行，同时计入 dispatch）；
+- history：history.compact() 与消息追加。
+
+/stats 打印累计平均；设置 MCP_TURN_LOG=文件路径 时每轮追加一行 JSON，供 bench/agent_bench.py 汇总。
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+
+MCP_TURN_LOG = os.environ.get("MCP_TURN_LOG", "").strip()
+
+PHASES = ("llm", "dispatch", "parse", "history")
+
+
+class TurnTimer:
+    def __init__(self, dispatcher=None, log_path: str = MCP_TURN_LOG):
+        self.dispatcher = dispatcher
+        self.log_path = log_path
+        self.turns = 0
+        self.totals = {p: 0.0 for p in (*PHASES, "other", "total")}
+        self._current: dict | None = None
+
+    def start_turn(self) -> None:
+        self._current = {p: 0.0 for p in PHASES}
+        self._current["rounds"] = 0
+        self._started = time.perf_counter()
+        self._parse_mark = self._dispatcher_parse_time()
+
+    def _dispatcher_parse_time(self) -> float:
+        return getattr(self.dispatcher, "parse_time", 0.0)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self._current is not None:
+                self._current[name] += time.perf_counter() - started
+                if name == "llm":
+                    self._current["rounds"] += 1
+
+    def end_turn(self, **extra) -> None:
+        cur, self._current = self._current, None
+        if cur is None:
+            return
+        cur["parse"] += self._dispatcher_parse_time() - self._parse_mark
+        total = time.perf_counter() - self._started
+        # parse 与 dispatch 有重叠，other 只扣除不重叠的部分
+        cur["other"] = max(0.0, total - cur["llm"] - cur["dispatch"] - cur["history"])
+        cur["total"] = total
+        self.turns += 1
+        for key in self.totals:
+            self.totals[key] += cur[key]
+        if self.log_path:
+            record = {k: round(v, 6) if isinstance(v, float) else v for k, v in cur.items()}
+            record.update(extra)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def report(self) -> None:
+        if not self.turns:
+            print("[timing] 尚无完成的对话轮次")
+            return
+        avg = {k: v / self.turns * 1000 for k, v in self.totals.items()}
+        parts = "，".join(f"{k} {avg[k]:.1f}" for k in (*PHASES, "other"))
+        print(f"[timing] {self.turns} 轮，平均每轮 {avg['total']:.1f} ms：{parts}（ms）")
@@ -0,0 +1,183 @@
+"""
+聚合网关 MCP 服务：对后端 MCP 服务保持一组常驻 session，把它们的工具汇总到一个端点，
+并把每次调用转发给对应后端。大量短连接客户端共享已预热的后端连接，无需各自握手。
+
+后端：GATEWAY_UPSTREAMS（逗号分隔的 Streamable HTTP 地址）；未设置时以 stdio 子进程
+启动 server/ 下的 MCP_SERVERS。连接池随服务启动建立、退出时关闭（后端子进程与 HTTP session 随之释放），
+运行期间一直复用；HTTP 后端由 client/sessions.py 托管，空闲保活，断线后自动重连。
+
+连接池的生命周期：stdio 传输挂在 FastMCP 的 lifespan 上；HTTP / SSE 传输下 lifespan 按客户端 session
+进入与退出，因此另挂在 Starlette 应用的 lifespan 上，所有客户端 session 共用同一个连接池。
+连接池按持有者计数，由一个专门的任务以 async with 打开并关闭。
+
+工具命名：GATEWAY_NAMESPACE=1 时所有工具名加后端前缀（如 weather__get_weather）；
+默认不加前缀，仅在重名时给后出现的工具加前缀，并记录告警。
+"""
+import asyncio
+import logging
+import os
+import re
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+
+from mcp import types
+from mcp.server.fastmcp import FastMCP
+
+# 复用 client/connect.py 的并发连接、超时与工具目录缓存逻辑
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "client"))
+from connect import ServerHandle, ServerPool, http_specs, stdio_specs  # noqa: E402
+from sessions import SessionManager, open_servers  # noqa: E402
+
+GATEWAY_UPSTREAMS = [u.strip() for u in os.environ.get("GATEWAY_UPSTREAMS", "").split(",") if u.strip()]
+GATEWAY_NAMESPACE = os.environ.get("GATEWAY_NAMESPACE", "0") not in ("0", "false", "no", "")
+NAMESPACE_SEP = "__"
+
+logger = logging.getLogger("gateway-mcp")
+
+
+def _namespace(handle: ServerHandle) -> str:
+    """后端前缀：stdio 用 MCP_SERVERS 中的标签，HTTP 用 initialize 返回的服务名（去掉 -mcp）。"""
+    if handle.spec.kind == "stdio":
+        name = handle.spec.label
+    else:
+        name = handle.server_name or handle.spec.label
+        name = re.sub(r"-mcp$", "", name)
+    return re.sub(r"[^A-Za-z0-9_]", "_", name)
+
+
+@asynccontextmanager
+async def _lifespan(server: "GatewayMCP"):
+    async with server.hold_pool():
+        yield {}
+
+
+class GatewayMCP(FastMCP):
+    def __init__(self, *args, upstreams: list[str] | None = None, namespace: bool = False, **kwargs):
+        super().__init__(*args, lifespan=_lifespan, **kwargs)
+        self.upstreams = upstreams or []
+        self.namespace = namespace
+        self._pool: ServerPool | SessionManager | None = None
+        self._pool_lock = asyncio.Lock()
+        self._pool_holders = 0
+        self._pool_task: asyncio.Task | None = None
+        self._pool_closing = asyncio.Event()
+        self._routes: dict[str, tuple[ServerHandle, types.Tool]] = {}
+        self._routes_version = -1
+
+    async def _run_pool(self, ready: asyncio.Future) -> None:
+        """打开连接池并保持到 _pool_closing 被置位；async with 的进入与退出都在本任务中。"""
+        specs = http_specs(self.upstreams) if self.upstreams else stdio_specs()
+        try:
+            async with open_servers(specs) as pool:
+                for line in pool.report_lines():
+                    logger.info(line)
+                self._pool = pool
+                ready.set_result(pool)
+                try:
+                    await self._pool_closing.wait()
+                finally:
+                    self._pool = None
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e)
+            raise
+
+    @asynccontextmanager
+    async def hold_pool(self):
+        """持有连接池：第一个持有者打开，最后一个持有者退出时关闭。"""
+        async with self._pool_lock:
+            if self._pool_holders == 0:
+                self._pool_closing.clear()
+                ready = asyncio.get_running_loop().create_future()
+                self._pool_task = asyncio.create_task(self._run_pool(ready))
+                await ready
+            self._pool_holders += 1
+        try:
+            yield self._pool
+        finally:
+            async with self._pool_lock:
+                self._pool_holders -= 1
+                if self._pool_holders == 0:
+                    self._pool_closing.set()
+                    await asyncio.gather(self._pool_task, return_exceptions=True)
+                    self._pool_task = None
+                    self._routes, self._routes_version = {}, -1
+
+    def _hold_pool_in_app(self, app):
+        """让连接池覆盖整个 HTTP 应用的运行期，而不是单个客户端 session。"""
+        inner = app.router.lifespan_context
+
+        @asynccontextmanager
+        async def lifespan(starlette_app):
+            async with self.hold_pool():
+                async with inner(starlette_app) as state:
+                    yield state
+
+        app.router.lifespan_context = lifespan
+        return app
+
+    def streamable_http_app(self):
+        return self._hold_pool_in_app(super().streamable_http_app())
+
+    def sse_app(self, mount_path: str | None = None):
+        return self._hold_pool_in_app(super().sse_app(mount_path))
+
+    def _ensure_pool(self) -> ServerPool | SessionManager:
+        if self._pool is None:
+            raise RuntimeError("网关连接池未打开：请在服务运行期间（lifespan 内）调用")
+        return self._pool
+
+    def _rebuild_routes(self, pool: ServerPool | SessionManager) -> None:
+        routes: dict[str, tuple[ServerHandle, types.Tool]] = {}
+        for handle in pool.connected:
+            ns = _namespace(handle)
+            for tool in handle.tools:
+                name = tool.name
+                if self.namespace or name in routes:
+                    if not self.namespace:
+                        logger.warning("工具重名：%s（%s），改名为 %s%s%s", name, handle.spec.label, ns, NAMESPACE_SEP, name)
+                    name = f"{ns}{NAMESPACE_SEP}{tool.name}"
+                routes[name] = (handle, tool)
+        self._routes = routes
+        self._routes_version = pool.tools_version
+
+    async def _current_routes(self) -> dict[str, tuple[ServerHandle, types.Tool]]:
+        pool = self._ensure_pool()
+        if self._routes_version != pool.tools_version:
+            self._rebuild_routes(pool)
+        return self._routes
+
+    async def list_tools(self) -> list[types.Tool]:
+        routes = await self._current_routes()
+        return [tool.model_copy(update={"name": name}) for name, (_handle, tool) in routes.items()]
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]) -> types.CallToolResult:
+        routes = await self._current_routes()
+        route = routes.get(name)
+        if route is None:
+            return types.CallToolResult(
+                content=[types.TextContent(type="text", text=f"未知工具: {name}")],
+                isError=True,
+            )
+        handle, tool = route
+        if handle.session is None:
+            return types.CallToolResult(
+                content=[types.TextContent(type="text", text=f"后端 {handle.spec.label} 不可用")],
+                isError=True,
+            )
+        return await handle.session.call_tool(tool.name, arguments)
+
+
+mcp = GatewayMCP(
+    "gateway-mcp",
+    host=os.environ.get("MCP_HOST", "127.0.0.1"),
+    port=int(os.environ.get("MCP_PORT", "8000")),
+    upstreams=GATEWAY_UPSTREAMS,
+    namespace=GATEWAY_NAMESPACE,
+)
+
+
+if __name__ == "__main__":
+    mcp.run(transport=os.environ.get("MCP_TRANSPORT", "stdio"))
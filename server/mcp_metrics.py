@@ -0,0 +1,314 @@
+"""
+各 MCP 服务共用的指标层：包装每个 @mcp.tool() 函数，记录调用次数、耗时直方图、异常次数与进行中调用数；
+以 streamable-http 运行时在 /metrics 暴露 Prometheus 文本格式（无需 prometheus_client）。
+
+用法：创建 FastMCP 后、定义工具前调用 instrument(mcp)。服务自身的指标（如天气上游耗时）
+通过 REGISTRY.counter() / histogram() / collector() 注册，同样出现在 /metrics 中。
+
+可选采样分析（默认关闭）：MCP_PROFILE_TOOLS 为工具名模式（逗号分隔，支持 *）时，匹配的工具调用进行期间，
+后台线程每 MCP_PROFILE_INTERVAL_MS 毫秒采样一次事件循环线程的调用栈，按 "工具;栈帧..." 折叠计数
+（flamegraph.pl / speedscope 可直接读取）。HTTP 模式在 /debug/profile 查看；
+设置 MCP_PROFILE_OUTPUT 时进程退出前写入该文件。
+"""
+import atexit
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
+
+MCP_METRICS = os.environ.get("MCP_METRICS", "1") not in ("0", "false", "no", "")
+MCP_PROFILE_TOOLS = [p.strip() for p in os.environ.get("MCP_PROFILE_TOOLS", "").split(",") if p.strip()]
+MCP_PROFILE_INTERVAL_MS = float(os.environ.get("MCP_PROFILE_INTERVAL_MS", "5"))
+MCP_PROFILE_OUTPUT = os.environ.get("MCP_PROFILE_OUTPUT", "").strip()
+
+# 耗时直方图桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values: dict[tuple, float] = {}
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: tuple, value: float) -> None:
+        self.values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series: dict[tuple, list] = {}  # labels -> [各桶计数..., sum, count]
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]:g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """同名指标只注册一次（进程内托管多个服务时共享，以 server 标签区分）。"""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list = []
+
+    def _get(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        return self._get(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: tuple = ()) -> Gauge:
+        return self._get(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, labelnames, buckets)
+
+    def collector(self, fn) -> None:
+        """注册在每次渲染前调用的函数，用于把已有计数（如缓存统计）同步到指标上。"""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            fn()
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+_calls = REGISTRY.counter("mcp_tool_calls_total", "工具调用次数", ("server", "tool"))
+_errors = REGISTRY.counter("mcp_tool_errors_total", "工具调用抛出异常的次数", ("server", "tool"))
+_in_flight = REGISTRY.gauge("mcp_tool_in_flight", "进行中的工具调用数", ("server", "tool"))
+_duration = REGISTRY.histogram("mcp_tool_duration_seconds", "工具调用耗时（秒）", ("server", "tool"))
+_rss = REGISTRY.gauge("process_resident_memory_bytes", "进程常驻内存（字节）")
+
+
+def _collect_rss() -> None:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return
+    _rss.set((), pages * os.sysconf("SC_PAGE_SIZE"))
+
+
+REGISTRY.collector(_collect_rss)
+
+
+class StackSampler:
+    """匹配的工具调用进行期间，定时采样发起调用的线程（事件循环线程）的调用栈。"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts: dict[str, int] = {}
+        self.samples = 0
+        self._active: dict[str, int] = {}
+        self._thread_id: int | None = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def enter(self, tool: str) -> None:
+        with self._lock:
+            self._active[tool] = self._active.get(tool, 0) + 1
+            self._thread_id = threading.get_ident()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mcp-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def exit(self, tool: str) -> None:
+        with self._lock:
+            self._active[tool] -= 1
+            if not self._active[tool]:
+                del self._active[tool]
+            if not self._active:
+                self._wake.clear()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                tools = list(self._active)
+                frame = sys._current_frames().get(self._thread_id)
+            if not tools or frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            folded = ";".join(reversed(stack))
+            with self._lock:
+                self.samples += 1
+                for tool in tools:
+                    key = f"{tool};{folded}"
+                    self.counts[key] = self.counts.get(key, 0) + 1
+
+    def collapsed(self) -> str:
+        with self._lock:
+            items = sorted(self.counts.items(), key=lambda kv: -kv[1])
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def dump(self, path: str) -> None:
+        if self.samples:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.collapsed())
+
+
+_sampler: StackSampler | None = None
+
+
+def _get_sampler() -> StackSampler:
+    global _sampler
+    if _sampler is None:
+        _sampler = StackSampler(MCP_PROFILE_INTERVAL_MS / 1000)
+        if MCP_PROFILE_OUTPUT:
+            atexit.register(_sampler.dump, MCP_PROFILE_OUTPUT)
+    return _sampler
+
+
+@contextmanager
+def track(server: str, tool: str, profile: bool = False):
+    labels = (server, tool)
+    sampler = _get_sampler() if profile else None
+    _in_flight.inc(labels)
+    if sampler is not None:
+        sampler.enter(tool)
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        _errors.inc(labels)
+        raise
+    finally:
+        _duration.observe(labels, time.perf_counter() - started)
+        _calls.inc(labels)
+        _in_flight.dec(labels)
+        if sampler is not None:
+            sampler.exit(tool)
+
+
+def _wrap_tool(fn, server: str, tool: str):
+    profile = any(fnmatchcase(tool, p) for p in MCP_PROFILE_TOOLS)
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            with track(server, tool, profile):
+                return await fn(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with track(server, tool, profile):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def instrument(mcp, registry: Registry = REGISTRY) -> None:
+    """让之后用 @mcp.tool() 注册的工具都经过指标包装，并注册 /metrics（与 /debug/profile）路由。"""
+    if not MCP_METRICS:
+        return
+    server = mcp.name
+    register = mcp.tool
+
+    def tool(name: str | None = None, *args, **kwargs):
+        decorator = register(name, *args, **kwargs)
+
+        def wrap(fn):
+            decorator(_wrap_tool(fn, server, name or fn.__name__))
+            return fn
+
+        return wrap
+
+    mcp.tool = tool
+
+    from starlette.responses import PlainTextResponse
+
+    @mcp.custom_route("/metrics", methods=["GET"])
+    async def metrics_endpoint(request):
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    if MCP_PROFILE_TOOLS:
+
+        @mcp.custom_route("/debug/profile", methods=["GET"])
+        async def profile_endpoint(request):
+            return PlainTextResponse(_get_sampler().collapsed())
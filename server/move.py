@@ -1,83 +1,403 @@
 """
 机器人运动能力 MCP 服务：纯模拟，通过打印模拟执行，不连接真实硬件。
+
+动作（站立、趴下、行走、转向、步态切换）按限时任务异步执行：行走按步态模式的步频计时，转向按角速度计时，
+执行中逐步发送 MCP 进度通知（调用方提供 progressToken 时）。新动作按 MOVE_MOTION_POLICY 排队等待
+（queue，默认）或中断正在执行与排队的动作（preempt）；开启急停立即取消全部动作。
+状态查询不等待动作，随时立即返回。
+
+位姿（x、y、朝向）按航位推算随每一步行走、每一段转向更新，历史轨迹存放在定长环形缓冲中，内存占用固定。
 """
+import asyncio
+import math
 import os
+import time
+from array import array
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.types import ToolAnnotations
+from pydantic import BaseModel
+
+from mcp_metrics import instrument
+from serving import run
 
 mcp = FastMCP(
     "move-mcp",
     host=os.environ.get("MCP_HOST", "127.0.0.1"),
     port=int(os.environ.get("MCP_PORT", "8004")),
 )
+instrument(mcp)
 
 # 模拟状态（供 robot_get_status 使用）
 _state = {
     "posture": "unknown",  # stand | lie_down | unknown
     "gait_mode": "walk",    # walk | run
     "emergency_stop": False,
+    # 航位推算位姿：单位米；heading 为相对初始朝向的角度（度，左转为正，范围 (-180, 180]）
+    "x": 0.0,
+    "y": 0.0,
+    "heading": 0.0,
 }
 
+# robot_execute_sequence 单次最多动作数
+MOVE_SEQUENCE_MAX = int(os.environ.get("MOVE_SEQUENCE_MAX", "20"))
+# 动作计时：每秒步数（按步态模式）、转向角速度（度/秒）、站立/趴下耗时（秒）；MOVE_TIME_SCALE 整体缩放，0 表示瞬时完成
+MOVE_STEP_RATE = {
+    "walk": float(os.environ.get("MOVE_WALK_STEP_RATE", "2")),
+    "run": float(os.environ.get("MOVE_RUN_STEP_RATE", "4")),
+}
+MOVE_TURN_RATE = float(os.environ.get("MOVE_TURN_RATE", "90"))
+MOVE_POSTURE_SECONDS = float(os.environ.get("MOVE_POSTURE_SECONDS", "1"))
+MOVE_TIME_SCALE = float(os.environ.get("MOVE_TIME_SCALE", "1"))
+# 新动作到来时已有动作在执行：queue 排队，preempt 中断已有动作
+MOVE_MOTION_POLICY = os.environ.get("MOVE_MOTION_POLICY", "queue").strip().lower()
+# 转向进度按此角度分段上报
+_TURN_TICK_DEGREES = 15
+# 每步前进距离（米）与轨迹缓冲容量（样本数，每个样本 32 字节）
+MOVE_STEP_LENGTH = float(os.environ.get("MOVE_STEP_LENGTH", "0.5"))
+MOVE_TRAJECTORY_SIZE = int(os.environ.get("MOVE_TRAJECTORY_SIZE", "4096"))
 
-@mcp.tool()
-def robot_stand() -> str:
+
+class PoseHistory:
+    """
+    定长环形缓冲：样本 (t, x, y, heading) 依次存放在一个预分配的 array('d') 中，写满后覆盖最旧样本。
+    t 为 time.monotonic()，单调递增，按时间查询时二分定位。
+    """
+
+    FIELDS = 4
+
+    def __init__(self, capacity: int):
+        self.capacity = max(2, capacity)
+        self._data = array("d", bytes(8 * self.FIELDS * self.capacity))
+        self._start = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.itemsize * len(self._data)
+
+    def append(self, t: float, x: float, y: float, heading: float) -> None:
+        if self._count < self.capacity:
+            slot = (self._start + self._count) % self.capacity
+            self._count += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        base = slot * self.FIELDS
+        data = self._data
+        data[base], data[base + 1], data[base + 2], data[base + 3] = t, x, y, heading
+
+    def sample(self, i: int) -> tuple[float, float, float, float]:
+        """第 i 个样本（0 为最旧）。"""
+        base = (self._start + i) % self.capacity * self.FIELDS
+        return tuple(self._data[base : base + self.FIELDS])
+
+    def _time(self, i: int) -> float:
+        return self._data[(self._start + i) % self.capacity * self.FIELDS]
+
+    def query(self, since: float = 0.0, max_points: int = 0) -> tuple[int, list[tuple]]:
+        """返回 (时间窗内样本数, 样本列表)：只取 t >= since 的样本；max_points > 0 时等间隔抽样（保留首尾）。"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._time(mid) < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        n = self._count - lo
+        if max_points <= 0 or n <= max_points:
+            indexes = range(lo, self._count)
+        elif max_points == 1:
+            indexes = [self._count - 1]
+        else:
+            indexes = [lo + round(k * (n - 1) / (max_points - 1)) for k in range(max_points)]
+        return n, [self.sample(i) for i in indexes]
+
+
+_trajectory = PoseHistory(MOVE_TRAJECTORY_SIZE)
+
+
+def _record_pose() -> None:
+    _trajectory.append(time.monotonic(), _state["x"], _state["y"], _state["heading"])
+
+
+_record_pose()
+
+
+def _normalize_angle(degrees: float) -> float:
+    degrees = math.fmod(degrees, 360.0)
+    if degrees > 180:
+        degrees -= 360
+    elif degrees <= -180:
+        degrees += 360
+    return degrees
+
+
+def _num(value: float, digits: int) -> float:
+    return round(value, digits) + 0.0  # 避免显示 -0.00
+
+
+def _pose_text() -> str:
+    return f"x={_num(_state['x'], 2):.2f}m，y={_num(_state['y'], 2):.2f}m，朝向={_num(_state['heading'], 1):.1f}°"
+
+
+class Action(BaseModel):
+    action: str
+    direction: str | None = None
+    steps: int | None = None
+    degrees: float | None = None
+    mode: str | None = None
+
+
+def _describe(a: Action) -> str:
+    if a.action == "walk":
+        return f"向{'前' if a.direction == 'forward' else '后'}走 {a.steps} 步"
+    if a.action == "turn":
+        return f"{'左' if a.direction == 'left' else '右'}转 {a.degrees} 度"
+    if a.action == "set_gait_mode":
+        return f"切换为{'行走' if a.mode == 'walk' else '跑步'}模式"
+    return "机器人站立" if a.action == "stand" else "机器人趴下"
+
+
+def _done_text(a: Action) -> str:
+    if a.action == "set_gait_mode":
+        return f"已{_describe(a)}"
+    if a.action in ("stand", "lie_down"):
+        return f"机器人已{'站立' if a.action == 'stand' else '趴下'}"
+    return _describe(a)
+
+
+def _ticks(a: Action) -> tuple[int, float]:
+    """动作拆成的进度分段数与每段耗时（秒，已按 MOVE_TIME_SCALE 缩放）。步频在动作开始时按当前步态取值。"""
+    if a.action == "walk":
+        return max(a.steps, 0), MOVE_TIME_SCALE / MOVE_STEP_RATE.get(_state["gait_mode"], MOVE_STEP_RATE["walk"])
+    if a.action == "turn":
+        count = max(1, math.ceil(a.degrees / _TURN_TICK_DEGREES))
+        return count, MOVE_TIME_SCALE * a.degrees / MOVE_TURN_RATE / count
+    if a.action in ("stand", "lie_down"):
+        return 1, MOVE_TIME_SCALE * MOVE_POSTURE_SECONDS
+    return 0, 0.0
+
+
+def _tick_text(a: Action, done: int, count: int) -> str:
+    if a.action == "walk":
+        return f"{_describe(a)}：{done}/{count} 步"
+    if a.action == "turn":
+        return f"{_describe(a)}：{a.degrees * done / count:g}/{a.degrees} 度"
+    return _describe(a)
+
+
+def _partial_text(a: Action, done: int) -> str:
+    if a.action == "walk":
+        return f"{_describe(a)}，完成 {done} 步"
+    if a.action == "turn":
+        return f"{_describe(a)}，已转 {a.degrees * done / _ticks(a)[0]:g} 度"
+    return f"{_describe(a)}，未完成"
+
+
+def _advance_pose(a: Action, count: int) -> None:
+    """一个进度分段完成后按航位推算更新位姿：行走每段一步，转向每段转过 degrees / count。"""
+    if a.action == "walk":
+        distance = MOVE_STEP_LENGTH if a.direction == "forward" else -MOVE_STEP_LENGTH
+        rad = math.radians(_state["heading"])
+        _state["x"] += distance * math.cos(rad)
+        _state["y"] += distance * math.sin(rad)
+    elif a.action == "turn":
+        delta = a.degrees / count
+        _state["heading"] = _normalize_angle(_state["heading"] + (delta if a.direction == "left" else -delta))
+    else:
+        return
+    _record_pose()
+
+
+def _apply(a: Action) -> None:
+    """动作完成后更新模拟状态。"""
+    if a.action in ("stand", "lie_down"):
+        _state["posture"] = a.action
+    elif a.action == "set_gait_mode":
+        _state["gait_mode"] = a.mode
+
+
+class MotionJob:
+    """一次工具调用提交的动作（序列）；segments 按顺序执行，results 与之一一对应。"""
+
+    def __init__(self, segments: list[Action], ctx: Context | None):
+        self.segments = segments
+        self.ctx = ctx
+        self.results: list[str] = []
+        self.state = "queued"  # queued | running | done | cancelled
+        self.reason = ""
+        self.segment = 0
+        self.segment_done = 0
+        self.progress = 0
+        self.total = sum(_ticks(a)[0] for a in segments)
+        self.task: asyncio.Task | None = None
+
+    @property
+    def label(self) -> str:
+        return "、".join(_describe(a) for a in self.segments)
+
+    async def report(self, message: str) -> None:
+        if self.ctx is None or not self.total:
+            return
+        try:
+            await self.ctx.report_progress(self.progress, self.total, message)
+        except Exception:
+            pass  # 进度通知尽力而为，调用方断开不影响动作本身
+
+    def cancel(self, reason: str) -> None:
+        if self.task is not None and not self.task.done():
+            self.reason = reason
+            self.task.cancel()
+
+
+class MotionController:
+    """串行执行动作任务：同一时刻只有一个任务在运动，其余按提交顺序排队。"""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self.jobs: list[MotionJob] = []
+        self.completed = 0
+        self.cancelled = 0
+
+    async def run(self, segments: list[Action], ctx: Context | None = None) -> MotionJob:
+        if MOVE_MOTION_POLICY == "preempt":
+            self.cancel_all("被新动作中断")
+        job = MotionJob(segments, ctx)
+        self.jobs.append(job)
+        job.task = asyncio.create_task(self._execute(job))
+        try:
+            await asyncio.shield(job.task)
+        except asyncio.CancelledError:
+            # 调用方取消了请求：动作随之停止
+            job.cancel("请求已取消")
+            raise
+        return job
+
+    def cancel_all(self, reason: str) -> int:
+        jobs = [j for j in self.jobs if j.state in ("queued", "running")]
+        for job in jobs:
+            job.cancel(reason)
+        return len(jobs)
+
+    async def _execute(self, job: MotionJob) -> None:
+        try:
+            async with self._lock:
+                job.state = "running"
+                for index, a in enumerate(job.segments):
+                    job.segment, job.segment_done = index, 0
+                    count, delay = _ticks(a)
+                    print(f"模拟：{_describe(a)}")
+                    for done in range(1, count + 1):
+                        await asyncio.sleep(delay)
+                        _advance_pose(a, count)
+                        job.segment_done = done
+                        job.progress += 1
+                        await job.report(_tick_text(a, done, count))
+                    _apply(a)
+                    job.results.append(f"已执行：{_done_text(a)}。")
+            job.state = "done"
+            self.completed += 1
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+            self.cancelled += 1
+            reason = job.reason or "已取消"
+            if job.results or job.segment_done or job.segment:
+                a = job.segments[job.segment]
+                job.results.append(f"已中断：{_partial_text(a, job.segment_done)}（{reason}）。")
+            else:
+                job.results.append(f"未执行：{_describe(job.segments[0])}（{reason}）。")
+            job.results.extend(
+                f"未执行：{_describe(a)}（{reason}）。" for a in job.segments[len(job.results) :]
+            )
+        finally:
+            self.jobs.remove(job)
+
+    def summary(self) -> str:
+        running = next((j for j in self.jobs if j.state == "running"), None)
+        waiting = sum(1 for j in self.jobs if j.state == "queued")
+        if running is None:
+            return "运动=空闲"
+        a = running.segments[running.segment]
+        count = _ticks(a)[0]
+        text = _tick_text(a, running.segment_done, count) if count else _describe(a)
+        return f"运动={text}，排队={waiting}"
+
+
+_motions = MotionController()
+
+
+def _estop_refusal() -> str | None:
+    if _state["emergency_stop"]:
+        return "未执行：软件急停已开启，请先解除急停。"
+    return None
+
+
+async def _run_single(a: Action, ctx: Context) -> str:
+    refusal = _estop_refusal()
+    if refusal:
+        return refusal
+    problem = _check_action(a)
+    if problem:
+        return f"参数无效，未执行：{problem}。"
+    job = await _motions.run([a], ctx)
+    return job.results[0]
+
+
+@mcp.tool(annotations=ToolAnnotations(idempotentHint=True))
+async def robot_stand(ctx: Context) -> str:
     """
     让机器人站立。无参数。
     """
-    print("模拟：机器人站立")
-    _state["posture"] = "stand"
-    return "已执行：机器人已站立。"
+    return await _run_single(Action(action="stand"), ctx)
 
 
-@mcp.tool()
-def robot_lie_down() -> str:
+@mcp.tool(annotations=ToolAnnotations(idempotentHint=True))
+async def robot_lie_down(ctx: Context) -> str:
     """
     让机器人趴下。无参数。
     """
-    print("模拟：机器人趴下")
-    _state["posture"] = "lie_down"
-    return "已执行：机器人已趴下。"
+    return await _run_single(Action(action="lie_down"), ctx)
 
 
 @mcp.tool()
-def robot_walk(direction: str, steps: int) -> str:
+async def robot_walk(direction: str, steps: int, ctx: Context) -> str:
     """
     机器人行走。direction 为 "forward"（前）或 "backward"（后），steps 为步数（正整数）。
     """
-    dir_cn = "前" if direction == "forward" else "后"
-    print(f"模拟：向{dir_cn}走 {steps} 步")
-    return f"已执行：向{dir_cn}走 {steps} 步。"
+    return await _run_single(Action(action="walk", direction=direction, steps=steps), ctx)
 
 
 @mcp.tool()
-def robot_turn(direction: str, degrees: float) -> str:
+async def robot_turn(direction: str, degrees: float, ctx: Context) -> str:
     """
     机器人转向。direction 为 "left"（左）或 "right"（右），degrees 为角度（如 30）。
     """
-    dir_cn = "左" if direction == "left" else "右"
-    print(f"模拟：{dir_cn}转 {degrees} 度")
-    return f"已执行：{dir_cn}转 {degrees} 度。"
+    return await _run_single(Action(action="turn", direction=direction, degrees=degrees), ctx)
 
 
-@mcp.tool()
-def robot_set_gait_mode(mode: str) -> str:
+@mcp.tool(annotations=ToolAnnotations(idempotentHint=True))
+async def robot_set_gait_mode(mode: str, ctx: Context) -> str:
     """
     切换步态模式。mode 为 "walk"（行走）或 "run"（跑步）。
     """
-    mode_cn = "行走" if mode == "walk" else "跑步"
-    print(f"模拟：切换为{mode_cn}模式")
-    _state["gait_mode"] = mode
-    return f"已执行：已切换为{mode_cn}模式。"
+    return await _run_single(Action(action="set_gait_mode", mode=mode), ctx)
 
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(idempotentHint=True))
 def robot_emergency_stop(enable: bool) -> str:
     """
-    开启或关闭软件急停。enable 为 True 表示开启急停，False 表示关闭。
+    开启或关闭软件急停。enable 为 True 表示开启急停（立即中断所有正在执行和排队的动作），False 表示关闭。
     """
     if enable:
         print("模拟：开启软件急停")
         _state["emergency_stop"] = True
+        cancelled = _motions.cancel_all("急停")
+        if cancelled:
+            return f"已执行：已开启软件急停，中断 {cancelled} 个动作。"
         return "已执行：已开启软件急停。"
     else:
         print("模拟：关闭软件急停")
@@ -85,18 +405,165 @@ def robot_emergency_stop(enable: bool) -> str:
         return "已执行：已关闭软件急停。"
 
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
 def robot_get_status() -> str:
     """
-    获取当前机器人模拟状态摘要：姿态、步态模式、急停是否开启。
+    获取当前机器人模拟状态摘要：姿态、步态模式、急停是否开启、位置朝向、正在执行的动作及进度。
     """
     posture_cn = {"stand": "站立", "lie_down": "趴下"}.get(_state["posture"], _state["posture"])
     gait_cn = {"walk": "行走", "run": "跑步"}.get(_state["gait_mode"], _state["gait_mode"])
     stop_cn = "开启" if _state["emergency_stop"] else "关闭"
-    msg = f"姿态={posture_cn}，步态模式={gait_cn}，软件急停={stop_cn}"
+    msg = f"姿态={posture_cn}，步态模式={gait_cn}，软件急停={stop_cn}，{_pose_text()}，{_motions.summary()}"
     print(f"模拟：查询状态 -> {msg}")
     return f"当前状态：{msg}。"
 
 
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
+def robot_get_pose() -> str:
+    """
+    获取机器人当前位置与朝向（航位推算）：x、y 单位米，以启动时位置为原点、初始朝向为 x 轴，朝向左转为正。
+    """
+    return f"当前位姿：{_pose_text()}。"
+
+
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
+def robot_get_trajectory(seconds: float = 0, max_points: int = 20) -> str:
+    """
+    查询机器人走过的轨迹（历史位置）。seconds 为只看最近多少秒（0 表示全部保留的历史），
+    max_points 为最多返回的点数，超出时等间隔抽样（保留起点与终点，0 表示不抽样）。
+    """
+    now = time.monotonic()
+    since = now - seconds if seconds > 0 else 0.0
+    total, points = _trajectory.query(since, max(0, max_points))
+    if not points:
+        return f"最近 {seconds:g} 秒内没有轨迹记录。"
+    scope = f"最近 {seconds:g} 秒" if seconds > 0 else "全部历史"
+    lines = [f"轨迹（{scope}）：共 {total} 个样本，返回 {len(points)} 个："]
+    for t, x, y, heading in points:
+        lines.append(f"{t - now:.1f}s x={_num(x, 2):.2f} y={_num(y, 2):.2f} 朝向={_num(heading, 1):.1f}°")
+    return "\n".join(lines)
+
+
+@mcp.tool(annotations=ToolAnnotations(idempotentHint=True))
+async def robot_return_to_origin(ctx: Context) -> str:
+    """
+    让机器人回到原点（启动时的位置）并恢复初始朝向：先转向原点，向前走回，再转回初始朝向。
+    """
+    refusal = _estop_refusal()
+    if refusal:
+        return refusal
+    x, y, heading = _state["x"], _state["y"], _state["heading"]
+    steps = round(math.hypot(x, y) / MOVE_STEP_LENGTH)
+    plan = []
+    if steps:
+        bearing = math.degrees(math.atan2(-y, -x))
+        plan.append(_turn_action(_normalize_angle(bearing - heading)))
+        plan.append(Action(action="walk", direction="forward", steps=steps))
+        heading = bearing
+    plan.append(_turn_action(_normalize_angle(-heading)))
+    plan = [a for a in plan if a.action != "turn" or a.degrees >= 0.05]
+    if not plan:
+        return f"{_origin_text('已在原点')}：{_pose_text()}。"
+    job = await _motions.run(plan, ctx)
+    head = _origin_text("已回到原点") if job.state == "done" else f"返回原点中断（{job.reason or '已取消'}）"
+    steps_text = "；".join(r.removeprefix("已执行：").rstrip("。") for r in job.results)
+    return f"{head}：{steps_text}。当前位姿：{_pose_text()}。"
+
+
+def _origin_text(head: str) -> str:
+    """只能按整步行走，与原点的距离不足一步时走不回去；按当前位姿如实给出剩余偏差。"""
+    residual = math.hypot(_state["x"], _state["y"])
+    if _num(residual, 2) == 0:
+        return head
+    return f"{head}附近（剩余偏差 {residual:.2f}m，不足一步 {MOVE_STEP_LENGTH:g}m）"
+
+
+def _turn_action(signed: float) -> Action:
+    return Action(action="turn", direction="left" if signed >= 0 else "right", degrees=round(abs(signed), 1))
+
+
+def _check_action(a: Action) -> str | None:
+    """返回该动作的参数错误说明，合法时返回 None。"""
+    if a.action == "walk":
+        if a.direction not in ("forward", "backward"):
+            return 'walk 的 direction 须为 "forward" 或 "backward"'
+        if a.steps is None or a.steps <= 0:
+            return "walk 的 steps 须为正整数"
+    elif a.action == "turn":
+        if a.direction not in ("left", "right"):
+            return 'turn 的 direction 须为 "left" 或 "right"'
+        if a.degrees is None or not 0 < a.degrees <= 360:
+            return "turn 的 degrees 须在 (0, 360] 之间"
+    elif a.action == "set_gait_mode":
+        if a.mode not in ("walk", "run"):
+            return 'set_gait_mode 的 mode 须为 "walk" 或 "run"'
+    elif a.action not in ("stand", "lie_down"):
+        return f"未知动作 {a.action!r}（可选 walk / turn / stand / lie_down / set_gait_mode）"
+    return None
+
+
+def _coalesce(actions: list[Action]) -> list[tuple[Action, list[int]]]:
+    """
+    合并相邻的同类动作，返回 [(合并后的动作, 原步骤序号列表)]：
+    同方向连续行走累加步数；连续转向按左正右负求和（抵消为 0 时省略）；
+    连续的站立/趴下/步态切换只保留最后一个。
+    """
+    merged: list[tuple[Action, list[int]]] = []
+    for index, a in enumerate(actions, 1):
+        prev = merged[-1][0] if merged else None
+        if prev is not None and prev.action == a.action:
+            if a.action == "walk" and prev.direction == a.direction:
+                prev.steps += a.steps
+                merged[-1][1].append(index)
+                continue
+            if a.action == "turn":
+                signed = (prev.degrees if prev.direction == "left" else -prev.degrees) + (
+                    a.degrees if a.direction == "left" else -a.degrees
+                )
+                prev.direction = "left" if signed >= 0 else "right"
+                prev.degrees = abs(signed)
+                merged[-1][1].append(index)
+                continue
+            if a.action in ("stand", "lie_down", "set_gait_mode"):
+                merged[-1] = (a.model_copy(), merged[-1][1] + [index])
+                continue
+        merged.append((a.model_copy(), [index]))
+    return [(a, idx) for a, idx in merged if not (a.action == "turn" and a.degrees == 0)]
+
+
+@mcp.tool()
+async def robot_execute_sequence(actions: list[Action], ctx: Context) -> str:
+    """
+    一次执行一串连续的机器人动作（动作序列，如"向前走3步再左转90度然后再走2步"），按顺序执行，
+    比多次调用 robot_walk / robot_turn 更快。actions 为有序列表，每项为
+    {"action": "walk", "direction": "forward"|"backward", "steps": 正整数} 或
+    {"action": "turn", "direction": "left"|"right", "degrees": 角度} 或
+    {"action": "set_gait_mode", "mode": "walk"|"run"} 或 {"action": "stand"} / {"action": "lie_down"}。
+    执行前整体校验，任一步无效或急停开启时不执行任何动作；相邻的同向行走、连续转向会合并执行。
+    """
+    refusal = _estop_refusal()
+    if refusal:
+        return refusal
+    if not actions:
+        return "未提供动作。"
+    if len(actions) > MOVE_SEQUENCE_MAX:
+        return f"一次最多 {MOVE_SEQUENCE_MAX} 个动作，收到 {len(actions)} 个。"
+    problems = [f"第 {i} 步：{err}" for i, a in enumerate(actions, 1) if (err := _check_action(a))]
+    if problems:
+        return "计划无效，未执行任何动作：\n" + "\n".join(problems)
+
+    plan = _coalesce(actions)
+    job = await _motions.run([a for a, _ in plan], ctx)
+    if job.state == "done":
+        lines = [f"序列完成：{len(actions)} 个动作合并为 {len(plan)} 步执行。"]
+    else:
+        lines = [f"序列中断（{job.reason or '已取消'}）：{len(actions)} 个动作合并为 {len(plan)} 步。"]
+    for i, ((_, indexes), result) in enumerate(zip(plan, job.results), 1):
+        text = result.removeprefix("已执行：").rstrip("。")
+        merged = f"（合并第 {'、'.join(map(str, indexes))} 步）" if len(indexes) > 1 else ""
+        lines.append(f"{i}. {text}{merged}")
+    return "\n".join(lines)
+
+
 if __name__ == "__main__":
-    mcp.run(transport=os.environ.get("MCP_TRANSPORT", "stdio"))
+    run(mcp, max_workers=1)
@@ -1,5 +1,9 @@
 import os
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
+
+from mcp_metrics import instrument
+from serving import run
 
 # 创建 MCP Server（HTTP 时使用 MCP_PORT，默认 8001）
 mcp = FastMCP(
@@ -7,16 +11,17 @@ mcp = FastMCP(
     host=os.environ.get("MCP_HOST", "127.0.0.1"),
     port=int(os.environ.get("MCP_PORT", "8001")),
 )
+instrument(mcp)
 
 # 定义一个 Tool
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
 def say_hello(name: str) -> str:
     """
-    Say hello to someone.
+    Say hello to someone. 向某人打招呼、问好，name 为对方的名字。
     """
     return f"Hello, {name}! 👋 This is MCP2 speaking."
 
 # 启动：MCP_TRANSPORT=stdio（默认）或 streamable-http；HTTP 时访问 http://host:port/mcp
 if __name__ == "__main__":
-    mcp.run(transport=os.environ.get("MCP_TRANSPORT", "stdio"))
+    run(mcp)
 
@@ -2,21 +2,26 @@ import os
 from datetime import datetime
 
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
+
+from mcp_metrics import instrument
+from serving import run
 
 mcp = FastMCP(
     "time-mcp",
     host=os.environ.get("MCP_HOST", "127.0.0.1"),
     port=int(os.environ.get("MCP_PORT", "8002")),
 )
+instrument(mcp)
 
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
 def get_time() -> str:
     """
-    Get current date and time.
+    Get current date and time. 查询当前日期与时间（现在几点、今天几号、几月几日）。
     """
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
 if __name__ == "__main__":
-    mcp.run(transport=os.environ.get("MCP_TRANSPORT", "stdio"))
+    run(mcp)
@@ -0,0 +1,240 @@
+"""
+服务启动入口：替代 mcp.run()。MCP_TRANSPORT=streamable-http 且 MCP_WORKERS > 1 时以多进程方式服务同一端口：
+主进程 fork 出 N 个工作进程，各自以 SO_REUSEPORT 绑定同一 host:port（由内核分摊连接；不支持时退回
+主进程预先监听、工作进程共享同一 socket），工作进程异常退出后自动重启。
+
+多进程下每个请求可能落到不同工作进程，因此强制使用无状态 HTTP（stateless_http），服务端不保存 MCP session；
+需要跨进程一致的状态（如天气缓存、上游限流）请放在 shared_store.SharedStore 中。
+有进程内状态的服务（move）通过 run(mcp, max_workers=1) 固定为单进程。/metrics 为各工作进程各自的计数。
+
+常驻模式（客户端 MCP_DAEMON=1 时由 client/daemon.py 启动）：设置 MCP_UDS=套接字路径 时以 streamable-http
+监听该 Unix 套接字（单进程），提供 GET /health；没有客户端连接且空闲超过 MCP_IDLE_EXIT 秒（0 不退出）后自动退出。
+"""
+import asyncio
+import hashlib
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+MCP_TRANSPORT = os.environ.get("MCP_TRANSPORT", "stdio")
+MCP_WORKERS = max(1, int(os.environ.get("MCP_WORKERS", "1")))
+MCP_UDS = os.environ.get("MCP_UDS", "").strip()
+MCP_IDLE_EXIT = float(os.environ.get("MCP_IDLE_EXIT", "0"))
+
+# 工作进程启动后这么短时间内退出视为启动失败（如端口被占用），不再重启
+_CRASH_WINDOW = 2.0
+
+
+def worker_count(max_workers: int | None = None) -> int:
+    """当前配置下实际的工作进程数（非 streamable-http 时总为 1）。"""
+    if MCP_TRANSPORT != "streamable-http":
+        return 1
+    return MCP_WORKERS if max_workers is None else max(1, min(MCP_WORKERS, max_workers))
+
+
+def run(mcp, max_workers: int | None = None) -> None:
+    if MCP_UDS:
+        asyncio.run(_serve_uds(mcp, MCP_UDS, MCP_IDLE_EXIT))
+        return
+    workers = worker_count(max_workers)
+    if workers <= 1:
+        if MCP_TRANSPORT == "streamable-http" and MCP_WORKERS > 1:
+            print(f"[{mcp.name}] 该服务有进程内状态，忽略 MCP_WORKERS={MCP_WORKERS}，以单进程运行", file=sys.stderr)
+        mcp.run(transport=MCP_TRANSPORT)
+        return
+    mcp.settings.stateless_http = True
+    _Master(mcp, workers).serve()
+
+
+def _bind(host: str, port: int, reuse_port: bool) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class _Master:
+    def __init__(self, mcp, workers: int):
+        self.mcp = mcp
+        self.workers = workers
+        self.host = mcp.settings.host
+        self.port = mcp.settings.port
+        self.reuse_port = hasattr(socket, "SO_REUSEPORT")
+        self.shared_sock: socket.socket | None = None
+        self.children: dict[int, float] = {}  # pid -> 启动时间
+        self.stopping = False
+
+    def serve(self) -> None:
+        # 先在主进程绑定一次：端口被占用时直接报错退出，而不是让工作进程反复崩溃
+        probe = _bind(self.host, self.port, self.reuse_port)
+        if self.reuse_port:
+            probe.close()
+        else:
+            self.shared_sock = probe
+        mode = "SO_REUSEPORT" if self.reuse_port else "共享监听 socket"
+        print(
+            f"[{self.mcp.name}] {self.workers} 个工作进程（{mode}，无状态 HTTP）监听 http://{self.host}:{self.port}",
+            file=sys.stderr,
+        )
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        for _ in range(self.workers):
+            self._spawn()
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if time.monotonic() - started < _CRASH_WINDOW:
+                print(f"[{self.mcp.name}] 工作进程 {pid} 启动后立即退出（{code}），停止服务", file=sys.stderr)
+                self._stop_children()
+                sys.exit(1)
+            print(f"[{self.mcp.name}] 工作进程 {pid} 退出（{code}），重新启动", file=sys.stderr)
+            self._spawn()
+
+    def _on_signal(self, signum, frame) -> None:
+        self.stopping = True
+        self._stop_children()
+
+    def _stop_children(self) -> None:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                self._worker()
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+
+    def _worker(self) -> None:
+        import uvicorn
+
+        sock = self.shared_sock or _bind(self.host, self.port, True)
+        config = uvicorn.Config(self.mcp.streamable_http_app(), log_level=self.mcp.settings.log_level.lower())
+        asyncio.run(uvicorn.Server(config).serve(sockets=[sock]))
+
+
+def script_hash(path: str) -> str:
+    """服务脚本内容哈希（与客户端工具目录缓存的算法一致），用于判断常驻服务是否运行的是旧代码。"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+class _Activity:
+    """ASGI 中间件：统计 HTTP 请求数与进行中的请求（含客户端 session 的 GET 长连接），记录最近活动时间。"""
+
+    def __init__(self, app):
+        self.app = app
+        self.requests = 0
+        self.in_flight = 0
+        self.last_active = time.monotonic()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            self.last_active = time.monotonic()
+
+    def idle_for(self) -> float:
+        return 0.0 if self.in_flight else time.monotonic() - self.last_active
+
+
+async def _serve_uds(mcp, path: str, idle_exit: float) -> None:
+    import uvicorn
+    from mcp.server.transport_security import TransportSecuritySettings
+    from starlette.responses import JSONResponse
+
+    # Unix 套接字只能由本机进程访问，不存在 DNS rebinding 问题；请求的 Host 头为 localhost（无端口）
+    mcp.settings.transport_security = TransportSecuritySettings(enable_dns_rebinding_protection=False)
+    started = time.monotonic()
+    main = sys.modules["__main__"]
+    code = script_hash(main.__file__) if getattr(main, "__file__", None) else ""
+    activity: _Activity | None = None
+
+    @mcp.custom_route("/health", methods=["GET"])
+    async def health(request):
+        rss = None
+        try:
+            with open("/proc/self/statm", encoding="ascii") as f:
+                rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, IndexError, ValueError):
+            pass
+        return JSONResponse(
+            {
+                "name": mcp.name,
+                "pid": os.getpid(),
+                "code": code,
+                "uptime_s": round(time.monotonic() - started, 1),
+                "requests": activity.requests,
+                # 不计本次 /health 请求
+                "clients": activity.in_flight - 1,
+                "idle_s": round(time.monotonic() - activity.last_active, 1) if activity.in_flight <= 1 else 0.0,
+                "idle_exit_s": idle_exit,
+                "rss_bytes": rss,
+            }
+        )
+
+    activity = _Activity(mcp.streamable_http_app())
+    server = uvicorn.Server(uvicorn.Config(activity, uds=path, log_level=mcp.settings.log_level.lower()))
+
+    inode = None
+
+    async def exit_when_idle():
+        nonlocal inode
+        while not server.started:
+            await asyncio.sleep(0.05)
+        inode = os.stat(path).st_ino
+        while idle_exit > 0 and not server.should_exit:
+            await asyncio.sleep(min(1.0, idle_exit))
+            if activity.idle_for() >= idle_exit:
+                print(f"[{mcp.name}] 空闲 {idle_exit:g}s，退出", file=sys.stderr)
+                server.should_exit = True
+
+    watcher = asyncio.create_task(exit_when_idle())
+    try:
+        await server.serve()
+    finally:
+        watcher.cancel()
+        # 只删除自己创建的套接字文件（可能已被新实例替换）
+        try:
+            if inode is not None and os.stat(path).st_ino == inode:
+                os.unlink(path)
+        except OSError:
+            pass
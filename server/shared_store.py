@@ -0,0 +1,131 @@
+"""
+跨进程共享状态：多工作进程（见 serving.py）下，天气缓存与上游限流令牌桶需要在各进程间一致。
+
+SharedStore 基于 SQLite（WAL 模式，读写互不阻塞），提供带过期时间的键值存储与令牌桶；
+连接按进程惰性创建，fork 出的工作进程各自打开自己的连接。单进程时用 TokenBucket 即可，接口相同。
+
+各方法都是阻塞调用（其它进程持有写锁时最多等待 busy timeout），异步代码中应经 asyncio.to_thread 调用，
+避免阻塞事件循环；同一进程内对连接的使用由锁串行化（reserve 的事务不会与其它线程的语句交错）。
+"""
+import os
+import sqlite3
+import threading
+import time
+
+# 每写入这么多次清理一次过期与超出容量的条目
+_PRUNE_EVERY = 64
+
+
+class SharedStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+        self._puts = 0
+        # fork 发生在工作进程开始处理请求之前，此时不会有线程持有该锁
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                "ns TEXT NOT NULL, key TEXT NOT NULL, expires REAL NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (ns, key))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, ns: str, key: str) -> tuple[float, str] | None:
+        """未过期时返回 (过期时间戳, 值)。"""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT expires, value FROM kv WHERE ns = ? AND key = ? AND expires > ?", (ns, key, time.time())
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put(self, ns: str, key: str, value: str, ttl: float, maxsize: int) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO kv (ns, key, expires, value) VALUES (?, ?, ?, ?)",
+                (ns, key, time.time() + ttl, value),
+            )
+            self._puts += 1
+            if self._puts % _PRUNE_EVERY == 0:
+                db.execute("DELETE FROM kv WHERE ns = ? AND expires <= ?", (ns, time.time()))
+                # 超出容量时淘汰最早过期的条目
+                db.execute(
+                    "DELETE FROM kv WHERE ns = ? AND key NOT IN "
+                    "(SELECT key FROM kv WHERE ns = ? ORDER BY expires DESC LIMIT ?)",
+                    (ns, ns, maxsize),
+                )
+
+    def count(self, ns: str) -> int:
+        with self._lock:
+            return self._db().execute(
+                "SELECT COUNT(*) FROM kv WHERE ns = ? AND expires > ?", (ns, time.time())
+            ).fetchone()[0]
+
+    def reserve(self, name: str, rate: float, burst: float, max_wait: float) -> float | None:
+        """令牌桶取一个令牌：返回需要等待的秒数（0 表示立即可用）；需等待超过 max_wait 时不占用令牌，返回 None。"""
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = db.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+                tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+                wait = _wait_for(tokens, rate)
+                if wait > max_wait:
+                    db.execute("ROLLBACK")
+                    return None
+                db.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)", (name, tokens - 1, now)
+                )
+                db.execute("COMMIT")
+                return wait
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+
+class TokenBucket:
+    """进程内令牌桶；令牌可透支（预约），等待时间按透支量计算，保证按提交顺序放行。"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self, max_wait: float) -> float | None:
+        now = time.monotonic()
+        tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        wait = _wait_for(tokens, self.rate)
+        if wait > max_wait:
+            return None
+        self.tokens, self.updated = tokens - 1, now
+        return wait
+
+
+class SharedTokenBucket:
+    """存放在 SharedStore 中的令牌桶，接口同 TokenBucket（reserve 为阻塞调用，见模块说明）。"""
+
+    def __init__(self, store: SharedStore, name: str, rate: float, burst: float):
+        self.store = store
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+
+    def reserve(self, max_wait: float) -> float | None:
+        return self.store.reserve(self.name, self.rate, self.burst, max_wait)
+
+
+def _wait_for(tokens: float, rate: float) -> float:
+    return 0.0 if tokens >= 1 else (1 - tokens) / rate
@@ -1,54 +1,250 @@
+import asyncio
 import json
+import logging
 import os
+import tempfile
+import time
+from collections import OrderedDict
 from urllib.parse import quote
-from urllib.request import urlopen
 
+import httpx
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
+from pydantic import BaseModel
+
+from mcp_metrics import REGISTRY, instrument
+from serving import run, worker_count
+from shared_store import SharedStore, SharedTokenBucket, TokenBucket
 
 mcp = FastMCP(
     "weather-mcp",
     host=os.environ.get("MCP_HOST", "127.0.0.1"),
     port=int(os.environ.get("MCP_PORT", "8003")),
 )
+instrument(mcp)
 
-BASE_URL = "https://wis.qq.com/weather/common?source=pc&weather_type=observe&province={province}&city={city}&county={county}"
+# WEATHER_BASE_URL 可指向本地 stub 服务，用于测试与压测
+BASE_URL = os.environ.get(
+    "WEATHER_BASE_URL",
+    "https://wis.qq.com/weather/common?source=pc&weather_type=observe&province={province}&city={city}&county={county}",
+)
 
+# 上游连接池：连接/读取超时分开设置，WEATHER_MAX_INFLIGHT 限制同时进行的上游请求数
+WEATHER_CONNECT_TIMEOUT = float(os.environ.get("WEATHER_CONNECT_TIMEOUT", "3"))
+WEATHER_READ_TIMEOUT = float(os.environ.get("WEATHER_READ_TIMEOUT", "5"))
+WEATHER_MAX_INFLIGHT = int(os.environ.get("WEATHER_MAX_INFLIGHT", "16"))
 
-def _format_update_time(s: str) -> str:
-    """Format update_time like 202602090850 -> 2026-02-09 08:50"""
-    if not s or len(s) < 12:
-        return s
-    return f"{s[:4]}-{s[4:6]}-{s[6:8]} {s[8:10]}:{s[10:12]}"
+# get_weather_many：单次最多地点数与并发查询数
+WEATHER_BATCH_MAX = int(os.environ.get("WEATHER_BATCH_MAX", "20"))
+WEATHER_BATCH_CONCURRENCY = int(os.environ.get("WEATHER_BATCH_CONCURRENCY", "8"))
+
+# 观测数据每隔几分钟才更新一次（见 update_time），进程内缓存以减少上游请求
+WEATHER_CACHE_TTL = float(os.environ.get("WEATHER_CACHE_TTL", "300"))
+WEATHER_CACHE_SIZE = int(os.environ.get("WEATHER_CACHE_SIZE", "256"))
+
+# 多工作进程（MCP_WORKERS > 1）时缓存与限流状态放在共享的 SQLite 文件中；WEATHER_SHARED_CACHE 可指定路径，
+# 单进程时设置该变量也会启用（如多个服务实例共用缓存），设为 off 关闭
+_shared_path = os.environ.get("WEATHER_SHARED_CACHE", "").strip()
+if not _shared_path and worker_count() > 1:
+    _shared_path = os.path.join(tempfile.gettempdir(), f"mcp-weather-{mcp.settings.port}.sqlite")
+_shared = SharedStore(_shared_path) if _shared_path and _shared_path.lower() != "off" else None
 
+# 上游限流：每秒最多 WEATHER_RATE_LIMIT 个请求（默认 0 不限），突发上限 WEATHER_RATE_BURST；
+# 排队等待超过读取超时的请求直接返回失败
+WEATHER_RATE_LIMIT = float(os.environ.get("WEATHER_RATE_LIMIT", "0"))
+WEATHER_RATE_BURST = float(os.environ.get("WEATHER_RATE_BURST", "0")) or max(1.0, WEATHER_RATE_LIMIT)
+if WEATHER_RATE_LIMIT <= 0:
+    _rate_bucket = None
+elif _shared is not None:
+    _rate_bucket = SharedTokenBucket(_shared, "weather-upstream", WEATHER_RATE_LIMIT, WEATHER_RATE_BURST)
+else:
+    _rate_bucket = TokenBucket(WEATHER_RATE_LIMIT, WEATHER_RATE_BURST)
 
-@mcp.tool()
-def get_weather(province: str, city: str, county: str) -> str:
+
+class WeatherError(Exception):
+    """上游请求失败或返回异常；str(e) 即返回给调用方的说明。"""
+
+
+class TTLCache:
     """
-    Query real-time weather for any location in China. Parameters: province (省),
-    city (市), county (区/县). If the user only mentions a city, use the same
-    value for province and city, and use a common district or "市辖区" for county.
-    Examples: 北京 -> province=北京, city=北京, county=朝阳区 (or 东城区, 西城区, etc.);
-    上海浦东 -> province=上海, city=上海, county=浦东新区; 广州 -> province=广东, city=广州, county=天河区.
-    Uses Tencent Weather API.
+    带 TTL 的 LRU 缓存，并对同一 key 的并发 miss 做 single-flight 合并：
+    只有第一个调用方请求上游，其余调用方等待并共享其结果（或异常）。
+    提供 shared 时作为二级缓存：本进程未命中先查共享存储，上游结果同时写入共享存储（值需可 JSON 序列化）。
     """
+
+    def __init__(self, ttl: float, maxsize: int, shared: SharedStore | None = None, namespace: str = "weather"):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.shared = shared if ttl > 0 and maxsize > 0 else None
+        self.namespace = namespace
+        self._data: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self._inflight: dict[tuple, asyncio.Future] = {}  # key -> 进行中的上游请求
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.evictions = 0
+        self.shared_hits = 0
+
+    async def get_or_fetch(self, key, fetch):
+        """命中则直接返回；否则 await fetch()（同一 key 同时只有一个在进行）。"""
+        entry = self._data.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._data[key]
+            self.expired += 1
+        self.misses += 1
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            # 上游请求放在独立任务中：发起者被取消时，其余等待者仍能拿到结果
+            flight = asyncio.ensure_future(self._fill(key, fetch))
+            self._inflight[key] = flight
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(flight)
+
+    async def _fill(self, key, fetch):
+        try:
+            shared_key = json.dumps(key, ensure_ascii=False)
+            if self.shared is not None:
+                # SQLite 在其它进程持有写锁时会等待，放到线程中执行，不阻塞事件循环
+                found = await asyncio.to_thread(self.shared.get, self.namespace, shared_key)
+                if found is not None:
+                    expires, text = found
+                    value = json.loads(text)
+                    self.shared_hits += 1
+                    self._put(key, value, expires - time.time())
+                    return value
+            value = await fetch()
+            self._put(key, value)
+            if self.shared is not None:
+                text = json.dumps(value, ensure_ascii=False)
+                await asyncio.to_thread(self.shared.put, self.namespace, shared_key, text, self.ttl, self.maxsize)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def _put(self, key, value, ttl: float | None = None) -> None:
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "shared_hits": self.shared_hits,
+            "shared_size": self.shared.count(self.namespace) if self.shared is not None else None,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
+
+
+_cache = TTLCache(WEATHER_CACHE_TTL, WEATHER_CACHE_SIZE, _shared)
+
+_upstream_duration = REGISTRY.histogram(
+    "weather_upstream_duration_seconds", "天气上游接口请求耗时（秒）", ("outcome",)
+)
+_cache_events = REGISTRY.counter("weather_cache_events_total", "天气缓存事件计数", ("event",))
+_cache_entries = REGISTRY.gauge("weather_cache_entries", "天气缓存当前条目数")
+
+
+def _collect_cache_metrics() -> None:
+    stats = _cache.stats()
+    for event in ("hits", "misses", "coalesced", "expired", "evictions", "shared_hits"):
+        _cache_events.values[(event,)] = stats[event]
+    _cache_entries.set((), stats["size"])
+
+
+REGISTRY.collector(_collect_cache_metrics)
+# httpx 默认每个请求打一条 INFO 日志，上游请求频繁时过于嘈杂
+logging.getLogger("httpx").setLevel(logging.WARNING)
+_http: httpx.AsyncClient | None = None
+_inflight_limit: asyncio.Semaphore | None = None
+
+
+def _get_http() -> httpx.AsyncClient:
+    """惰性创建 keep-alive 连接池（需在事件循环内调用）。"""
+    global _http, _inflight_limit
+    if _http is None:
+        _http = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                WEATHER_READ_TIMEOUT,
+                connect=WEATHER_CONNECT_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=WEATHER_MAX_INFLIGHT,
+                max_keepalive_connections=WEATHER_MAX_INFLIGHT,
+            ),
+        )
+        _inflight_limit = asyncio.Semaphore(WEATHER_MAX_INFLIGHT)
+    return _http
+
+
+def _cache_key(province: str, city: str, county: str) -> tuple:
+    """归一化地点：去掉所有空白，使 " 北京 " 与 "北京" 命中同一条缓存。"""
+    return tuple("".join((s or "").split()) for s in (province, city, county))
+
+
+async def _fetch_observe(province: str, city: str, county: str) -> dict:
+    """请求腾讯天气接口，返回 observe 字段；失败时抛出 WeatherError。"""
     url = BASE_URL.format(
         province=quote(province),
         city=quote(city),
         county=quote(county),
     )
+    http = _get_http()
+    if _rate_bucket is not None:
+        if isinstance(_rate_bucket, SharedTokenBucket):
+            wait = await asyncio.to_thread(_rate_bucket.reserve, WEATHER_READ_TIMEOUT)
+        else:
+            wait = _rate_bucket.reserve(WEATHER_READ_TIMEOUT)
+        if wait is None:
+            raise WeatherError("获取天气失败: 上游请求过于频繁，请稍后再试")
+        if wait:
+            await asyncio.sleep(wait)
     try:
-        with urlopen(url, timeout=10) as resp:
-            data = json.loads(resp.read().decode())
+        async with _inflight_limit:
+            started = time.perf_counter()
+            try:
+                resp = await http.get(url)
+            except Exception:
+                _upstream_duration.observe(("error",), time.perf_counter() - started)
+                raise
+            _upstream_duration.observe((str(resp.status_code),), time.perf_counter() - started)
+        data = resp.json()
     except Exception as e:
-        return f"获取天气失败: {e}"
+        raise WeatherError(f"获取天气失败: {e}") from e
 
     if data.get("status") != 200:
-        return f"接口错误: {data.get('message', 'unknown')}"
+        raise WeatherError(f"接口错误: {data.get('message', 'unknown')}")
 
     observe = (data.get("data") or {}).get("observe")
     if not observe:
-        return "暂无观测数据"
+        raise WeatherError("暂无观测数据")
+    return observe
 
+
+def _format_update_time(s: str) -> str:
+    """Format update_time like 202602090850 -> 2026-02-09 08:50"""
+    if not s or len(s) < 12:
+        return s
+    return f"{s[:4]}-{s[4:6]}-{s[6:8]} {s[8:10]}:{s[10:12]}"
+
+
+def _format_observe(province: str, city: str, county: str, observe: dict) -> str:
     degree = observe.get("degree", "-")
     weather = observe.get("weather") or observe.get("weather_short", "-")
     humidity = observe.get("humidity", "-")
@@ -63,5 +259,71 @@ def get_weather(province: str, city: str, county: str) -> str:
     )
 
 
+async def _lookup(province: str, city: str, county: str) -> tuple[bool, str]:
+    """查询单个地点，返回 (是否成功, 结果文本)。"""
+    key = _cache_key(province, city, county)
+    try:
+        observe = await _cache.get_or_fetch(key, lambda: _fetch_observe(*key))
+    except WeatherError as e:
+        return False, str(e)
+    return True, _format_observe(province, city, county, observe)
+
+
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
+async def get_weather(province: str, city: str, county: str) -> str:
+    """
+    Query real-time weather (实时天气) for any location in China. Parameters: province (省),
+    city (市), county (区/县). If the user only mentions a city, use the same
+    value for province and city, and use a common district or "市辖区" for county.
+    Examples: 北京 -> province=北京, city=北京, county=朝阳区 (or 东城区, 西城区, etc.);
+    上海浦东 -> province=上海, city=上海, county=浦东新区; 广州 -> province=广东, city=广州, county=天河区.
+    Uses Tencent Weather API.
+    """
+    _ok, text = await _lookup(province, city, county)
+    return text
+
+
+class Location(BaseModel):
+    province: str
+    city: str
+    county: str
+
+
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
+async def get_weather_many(locations: list[Location]) -> str:
+    """
+    Query real-time weather (实时天气) for several locations (多个城市/地点) in China in one call. Prefer this
+    over repeated get_weather calls when the user asks about more than one place.
+    locations: list of {province, city, county}, filled the same way as get_weather.
+    Returns one line per location, in order, each marked 成功 or 失败.
+    """
+    if not locations:
+        return "未提供地点。"
+    if len(locations) > WEATHER_BATCH_MAX:
+        return f"一次最多查询 {WEATHER_BATCH_MAX} 个地点，收到 {len(locations)} 个。"
+
+    limit = asyncio.Semaphore(WEATHER_BATCH_CONCURRENCY)
+
+    async def one(loc: Location) -> tuple[bool, str]:
+        async with limit:
+            return await _lookup(loc.province, loc.city, loc.county)
+
+    results = await asyncio.gather(*(one(loc) for loc in locations))
+    ok_count = sum(1 for ok, _ in results if ok)
+    lines = [f"共 {len(results)} 个地点，成功 {ok_count}，失败 {len(results) - ok_count}："]
+    for i, (loc, (ok, text)) in enumerate(zip(locations, results), 1):
+        if ok:
+            lines.append(f"{i}. [成功] {text}")
+        else:
+            lines.append(f"{i}. [失败] {loc.province} {loc.city} {loc.county}：{text}")
+    return "\n".join(lines)
+
+
+@mcp.resource("weather://cache/stats", mime_type="application/json")
+def cache_stats() -> str:
+    """天气缓存计数：命中、未命中、合并的并发请求、过期、LRU 淘汰与共享缓存命中次数。"""
+    return json.dumps(_cache.stats())
+
+
 if __name__ == "__main__":
-    mcp.run(transport=os.environ.get("MCP_TRANSPORT", "stdio"))
+    run(mcp)
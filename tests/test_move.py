@@ -0,0 +1,52 @@
+"""
+机器人运动服务（server/move.py）：单个动作工具与 robot_execute_sequence 使用同样的参数校验，
+无效的方向或步态模式不执行任何动作，位姿、轨迹与步态保持不变。
+
+运行：python -m unittest discover tests（或 pytest tests）
+"""
+import asyncio
+import os
+import sys
+import unittest
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(_root / "server"), str(_root / "client")]
+# 动作瞬时完成
+os.environ.setdefault("MOVE_TIME_SCALE", "0")
+
+import move  # noqa: E402
+
+
+def _call(name: str, arguments: dict) -> str:
+    content, _ = asyncio.run(move.mcp.call_tool(name, arguments))
+    return content[0].text
+
+
+class InvalidArgumentsTest(unittest.TestCase):
+    def _snapshot(self):
+        state = move._state
+        return state["x"], state["y"], state["heading"], state["gait_mode"], len(move._trajectory)
+
+    def test_invalid_direction_or_mode_changes_nothing(self):
+        cases = [
+            ("robot_walk", {"direction": "left", "steps": 3}),
+            ("robot_walk", {"direction": "forward", "steps": -3}),
+            ("robot_turn", {"direction": "up", "degrees": 30}),
+            ("robot_turn", {"direction": "left", "degrees": -30}),
+            ("robot_set_gait_mode", {"mode": "fly"}),
+        ]
+        for name, arguments in cases:
+            with self.subTest(tool=name, arguments=arguments):
+                before = self._snapshot()
+                text = _call(name, arguments)
+                self.assertTrue(text.startswith("参数无效，未执行"), text)
+                self.assertEqual(self._snapshot(), before)
+
+    def test_single_tool_agrees_with_sequence(self):
+        text = _call("robot_execute_sequence", {"actions": [{"action": "walk", "direction": "left", "steps": 3}]})
+        self.assertTrue(text.startswith("计划无效"), text)
+
+
+if __name__ == "__main__":
+    unittest.main()
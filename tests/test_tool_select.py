@@ -0,0 +1,76 @@
+"""
+工具筛选（client/tool_select.py）：用全部内置服务的真实工具描述，检查典型中文请求能选中对应工具。
+
+运行：python -m unittest discover tests（或 pytest tests）
+"""
+import asyncio
+import importlib
+import sys
+import unittest
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(_root / "server"), str(_root / "client")]
+
+from connect import llm_tool_schemas  # noqa: E402
+from tool_select import ToolSelector  # noqa: E402
+
+_SERVERS = ("server", "server2", "weather", "move")
+
+# 每个工具的典型中文请求
+TYPICAL_REQUESTS = {
+    "say_hello": "跟小明打个招呼",
+    "get_time": "现在几点",
+    "get_weather": "北京天气怎么样",
+    "get_weather_many": "北京和上海的天气",
+    "robot_stand": "机器人站起来",
+    "robot_lie_down": "趴下",
+    "robot_walk": "向前走三步",
+    "robot_turn": "左转90度",
+    "robot_set_gait_mode": "切换到跑步模式",
+    "robot_emergency_stop": "急停",
+    "robot_get_status": "现在什么状态",
+    "robot_get_pose": "现在位置和朝向",
+    "robot_get_trajectory": "看看走过的轨迹",
+    "robot_return_to_origin": "回到原点",
+    "robot_execute_sequence": "先走3步再左转90度",
+}
+
+
+def _load_schemas() -> list[dict]:
+    async def list_all():
+        tools = []
+        for name in _SERVERS:
+            tools += await importlib.import_module(name).mcp.list_tools()
+        return tools
+
+    return llm_tool_schemas(asyncio.run(list_all()))
+
+
+class ToolSelectTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.schemas = _load_schemas()
+        cls.names = {s["function"]["name"] for s in cls.schemas}
+
+    def _selected(self, query: str) -> list[str]:
+        selector = ToolSelector(self.schemas, top_k=6)
+        return [s["function"]["name"] for s in selector.select(query)]
+
+    def test_every_tool_has_typical_request(self):
+        self.assertEqual(set(TYPICAL_REQUESTS), self.names)
+
+    def test_typical_request_selects_tool(self):
+        for tool, query in TYPICAL_REQUESTS.items():
+            with self.subTest(tool=tool, query=query):
+                selected = self._selected(query)
+                self.assertIn(tool, selected)
+                # 确实做了筛选，而不是退回发送全部工具
+                self.assertLess(len(selected), len(self.schemas))
+
+    def test_irrelevant_request_sends_all(self):
+        self.assertEqual(len(self._selected("讲个笑话")), len(self.schemas))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,19 @@
 """
 检测指定 MCP 端点（Streamable HTTP）的完整信息：服务器信息、能力、工具列表及参数等。
-用法: python tool/mcp_inspect.py [URL] [--json]
-默认 URL: http://127.0.0.1:8001/mcp
+用法: python tool/mcp_inspect.py [URL ...] [--json] [--probe [--call TOOL[=JSON参数] ...] [--repeat N]]
+未给出 URL 时读取 MCP_SERVER_URLS（逗号分隔），仍为空则使用 http://127.0.0.1:8001/mcp。
+多个端点并发检测；--probe 额外测量 TCP 连接、initialize、list_tools 以及在同一 session 上
+重复调用指定只读工具的耗时（min / median / p99），可用作一组 MCP 服务的健康与延迟检查。
 """
 import argparse
 import asyncio
 import json
+import os
+import statistics
 import sys
+import time
 from contextlib import AsyncExitStack
+from urllib.parse import urlsplit
 
 from mcp.client.session import ClientSession
 from mcp.client.streamable_http import streamable_http_client
@@ -81,34 +87,114 @@ def _server_info_to_dict(init_result) -> dict:
     return d
 
 
-async def detect(url: str) -> dict:
-    """连接 MCP 端点，执行 initialize 与 list_tools，返回完整信息 dict。"""
+def _describe_error(e: BaseException) -> str:
+    """展开 anyio TaskGroup 抛出的 ExceptionGroup，取第一个真实异常作为说明。"""
+    while isinstance(e, BaseExceptionGroup) and e.exceptions:
+        e = e.exceptions[0]
+    return str(e) or type(e).__name__
+
+
+def _latency_summary(samples: list[float]) -> dict:
+    """耗时样本（秒）-> {n, min_ms, median_ms, p99_ms}。"""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, max(0, round(0.99 * len(ordered) + 0.5) - 1))]
+    return {
+        "n": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 2),
+        "median_ms": round(statistics.median(ordered) * 1000, 2),
+        "p99_ms": round(p99 * 1000, 2),
+    }
+
+
+async def _tcp_connect_time(url: str) -> float:
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    started = time.perf_counter()
+    _reader, writer = await asyncio.open_connection(parts.hostname, port)
+    elapsed = time.perf_counter() - started
+    writer.close()
+    await writer.wait_closed()
+    return elapsed
+
+
+async def _timed(coro) -> tuple[object, float]:
+    started = time.perf_counter()
+    value = await coro
+    return value, time.perf_counter() - started
+
+
+async def probe(session: ClientSession, url: str, tools: list, opts) -> dict:
+    """
+    延迟探测：TCP 连接与 initialize 各测 opts.sessions 次（每次新建 session），
+    list_tools 与 opts.calls 中的工具在已有的 session 上各重复 opts.repeat 次。
+    """
+    result = {"connect": {}, "initialize": {}, "list_tools": {}, "calls": {}}
+
+    connect_samples, init_samples = [], []
+    for _ in range(opts.sessions):
+        connect_samples.append(await _tcp_connect_time(url))
+        async with streamable_http_client(url) as (read, write, _):
+            async with ClientSession(read, write) as fresh:
+                init_samples.append((await _timed(fresh.initialize()))[1])
+    result["connect"] = _latency_summary(connect_samples)
+    result["initialize"] = _latency_summary(init_samples)
+
+    list_samples = [(await _timed(session.list_tools()))[1] for _ in range(opts.repeat)]
+    result["list_tools"] = _latency_summary(list_samples)
+
+    by_name = {t.name: t for t in tools}
+    for name, args in opts.calls:
+        tool = by_name.get(name)
+        if tool is None:
+            result["calls"][name] = {"skipped": "端点没有该工具"}
+            continue
+        read_only = tool.annotations is not None and tool.annotations.readOnlyHint
+        if not read_only and not opts.allow_unsafe:
+            result["calls"][name] = {"skipped": "工具未声明 readOnlyHint（可加 --allow-unsafe）"}
+            continue
+        samples, errors = [], 0
+        for _ in range(opts.repeat):
+            try:
+                call_result, elapsed = await _timed(session.call_tool(name, args))
+            except Exception:
+                errors += 1
+                continue
+            if call_result.isError:
+                errors += 1
+            samples.append(elapsed)
+        result["calls"][name] = {**_latency_summary(samples), "errors": errors}
+    return result
+
+
+async def detect(url: str, probe_opts=None) -> dict:
+    """连接 MCP 端点，执行 initialize 与 list_tools，返回完整信息 dict；失败时 error 字段说明原因。"""
     result = {"url": url, "server": {}, "tools": [], "resources": [], "prompts": []}
+    try:
+        await _detect(url, result, probe_opts)
+    except Exception as e:
+        result["error"] = _describe_error(e)
+    return result
 
+
+async def _detect(url: str, result: dict, probe_opts) -> None:
     async with AsyncExitStack() as exit_stack:
+        stage = "连接"
         try:
             read, write, _ = await exit_stack.enter_async_context(streamable_http_client(url))
-        except Exception as e:
-            print(f"连接失败 {url}: {e}", file=sys.stderr)
-            sys.exit(1)
+            session = ClientSession(read, write)
+            await exit_stack.enter_async_context(session)
 
-        session = ClientSession(read, write)
-        await exit_stack.enter_async_context(session)
-
-        try:
+            stage = "initialize"
             init_result = await session.initialize()
-        except Exception as e:
-            print(f"initialize 失败: {e}", file=sys.stderr)
-            sys.exit(1)
-
-        result["server"] = _server_info_to_dict(init_result)
-        caps = init_result.capabilities
+            result["server"] = _server_info_to_dict(init_result)
+            caps = init_result.capabilities
 
-        try:
+            stage = "list_tools"
             list_result = await session.list_tools()
         except Exception as e:
-            print(f"list_tools 失败: {e}", file=sys.stderr)
-            sys.exit(1)
+            raise RuntimeError(f"{stage} 失败: {_describe_error(e)}") from e
 
         result["tools"] = [_tool_to_dict(t) for t in list_result.tools]
 
@@ -132,7 +218,8 @@ async def detect(url: str) -> dict:
             except Exception:
                 result["prompts"] = []
 
-    return result
+        if probe_opts is not None:
+            result["probe"] = await probe(session, url, list_result.tools, probe_opts)
 
 
 def print_readable(data: dict) -> None:
@@ -147,6 +234,11 @@ def print_readable(data: dict) -> None:
     print("MCP 端点:", url)
     print("=" * 60)
 
+    if data.get("error"):
+        print("\n[ 错误 ]", data["error"])
+        print()
+        return
+
     si = server.get("serverInfo", {})
     print("\n[ 服务器信息 ]")
     print("  协议版本:", server.get("protocolVersion", ""))
@@ -199,37 +291,126 @@ def print_readable(data: dict) -> None:
         for p in prompts:
             print("  -", p.get("name"), p.get("description") or "")
 
+    if data.get("probe"):
+        print_probe(data["probe"])
+
+    print()
+
+
+def _fmt_latency(stats: dict) -> str:
+    if not stats.get("n"):
+        return "无样本"
+    return f"min {stats['min_ms']} / median {stats['median_ms']} / p99 {stats['p99_ms']} ms（{stats['n']} 次）"
+
+
+def print_probe(probe_result: dict) -> None:
+    """打印延迟探测结果。"""
+    print("\n[ 延迟探测 ]")
+    print("  TCP 连接:  ", _fmt_latency(probe_result["connect"]))
+    print("  initialize:", _fmt_latency(probe_result["initialize"]))
+    print("  list_tools:", _fmt_latency(probe_result["list_tools"]))
+    for name, stats in probe_result["calls"].items():
+        if "skipped" in stats:
+            print(f"  {name}: 跳过（{stats['skipped']}）")
+        else:
+            errors = f"，错误 {stats['errors']} 次" if stats["errors"] else ""
+            print(f"  {name}: {_fmt_latency(stats)}{errors}")
+
+
+def print_summary(results: list[dict]) -> None:
+    """多个端点时打印一行一个端点的汇总。"""
+    print("=" * 60)
+    print("汇总：", len(results), "个端点，失败", sum(1 for r in results if r.get("error")), "个")
+    print("=" * 60)
+    for r in results:
+        if r.get("error"):
+            print(f"  [失败] {r['url']}: {r['error']}")
+            continue
+        name = r["server"].get("serverInfo", {}).get("name", "")
+        line = f"  [正常] {r['url']}  {name}，{len(r['tools'])} 个工具"
+        if r.get("probe"):
+            line += f"，initialize median {r['probe']['initialize'].get('median_ms', '-')} ms"
+            line += f"，list_tools median {r['probe']['list_tools'].get('median_ms', '-')} ms"
+        print(line)
     print()
 
 
+def _parse_call(text: str) -> tuple[str, dict]:
+    """--call 参数：TOOL 或 TOOL=JSON 对象。"""
+    name, _, raw = text.partition("=")
+    args = json.loads(raw) if raw else {}
+    if not isinstance(args, dict):
+        raise argparse.ArgumentTypeError(f"{name} 的参数须为 JSON 对象")
+    return name.strip(), args
+
+
+async def detect_all(urls: list[str], probe_opts=None) -> list[dict]:
+    """并发检测多个端点，结果与 urls 同序。"""
+    return list(await asyncio.gather(*(detect(url, probe_opts) for url in urls)))
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="检测 MCP 端点信息（服务器、能力、工具及参数）",
     )
     parser.add_argument(
-        "url",
-        nargs="?",
-        default=DEFAULT_URL,
-        help=f"MCP Streamable HTTP 地址 (默认: {DEFAULT_URL})",
+        "urls",
+        nargs="*",
+        metavar="URL",
+        help=f"MCP Streamable HTTP 地址，可多个 (默认: MCP_SERVER_URLS 或 {DEFAULT_URL})",
     )
     parser.add_argument(
         "--json",
         action="store_true",
-        help="以 JSON 格式输出",
+        help="以 JSON 格式输出（单个端点为对象，多个端点为数组）",
+    )
+    parser.add_argument(
+        "--probe",
+        action="store_true",
+        help="测量 TCP 连接、initialize、list_tools 及 --call 工具调用的耗时",
+    )
+    parser.add_argument(
+        "--call",
+        action="append",
+        type=_parse_call,
+        default=[],
+        dest="calls",
+        metavar="TOOL[=JSON]",
+        help='--probe 时重复调用的只读工具，可重复，如 --call get_time --call \'say_hello={"name":"a"}\'',
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="list_tools 与每个工具的调用次数 (默认: 20)")
+    parser.add_argument("--sessions", type=int, default=3, help="测量连接与 initialize 时新建 session 的次数 (默认: 3)")
+    parser.add_argument(
+        "--allow-unsafe",
+        action="store_true",
+        help="允许 --call 调用未声明 readOnlyHint 的工具",
     )
     args = parser.parse_args()
-    url = args.url.strip() if args.url else DEFAULT_URL
 
-    if not url.startswith("http://") and not url.startswith("https://"):
-        print("错误: URL 须以 http:// 或 https:// 开头", file=sys.stderr)
-        sys.exit(1)
+    urls = [u.strip() for u in args.urls if u.strip()]
+    if not urls:
+        urls = [u.strip() for u in os.environ.get("MCP_SERVER_URLS", "").split(",") if u.strip()]
+    if not urls:
+        urls = [DEFAULT_URL]
+
+    for url in urls:
+        if not url.startswith("http://") and not url.startswith("https://"):
+            print(f"错误: URL 须以 http:// 或 https:// 开头: {url}", file=sys.stderr)
+            sys.exit(1)
 
-    data = asyncio.run(detect(url))
+    results = asyncio.run(detect_all(urls, args if args.probe else None))
 
     if args.json:
+        data = results[0] if len(results) == 1 else results
         print(json.dumps(data, ensure_ascii=False, indent=2))
     else:
-        print_readable(data)
+        for data in results:
+            print_readable(data)
+        if len(results) > 1:
+            print_summary(results)
+
+    if any(r.get("error") for r in results):
+        sys.exit(1)
 
 
 if __name__ == "__main__":